@@ -0,0 +1,298 @@
+"""歌曲文件HTTP下载器
+
+直接用歌曲下载按钮（j-src-btn）上的链接下载，不经过浏览器的下载管理器：
+- 大文件（如几十MB的FLAC）按HTTP Range分成几段并行下载
+- 下载中的内容写入 .part 文件，进度记录在 .part.json 中，程序崩溃后从断点继续
+- 完成后核对文件大小与Content-Length，大小一致才算下载成功
+- 需要时使用从浏览器会话中复制的Cookie
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import http_client
+
+
+# 超过该大小（字节）且服务器支持Range时分段下载
+SEGMENT_THRESHOLD = 8 * 1024 * 1024
+
+# 分段数
+SEGMENT_COUNT = 4
+
+# 每次读取的字节数
+CHUNK_SIZE = 256 * 1024
+
+# 单个分段失败后的重试次数（从已下载的位置继续）
+SEGMENT_RETRIES = 3
+
+# 进度文件的保存间隔（秒）
+STATE_SAVE_INTERVAL = 1.0
+
+AUDIO_EXTENSIONS = ('.mp3', '.flac', '.m4a', '.ogg', '.wav', '.aac', '.ape')
+
+CONTENT_TYPE_EXTENSIONS = {
+    'audio/mpeg': '.mp3',
+    'audio/mp3': '.mp3',
+    'audio/flac': '.flac',
+    'audio/x-flac': '.flac',
+    'audio/mp4': '.m4a',
+    'audio/x-m4a': '.m4a',
+    'audio/ogg': '.ogg',
+    'audio/wav': '.wav',
+    'audio/x-wav': '.wav',
+    'audio/aac': '.aac',
+}
+
+
+class DownloadError(Exception):
+    """下载失败（已下载的部分保留，下次从断点继续）"""
+
+
+def cookies_from_driver(driver):
+    """复制浏览器会话中的Cookie，供HTTP请求使用"""
+    try:
+        return {cookie['name']: cookie['value'] for cookie in driver.get_cookies()}
+    except Exception:
+        return {}
+
+
+def guess_extension(url, content_type=None, default='.mp3'):
+    """根据链接路径或Content-Type判断音频文件扩展名，都看不出时返回default"""
+    path = urlparse(url).path.lower()
+    for ext in AUDIO_EXTENSIONS:
+        if path.endswith(ext):
+            return ext
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    return CONTENT_TYPE_EXTENSIONS.get(content_type, default)
+
+
+def existing_audio_file(stem_path):
+    """已下载的同名歌曲文件（任一音频扩展名），不存在返回None"""
+    for ext in AUDIO_EXTENSIONS:
+        if os.path.exists(stem_path + ext):
+            return stem_path + ext
+    return None
+
+
+def fix_extension(path, result):
+    """
+    按下载结果中的最终地址和Content-Type改正文件扩展名
+
+    链接上看不出格式时下载前只能先按.mp3命名，实际是FLAC等格式时下载完成后改名；
+    新文件名已被占用时加上序号，不覆盖已有的歌曲。
+
+    Returns:
+        改名后的文件路径
+    """
+    stem, ext = os.path.splitext(path)
+    # 最终地址和Content-Type都看不出格式时保留原扩展名
+    actual = guess_extension(result['url'], result['content_type'], default=ext.lower())
+    if actual == ext.lower():
+        return path
+    target = stem + actual
+    number = 2
+    while os.path.exists(target):
+        target = f"{stem} ({number}){actual}"
+        number += 1
+    os.replace(path, target)
+    return target
+
+
+class AudioDownloader:
+    """
+    歌曲文件下载器，可在多个线程中共用
+
+    Args:
+        segments: 大文件的分段数
+        segment_threshold: 分段下载的最小文件大小（字节）
+        log: 日志函数
+    """
+    def __init__(self, segments=SEGMENT_COUNT, segment_threshold=SEGMENT_THRESHOLD, log=print):
+        self.segments = max(1, segments)
+        self.segment_threshold = segment_threshold
+        self.log = log
+        self.client = http_client.get_client()
+        http_client.configure(self.segments * 2)
+
+    def probe(self, url, headers, cookies):
+        """
+        请求第一个字节，获取文件大小、是否支持Range和Content-Type
+
+        Returns:
+            (total_size或None, 是否支持Range, content_type, 最终地址)
+        """
+        probe_headers = dict(headers, Range='bytes=0-0')
+        with self.client.get(url, headers=probe_headers, cookies=cookies, stream=True) as response:
+            response.raise_for_status()
+            content_type = response.headers.get('Content-Type', '')
+            if response.status_code == 206:
+                content_range = response.headers.get('Content-Range', '')
+                total = content_range.rsplit('/', 1)[-1]
+                return (int(total) if total.isdigit() else None), True, content_type, response.url
+            length = response.headers.get('Content-Length')
+            return (int(length) if length and length.isdigit() else None), False, content_type, response.url
+
+    def download(self, url, dest_path, headers=None, cookies=None, should_continue=None):
+        """
+        下载文件到dest_path
+
+        Args:
+            url: 下载链接
+            dest_path: 目标文件路径
+            headers: 额外的请求头（如Referer）
+            cookies: Cookie字典
+            should_continue: 可选的函数，返回False时中止（已下载的部分保留）
+
+        Returns:
+            dict: {'path', 'size', 'seconds', 'resumed', 'segments', 'content_type', 'url'}
+                  （content_type、url为探测得到的Content-Type和跳转后的最终地址）
+
+        Raises:
+            DownloadError: 下载失败或文件大小不符
+        """
+        headers = dict(headers or {})
+        # 不要压缩，否则读到的字节数与Content-Length对不上
+        headers['Accept-Encoding'] = 'identity'
+        cookies = cookies or {}
+        should_continue = should_continue or (lambda: True)
+        start = time.time()
+
+        try:
+            total, ranged, content_type, final_url = self.probe(url, headers, cookies)
+        except Exception as e:
+            raise DownloadError(f"请求歌曲链接失败: {e}")
+
+        part_path = dest_path + '.part'
+        state_path = part_path + '.json'
+        state = self._load_state(state_path, final_url, total) if ranged and total else None
+        resumed = bool(state and any(done for _, _, done in state['segments']))
+
+        if ranged and total:
+            if state is None:
+                state = {'url': final_url, 'total': total,
+                         'segments': self._plan_segments(total)}
+                with open(part_path, 'wb') as f:
+                    f.truncate(total)
+            self._download_segments(final_url, part_path, state_path, state, headers, cookies, should_continue)
+        else:
+            # 服务器不支持Range或未给出大小，整个文件顺序下载
+            self._download_stream(final_url, part_path, headers, cookies, should_continue)
+
+        if state:
+            # 分段下载时.part文件预先扩展到了完整大小，按各分段实际写入的字节数核对
+            if any(start + done <= end for start, end, done in state['segments']):
+                raise DownloadError("部分分段未下载完成")
+            size = sum(done for _, _, done in state['segments'])
+        else:
+            size = os.path.getsize(part_path)
+        if total is not None and size != total:
+            raise DownloadError(f"文件大小不符: {size} / {total} 字节")
+
+        os.replace(part_path, dest_path)
+        if os.path.exists(state_path):
+            os.remove(state_path)
+
+        return {
+            'path': dest_path,
+            'size': size,
+            'seconds': time.time() - start,
+            'resumed': resumed,
+            'segments': len(state['segments']) if state else 1,
+            'content_type': content_type,
+            'url': final_url,
+        }
+
+    def _plan_segments(self, total):
+        """把文件划分为若干段 [起始, 结束(含), 已下载字节数]"""
+        count = self.segments if total >= self.segment_threshold else 1
+        step = -(-total // count)
+        return [[start, min(start + step, total) - 1, 0] for start in range(0, total, step)]
+
+    @staticmethod
+    def _load_state(state_path, url, total):
+        """读取断点进度，文件大小变化时作废"""
+        try:
+            with open(state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get('total') != total or not os.path.exists(state_path[:-len('.json')]):
+            return None
+        state['url'] = url
+        return state
+
+    @staticmethod
+    def _save_state(state_path, state):
+        tmp_path = state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, state_path)
+
+    def _download_segments(self, url, part_path, state_path, state, headers, cookies, should_continue):
+        """并行下载未完成的分段"""
+        lock = threading.Lock()
+        last_save = [time.time()]
+
+        def progress():
+            with lock:
+                if time.time() - last_save[0] >= STATE_SAVE_INTERVAL:
+                    self._save_state(state_path, state)
+                    last_save[0] = time.time()
+
+        def fetch(segment):
+            start, end, _ = segment
+            for attempt in range(SEGMENT_RETRIES + 1):
+                offset = start + segment[2]
+                if offset > end:
+                    return
+                try:
+                    segment_headers = dict(headers, Range=f'bytes={offset}-{end}')
+                    with self.client.get(url, headers=segment_headers, cookies=cookies, stream=True) as response:
+                        if response.status_code != 206:
+                            raise DownloadError(f"服务器未按Range返回 (HTTP {response.status_code})")
+                        with open(part_path, 'r+b') as f:
+                            f.seek(offset)
+                            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                                if not should_continue():
+                                    raise DownloadError("下载已中止")
+                                if chunk:
+                                    chunk = chunk[:end + 1 - (start + segment[2])]
+                                    f.write(chunk)
+                                    segment[2] += len(chunk)
+                                    progress()
+                    if start + segment[2] > end:
+                        return
+                except DownloadError:
+                    raise
+                except Exception as e:
+                    if attempt == SEGMENT_RETRIES:
+                        raise DownloadError(f"分段 {start}-{end} 下载失败: {e}")
+                    time.sleep(1 + attempt)
+
+        pending = [segment for segment in state['segments'] if segment[0] + segment[2] <= segment[1]]
+        try:
+            with ThreadPoolExecutor(max_workers=len(pending) or 1) as executor:
+                for future in [executor.submit(fetch, segment) for segment in pending]:
+                    future.result()
+        finally:
+            with lock:
+                self._save_state(state_path, state)
+
+    def _download_stream(self, url, part_path, headers, cookies, should_continue):
+        """顺序下载整个文件"""
+        try:
+            with self.client.get(url, headers=headers, cookies=cookies, stream=True) as response:
+                response.raise_for_status()
+                with open(part_path, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                        if not should_continue():
+                            raise DownloadError("下载已中止")
+                        if chunk:
+                            f.write(chunk)
+        except DownloadError:
+            raise
+        except Exception as e:
+            raise DownloadError(f"下载失败: {e}")
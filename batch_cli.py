@@ -0,0 +1,228 @@
+"""命令行批量下载（不需要图形界面）
+
+在没有桌面的服务器上或cron中运行批量任务，不导入tkinter，使用与界面相同的下载器
+（music_downloader.MusicDownloader）：歌词、封面与 image_geci.py 相同，
+歌曲文件与 ceshi2.0.py 的"直接下载歌曲文件"相同（HTTP分段下载、断点续传）。
+
+用法:
+    python batch_cli.py 歌曲列表.txt [-o 输出目录] [-w 线程数] [--lyrics] [--cover] [--song]
+                        [--browser]
+
+    --lyrics / --cover / --song  下载歌词 / 封面 / 歌曲文件，都不指定时只下载歌词
+    -o, --output                 输出目录，默认 downloaded_music
+    -w, --workers                并行线程数，默认 1
+    --browser                    不用HTTP直连解析，始终用浏览器（无界面模式）解析
+
+歌曲列表格式与界面相同（"1. 歌名 - 歌手" 或 "歌名 - 歌手"，#开头为注释）。
+
+进度以JSON Lines写到标准输出，每行一个事件，日志写到标准错误：
+    {"event": "start", "total": 120, "workers": 2, "lyrics": true, "cover": false, "song": true}
+    {"event": "song", "index": 1, "total": 120, "song": "...", "artist": "...", "status": "ok",
+     "lyrics": "路径", "cover": null, "audio": "路径", "errors": [], "seconds": 3.2}
+    {"event": "done", "total": 120, "ok": 110, "failed": 10, "seconds": 812.3}
+
+全部成功时退出码为0，有失败时为1，参数错误为2。
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from blob_store import BlobStore
+from music_downloader import MusicDownloader
+from pacing import Pacer
+from resolver_cache import ResolverCache
+
+
+class BatchRunner:
+    """
+    批量下载，每个线程使用自己的下载器（各自按需启动浏览器）
+
+    Args:
+        output_dir: 输出目录
+        workers: 并行线程数
+        lyrics / cover / song: 下载的内容
+        use_http_resolver: 优先HTTP直连解析
+        out: 进度输出流
+        log: 日志函数
+    """
+    def __init__(self, output_dir, workers=1, lyrics=True, cover=False, song=False,
+                 use_http_resolver=True, out=sys.stdout, log=None):
+        self.output_dir = output_dir
+        self.workers = max(1, workers)
+        self.lyrics = lyrics
+        self.cover = cover
+        self.song = song
+        self.use_http_resolver = use_http_resolver
+        self.out = out
+        self.log = log or (lambda msg: print(msg, file=sys.stderr, flush=True))
+        self.out_lock = threading.Lock()
+        self.local = threading.local()
+        self.downloaders = []
+        self.downloaders_lock = threading.Lock()
+        # 所有线程共用一个节奏控制，网站限流时一起减速
+        self.pacer = Pacer(max_workers=self.workers, log=self.log)
+        # 各线程的下载器共用解析缓存和存储，全部处理完后再关闭
+        self.resolver_cache = ResolverCache()
+        self.blob_store = BlobStore()
+        self.running = True
+
+    def emit(self, event, **fields):
+        """输出一行进度事件"""
+        with self.out_lock:
+            self.out.write(json.dumps(dict(event=event, **fields), ensure_ascii=False) + '\n')
+            self.out.flush()
+
+    def get_downloader(self):
+        """当前线程的下载器"""
+        downloader = getattr(self.local, 'downloader', None)
+        if downloader is None:
+            downloader = MusicDownloader(self.output_dir, log=self.log,
+                                         resolver_cache=self.resolver_cache,
+                                         blob_store=self.blob_store)
+            downloader.use_http_resolver = self.use_http_resolver
+            downloader.headless = True
+            downloader.pacer = self.pacer
+            self.local.downloader = downloader
+            with self.downloaders_lock:
+                self.downloaders.append(downloader)
+        return downloader
+
+    def process(self, index, total, song_info):
+        """处理一首歌曲，返回是否全部成功"""
+        song_name = song_info['song']
+        artist = song_info['artist']
+        start = time.time()
+        record = {'lyrics': None, 'cover': None, 'audio': None}
+        errors = []
+
+        with self.pacer.slot(lambda: self.running):
+            downloader = self.get_downloader()
+            try:
+                page_data = downloader.get_music_resources(song_name, artist, self.cover, self.song)
+            except Exception as e:
+                page_data = None
+                errors.append(str(e))
+
+            if page_data:
+                actual_song = page_data['actual_song']
+                actual_artist = page_data['actual_artist']
+                tasks = []
+                if self.lyrics and not page_data.get('lyrics_url'):
+                    errors.append('没有歌词')
+                elif self.lyrics:
+                    tasks.append(('lyrics', lambda: downloader.download_lyrics(
+                        page_data['lyrics_url'], actual_song, actual_artist)))
+                if self.cover:
+                    tasks.append(('cover', lambda: downloader.download_cover(
+                        page_data['cover_url'], actual_song, actual_artist)))
+                if self.song:
+                    tasks.append(('audio', lambda: downloader.download_audio(
+                        page_data['audio_url'], actual_song, actual_artist, lambda: self.running)))
+
+                for key, task in tasks:
+                    result = task()
+                    if result['success']:
+                        record[key] = os.path.abspath(result['filepath'])
+                    else:
+                        errors.append(result['error'])
+            elif not errors:
+                errors.append('未找到歌曲')
+
+        wanted = [key for key, on in (('lyrics', self.lyrics), ('cover', self.cover), ('audio', self.song)) if on]
+        success = all(record[key] for key in wanted)
+        self.emit('song', index=index, total=total, song=song_name, artist=artist,
+                  status='ok' if success else 'failed', errors=errors,
+                  seconds=round(time.time() - start, 2), **record)
+        return success
+
+    def run(self, songs):
+        """
+        处理歌曲列表
+
+        Returns:
+            (成功数, 失败数)
+        """
+        total = len(songs)
+        start = time.time()
+        self.emit('start', total=total, workers=self.workers,
+                  lyrics=self.lyrics, cover=self.cover, song=self.song)
+
+        ok = failed = 0
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = [executor.submit(self.process, i, total, song_info)
+                           for i, song_info in enumerate(songs, 1)]
+                try:
+                    for future in futures:
+                        try:
+                            if future.result():
+                                ok += 1
+                            else:
+                                failed += 1
+                        except Exception as e:
+                            self.log(f"处理出错: {e}")
+                            failed += 1
+                except KeyboardInterrupt:
+                    # 先通知正在处理的歌曲停下、取消还没开始的歌曲，
+                    # 否则退出with时要等全部歌曲处理完
+                    self.running = False
+                    self.log("已中断")
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    raise
+        finally:
+            for downloader in self.downloaders:
+                try:
+                    downloader.close()
+                except Exception as e:
+                    self.log(f"关闭下载器出错: {e}")
+            self.resolver_cache.close()
+            self.blob_store.close()
+
+        self.emit('done', total=total, ok=ok, failed=failed, seconds=round(time.time() - start, 1))
+        return ok, failed
+
+
+def parse_args(argv=None):
+    """解析命令行参数，参数错误时argparse打印用法并以退出码2退出"""
+    parser = argparse.ArgumentParser(
+        description="命令行批量下载歌词、封面和歌曲文件（不需要图形界面）",
+        epilog="歌曲列表格式与界面相同（\"1. 歌名 - 歌手\" 或 \"歌名 - 歌手\"，#开头为注释）。"
+               "进度以JSON Lines写到标准输出，日志写到标准错误。"
+    )
+    parser.add_argument('playlist', help="歌曲列表文件")
+    parser.add_argument('-o', '--output', default="downloaded_music", help="输出目录，默认 downloaded_music")
+    parser.add_argument('-w', '--workers', type=int, default=1, help="并行线程数，默认 1")
+    parser.add_argument('--lyrics', action='store_true', help="下载歌词（都不指定时只下载歌词）")
+    parser.add_argument('--cover', action='store_true', help="下载封面")
+    parser.add_argument('--song', action='store_true', help="下载歌曲文件")
+    parser.add_argument('--browser', action='store_true', help="不用HTTP直连解析，始终用浏览器（无界面模式）解析")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.playlist):
+        parser.error(f"文件 '{args.playlist}' 不存在")
+    if not (args.lyrics or args.cover or args.song):
+        args.lyrics = True
+    return args
+
+
+def main():
+    args = parse_args()
+    runner = BatchRunner(
+        args.output,
+        workers=args.workers,
+        lyrics=args.lyrics,
+        cover=args.cover,
+        song=args.song,
+        use_http_resolver=not args.browser
+    )
+    songs = MusicDownloader.parse_song_list(args.playlist)
+    _, failed = runner.run(songs)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
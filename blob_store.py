@@ -0,0 +1,131 @@
+"""按内容寻址的歌词/封面存储
+
+下载到的歌词和封面按SHA-256保存在 blob_store/objects 下，每份内容只存一次；
+各工具输出目录中的文件（如 "歌名 - 歌手.lrc"）是指向同一份内容的硬链接。
+另有 下载地址 → 内容哈希 的索引，同一个地址在不同工具、不同运行之间只下载一次。
+
+硬链接要求输出目录与存储目录在同一个磁盘分区，不满足时退回为复制文件。
+"""
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+STORE_DIR = os.path.join(APP_DIR, "blob_store")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS url_index (
+    url TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    size INTEGER,
+    content_type TEXT,
+    fetched_at REAL
+)
+"""
+
+
+class BlobStore:
+    """线程安全，多个工作线程可共用一个实例"""
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(root, "index.db"), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(_SCHEMA)
+        self.conn.commit()
+
+    def object_path(self, digest):
+        """内容哈希对应的存储路径"""
+        return os.path.join(self.objects_dir, digest[:2], digest[2:])
+
+    def has(self, digest):
+        return os.path.exists(self.object_path(digest))
+
+    def lookup_url(self, url):
+        """
+        查询地址是否已下载过
+
+        Returns:
+            dict: {'digest', 'size', 'content_type'}；没有记录或内容已丢失时返回None
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT digest, size, content_type FROM url_index WHERE url = ?", (url,)
+            ).fetchone()
+        if not row or not self.has(row[0]):
+            return None
+        return {'digest': row[0], 'size': row[1], 'content_type': row[2]}
+
+    def put(self, data, url=None, content_type=None):
+        """
+        保存内容，已有相同内容时不重复写入
+
+        Args:
+            data: bytes
+            url: 内容的下载地址，给出时记入索引
+
+        Returns:
+            str: 内容哈希
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 先写临时文件再改名，中途崩溃不会留下不完整的内容
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+        if url:
+            with self.lock:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO url_index (url, digest, size, content_type, fetched_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (url, digest, len(data), content_type, time.time())
+                )
+                self.conn.commit()
+        return digest
+
+    def read(self, digest):
+        with open(self.object_path(digest), 'rb') as f:
+            return f.read()
+
+    def materialize(self, digest, dest_path):
+        """
+        在输出目录中生成文件：优先硬链接，不支持时复制
+
+        目标文件已存在时替换为存储中的内容
+        """
+        src = self.object_path(digest)
+        dest_dir = os.path.dirname(os.path.abspath(dest_path))
+        os.makedirs(dest_dir, exist_ok=True)
+
+        if os.path.exists(dest_path) and os.path.samefile(src, dest_path):
+            return dest_path
+
+        tmp_path = os.path.join(dest_dir, f".{os.path.basename(dest_path)}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            os.link(src, tmp_path)
+        except OSError:
+            # 跨分区或文件系统不支持硬链接
+            shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dest_path)
+        return dest_path
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
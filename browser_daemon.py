@@ -0,0 +1,237 @@
+"""
+常驻浏览器服务
+
+启动一个长期运行的Chrome（开启远程调试端口，使用固定的用户数据目录），
+ceshi2.0.py、geci.py、image_geci.py 启动时如果发现它在运行，就通过调试地址
+连接上去，在其中新开一个标签页使用，而不是每次冷启动一个新的Chrome。
+HTTP缓存、Cookie和网站会话在多次运行、多个工具之间保持，三个工具可以共用一个浏览器。
+
+用法:
+    python browser_daemon.py start [--headless] [--port 9222]
+    python browser_daemon.py status
+    python browser_daemon.py stop
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+import urllib.request
+
+
+BASE_URL = "https://s.myhkw.cn/"
+DEFAULT_PORT = 9222
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 浏览器用户数据目录，保存缓存、Cookie和网站会话
+PROFILE_DIR = os.path.join(APP_DIR, "browser_daemon_profile")
+
+# 记录常驻浏览器的调试地址和进程号
+STATE_FILE = os.path.join(APP_DIR, "browser_daemon.json")
+
+CHROME_PATHS = [
+    r"C:\Program Files\Google\Chrome\Application\chrome.exe",
+    r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
+    "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+]
+
+
+def find_chrome():
+    """查找Chrome可执行文件"""
+    for path in CHROME_PATHS:
+        if os.path.exists(path):
+            return path
+    for name in ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome"):
+        path = shutil.which(name)
+        if path:
+            return path
+    return None
+
+
+def load_state():
+    """读取常驻浏览器状态，没有时返回空字典"""
+    try:
+        with open(STATE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def daemon_address():
+    """常驻浏览器的调试地址"""
+    return load_state().get('address', f"127.0.0.1:{DEFAULT_PORT}")
+
+
+def is_running(address=None, timeout=0.5):
+    """检查调试地址上是否有浏览器在响应"""
+    address = address or daemon_address()
+    try:
+        with urllib.request.urlopen(f"http://{address}/json/version", timeout=timeout) as response:
+            return response.status == 200
+    except Exception:
+        return False
+
+
+def attach(driver_path=None, page_load_strategy=None, logging_prefs=None):
+    """
+    连接到常驻浏览器并新开一个标签页
+
+    Args:
+        driver_path: chromedriver路径，为None时由Selenium自行查找
+        page_load_strategy: 页面加载策略（会话级设置，连接时仍然生效）
+        logging_prefs: 日志设置，如 {'performance': 'ALL'}
+
+    Returns:
+        webdriver.Chrome: 已切换到新标签页的driver；常驻浏览器未运行时返回None
+    """
+    address = daemon_address()
+    if not is_running(address):
+        return None
+
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+
+    options = Options()
+    options.debugger_address = address
+    if page_load_strategy:
+        options.page_load_strategy = page_load_strategy
+    if logging_prefs:
+        options.set_capability('goog:loggingPrefs', logging_prefs)
+
+    service = Service(driver_path) if driver_path else Service()
+    driver = webdriver.Chrome(service=service, options=options)
+
+    # 每个工具使用自己的标签页，互不干扰
+    driver.switch_to.new_window('tab')
+    return driver
+
+
+def release(driver):
+    """工具退出时只关闭自己的标签页，常驻浏览器继续运行"""
+    try:
+        if len(driver.window_handles) > 1:
+            driver.close()
+    except Exception:
+        pass
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+def start(port=DEFAULT_PORT, headless=False):
+    """启动常驻浏览器"""
+    address = f"127.0.0.1:{port}"
+    if is_running(address):
+        print(f"常驻浏览器已在运行: {address}")
+        return True
+
+    chrome_path = find_chrome()
+    if not chrome_path:
+        print("错误：未找到Chrome浏览器")
+        return False
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    args = [
+        chrome_path,
+        f"--remote-debugging-port={port}",
+        f"--user-data-dir={PROFILE_DIR}",
+        "--no-first-run",
+        "--no-default-browser-check",
+        "--disable-blink-features=AutomationControlled",
+        "--disable-notifications",
+    ]
+    if headless:
+        args.append("--headless=new")
+    args.append(BASE_URL)
+
+    # 与当前终端分离，关闭终端后浏览器继续运行
+    kwargs = {'stdout': subprocess.DEVNULL, 'stderr': subprocess.DEVNULL}
+    if os.name == 'nt':
+        kwargs['creationflags'] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs['start_new_session'] = True
+    process = subprocess.Popen(args, **kwargs)
+
+    # 等待调试端口就绪
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        if is_running(address):
+            with open(STATE_FILE, 'w', encoding='utf-8') as f:
+                json.dump({'address': address, 'pid': process.pid, 'chrome': chrome_path,
+                           'started': time.strftime('%Y-%m-%d %H:%M:%S')}, f, ensure_ascii=False, indent=2)
+            print(f"✓ 常驻浏览器已启动: {address} (PID {process.pid})")
+            return True
+        time.sleep(0.2)
+
+    print("✗ 常驻浏览器启动超时")
+    return False
+
+
+def stop():
+    """关闭常驻浏览器"""
+    state = load_state()
+    address = state.get('address', f"127.0.0.1:{DEFAULT_PORT}")
+    if not is_running(address):
+        print("常驻浏览器未运行")
+    else:
+        # 通过调试协议让浏览器自行退出
+        try:
+            from selenium import webdriver
+            from selenium.webdriver.chrome.options import Options
+
+            options = Options()
+            options.debugger_address = address
+            driver = webdriver.Chrome(options=options)
+            driver.execute_cdp_cmd('Browser.close', {})
+        except Exception:
+            pid = state.get('pid')
+            if pid:
+                try:
+                    if os.name == 'nt':
+                        subprocess.run(['taskkill', '/PID', str(pid), '/T', '/F'], capture_output=True)
+                    else:
+                        os.kill(pid, 15)
+                except OSError:
+                    pass
+        print("✓ 常驻浏览器已关闭")
+
+    if os.path.exists(STATE_FILE):
+        os.remove(STATE_FILE)
+
+
+def status():
+    """显示常驻浏览器状态"""
+    state = load_state()
+    address = state.get('address', f"127.0.0.1:{DEFAULT_PORT}")
+    if is_running(address):
+        print(f"常驻浏览器运行中: {address}")
+        if state:
+            print(f"  PID: {state.get('pid')}  启动时间: {state.get('started')}")
+    else:
+        print("常驻浏览器未运行")
+
+
+def main():
+    args = sys.argv[1:]
+    command = args[0] if args else 'status'
+
+    port = DEFAULT_PORT
+    if '--port' in args:
+        port = int(args[args.index('--port') + 1])
+
+    if command == 'start':
+        start(port, headless='--headless' in args)
+    elif command == 'stop':
+        stop()
+    elif command == 'status':
+        status()
+    else:
+        print(__doc__)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""并行浏览器工作池
+
+N个独立的Chrome/chromedriver工作线程从同一个任务来源取任务，每个工作线程
+有自己的下载目录；浏览器崩溃或卡死时自动重启并把当前任务放回队列。
+"""
+import os
+import queue
+import shutil
+import threading
+import time
+
+
+# 下载未完成时Chrome使用的临时文件扩展名
+PARTIAL_DOWNLOAD_EXTENSIONS = ('.crdownload', '.tmp')
+
+
+class BrowserWorkerError(Exception):
+    """工作线程的浏览器不可用（崩溃、卡死被终止等），任务需要重新处理"""
+
+
+class BrowserWorker:
+    """一个工作线程及其专属的浏览器和下载目录"""
+    def __init__(self, worker_id, download_dir, driver_factory, log, label="浏览器"):
+        self.worker_id = worker_id
+        self.label = label
+        self.download_dir = download_dir
+        self.driver_factory = driver_factory
+        self.log = log
+        self.driver = None
+        self.busy_since = None  # 当前任务开始时间，空闲时为None
+        self.restarts = 0
+        self.killed = False
+
+    @property
+    def name(self):
+        return f"{self.label}{self.worker_id}"
+
+    def start_driver(self):
+        """启动浏览器"""
+        os.makedirs(self.download_dir, exist_ok=True)
+        self.driver = self.driver_factory(self.download_dir)
+        self.killed = False
+
+    def quit_driver(self):
+        """关闭浏览器，忽略错误"""
+        driver, self.driver = self.driver, None
+        if driver:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+    def restart_driver(self):
+        """重启浏览器"""
+        self.restarts += 1
+        self.log(f"[{self.name}] 正在重启浏览器 (第{self.restarts}次)")
+        self.quit_driver()
+        self.start_driver()
+
+    def kill_driver(self):
+        """强制结束卡死的浏览器进程，使阻塞中的WebDriver调用立即出错返回"""
+        self.killed = True
+        driver = self.driver
+        try:
+            driver.service.process.kill()
+        except Exception:
+            pass
+
+    def is_alive(self):
+        """检查浏览器是否仍可用"""
+        if self.killed or not self.driver:
+            return False
+        try:
+            self.driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+
+class BrowserWorkerPool:
+    """
+    并行浏览器工作池
+
+    Args:
+        driver_factory: 创建浏览器的函数，参数为该工作线程的下载目录
+        handler: 处理任务的函数 handler(worker, job)；浏览器不可用时应抛出BrowserWorkerError
+        worker_count: 工作线程（浏览器）数量
+        download_folder: 最终下载文件夹，各工作线程的下载目录建在其下
+        log: 日志函数
+        hang_timeout: 单个任务超过该时间（秒）视为卡死，强制重启浏览器
+        max_requeue: 同一任务因浏览器故障最多重新排队的次数
+        separate_download_dirs: 是否给每个工作线程单独的下载目录；多个标签页共享
+            同一个浏览器时设为False，全部直接下载到download_folder
+        worker_label: 日志中工作线程的名称，如"浏览器"、"标签页"
+        on_give_up: 任务超过重试上限被放弃时调用 on_give_up(job)，用于记录失败结果
+    """
+    def __init__(self, driver_factory, handler, worker_count, download_folder,
+                 log=print, hang_timeout=180, max_requeue=2,
+                 separate_download_dirs=True, worker_label="浏览器", on_give_up=None):
+        self.handler = handler
+        self.on_give_up = on_give_up
+        self.download_folder = download_folder
+        self.log = log
+        self.hang_timeout = hang_timeout
+        self.max_requeue = max_requeue
+        self.jobs = queue.Queue()  # 放回的任务
+        self.source = iter(())
+        self.source_lock = threading.Lock()
+        self.requeue_counts = {}
+        self.requeue_lock = threading.Lock()  # 多个工作线程同时放回任务、登记启动
+        self.started = 0
+        self.separate_download_dirs = separate_download_dirs
+        self.workers = [
+            BrowserWorker(
+                i,
+                os.path.join(download_folder, f"worker_{i}") if separate_download_dirs else download_folder,
+                driver_factory, log, worker_label
+            )
+            for i in range(1, max(1, worker_count) + 1)
+        ]
+        self.collect_lock = threading.Lock()
+        self.finished = threading.Event()
+
+    def run(self, jobs, should_continue=lambda: True, is_paused=lambda: False):
+        """
+        处理所有任务，阻塞直到任务取完或should_continue()返回False
+
+        jobs可以是生成器，工作线程空闲时才取下一个任务，不必事先列出全部任务。
+
+        Raises:
+            BrowserWorkerError: 没有一个工作线程的浏览器启动成功，任务都没有处理
+        """
+        self.source = iter(jobs)
+        self.started = 0
+        self.finished.clear()
+        threads = [
+            threading.Thread(target=self._worker_loop, args=(worker, should_continue, is_paused), daemon=True)
+            for worker in self.workers
+        ]
+        watchdog = threading.Thread(target=self._watchdog_loop, daemon=True)
+
+        for thread in threads:
+            thread.start()
+        watchdog.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.finished.set()
+        watchdog.join()
+        self.collect_downloads()
+
+        if not self.started:
+            raise BrowserWorkerError(f"{len(self.workers)} 个{self.workers[0].label}都没有启动成功，任务未处理")
+
+    def close(self):
+        """关闭所有浏览器"""
+        for worker in self.workers:
+            worker.quit_driver()
+
+    def _worker_loop(self, worker, should_continue, is_paused):
+        """工作线程主循环"""
+        try:
+            worker.start_driver()
+            self.log(f"[{worker.name}] 已启动，下载目录: {worker.download_dir}")
+        except Exception as e:
+            self.log(f"[{worker.name}] 启动失败: {e}")
+            return
+        with self.requeue_lock:
+            self.started += 1
+
+        while should_continue():
+            if is_paused():
+                time.sleep(0.5)
+                continue
+
+            job = self._next_job()
+            if job is None:
+                break
+
+            worker.busy_since = time.time()
+            try:
+                self.handler(worker, job)
+                if not worker.is_alive():
+                    raise BrowserWorkerError("浏览器在处理过程中失效")
+            except BrowserWorkerError as e:
+                self.log(f"[{worker.name}] {e}")
+                self._requeue(job)
+                self._recover(worker)
+            except Exception as e:
+                self.log(f"[{worker.name}] 处理任务出错: {e}")
+                if not worker.is_alive():
+                    self._requeue(job)
+                    self._recover(worker)
+            finally:
+                worker.busy_since = None
+
+            self.collect_downloads(worker)
+
+    def _next_job(self):
+        """先取放回队列的任务，再从任务来源取下一个；都没有时返回None"""
+        try:
+            return self.jobs.get_nowait()
+        except queue.Empty:
+            pass
+        with self.source_lock:
+            return next(self.source, None)
+
+    def _recover(self, worker):
+        """重启失效的浏览器，失败时稍后再试"""
+        try:
+            worker.restart_driver()
+        except Exception as e:
+            self.log(f"[{worker.name}] 重启浏览器失败: {e}")
+            time.sleep(5)
+
+    def requeue(self, job):
+        """把任务放回队列末尾，不重启浏览器（如网站暂时故障）"""
+        self.jobs.put(job)
+    
+    def _requeue(self, job):
+        """把任务放回队列，超过重试上限则放弃"""
+        key = repr(job)
+        with self.requeue_lock:
+            count = self.requeue_counts.get(key, 0)
+            if count < self.max_requeue:
+                self.requeue_counts[key] = count + 1
+        if count >= self.max_requeue:
+            self.log(f"任务多次因浏览器故障失败，放弃: {job}")
+            if self.on_give_up:
+                try:
+                    self.on_give_up(job)
+                except Exception as e:
+                    self.log(f"记录放弃的任务出错: {e}")
+            return
+        self.jobs.put(job)
+
+    def _watchdog_loop(self):
+        """检测卡死的工作线程"""
+        while not self.finished.wait(5):
+            now = time.time()
+            for worker in self.workers:
+                busy_since = worker.busy_since
+                if busy_since and now - busy_since > self.hang_timeout and not worker.killed:
+                    self.log(f"[{worker.name}] 任务超过{self.hang_timeout}秒未完成，强制重启浏览器")
+                    worker.kill_driver()
+
+    def collect_downloads(self, worker=None):
+        """把工作线程下载目录中已完成的文件移动到最终下载文件夹"""
+        if not self.separate_download_dirs:
+            return
+        workers = [worker] if worker else self.workers
+        with self.collect_lock:
+            for w in workers:
+                try:
+                    names = os.listdir(w.download_dir)
+                except OSError:
+                    continue
+
+                for name in names:
+                    if name.lower().endswith(PARTIAL_DOWNLOAD_EXTENSIONS):
+                        continue
+                    src = os.path.join(w.download_dir, name)
+                    dst = os.path.join(self.download_folder, name)
+                    if not os.path.isfile(src):
+                        continue
+                    if os.path.exists(dst):
+                        # 同名文件已存在，保留在工作目录中
+                        continue
+                    try:
+                        shutil.move(src, dst)
+                    except OSError as e:
+                        self.log(f"[{w.name}] 移动下载文件失败: {name} - {e}")
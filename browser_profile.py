@@ -0,0 +1,70 @@
+"""精简浏览器配置
+
+工具只需要搜索页上的几个链接和输入框，完整加载图片、字体、音频和第三方统计/广告
+脚本只会拖慢页面、浪费流量和渲染进程内存。精简模式下：
+- 页面加载策略为eager，DOM就绪即返回，其余等待交给site_waits的条件等待
+- 不加载图片（封面仍可从页面中取得地址，由HTTP客户端下载）
+- 屏蔽字体、媒体和常见的第三方域名
+"""
+
+
+# 屏蔽的字体文件
+FONT_PATTERNS = ['*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot']
+
+# 屏蔽的媒体文件（会点击下载按钮下载歌曲的工具不能屏蔽）
+MEDIA_PATTERNS = ['*.mp3', '*.m4a', '*.flac', '*.ogg', '*.wav', '*.aac', '*.mp4']
+
+# 屏蔽的图片文件：连接常驻浏览器时创建选项中的禁止图片设置不起作用，改为按地址屏蔽
+IMAGE_PATTERNS = ['*.jpg', '*.jpeg', '*.png', '*.gif', '*.webp', '*.bmp']
+
+# 屏蔽的第三方域名（统计、广告、外部字体）
+THIRD_PARTY_PATTERNS = [
+    '*googletagmanager.com*',
+    '*google-analytics.com*',
+    '*googlesyndication.com*',
+    '*doubleclick.net*',
+    '*fonts.googleapis.com*',
+    '*fonts.gstatic.com*',
+    '*hm.baidu.com*',
+    '*cnzz.com*',
+    '*51.la*',
+]
+
+
+def apply_lean_options(chrome_options, block_images=True):
+    """
+    在创建浏览器前设置精简选项
+
+    需在设置完其他prefs之后调用，这里会合并而不是覆盖已有的prefs
+    """
+    chrome_options.page_load_strategy = 'eager'
+
+    prefs = dict(chrome_options.experimental_options.get('prefs', {}))
+    if block_images:
+        prefs['profile.managed_default_content_settings.images'] = 2
+    chrome_options.add_experimental_option('prefs', prefs)
+
+    # 播放器不自动播放，也不出声
+    chrome_options.add_argument('--autoplay-policy=user-gesture-required')
+    chrome_options.add_argument('--mute-audio')
+
+
+def lean_blocked_urls(block_media=True, block_images=False):
+    """精简模式下屏蔽的地址模式"""
+    patterns = FONT_PATTERNS + THIRD_PARTY_PATTERNS
+    if block_media:
+        patterns = patterns + MEDIA_PATTERNS
+    if block_images:
+        patterns = patterns + IMAGE_PATTERNS
+    return patterns
+
+
+def apply_lean_blocking(driver, block_media=True, block_images=False):
+    """
+    浏览器创建后屏蔽字体、媒体和第三方请求
+
+    连接常驻浏览器（browser_daemon）时apply_lean_options的选项都不起作用，
+    需设置block_images=True按地址屏蔽图片
+    """
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': lean_blocked_urls(block_media, block_images)})
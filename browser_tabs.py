@@ -0,0 +1,285 @@
+"""单个Chrome内的多标签页并发
+
+一个webdriver.Chrome打开K个标签页，每个工作线程占用一个标签页。WebDriver
+同一时间只能操作一个窗口，所以每条命令都在锁内切换到自己的标签页再执行；
+页面跳转用脚本发起、不阻塞等待加载，等待期间释放锁，其他标签页可以继续
+发起搜索，多个页面在同一个浏览器里同时加载。
+
+共享浏览器必须以页面加载策略'none'创建：其他策略下chromedriver执行任何命令前都会
+等待当前标签页加载完，轮询加载状态的命令会在锁内阻塞到页面加载结束，各标签页实际上
+只能依次加载。
+
+各标签页的下载目录无法分开（Page.setDownloadBehavior 对整个浏览器生效），
+浏览器下载无法区分来自哪个标签页，所以标签页中不点击下载按钮，只下载歌词或用HTTP直接下载歌曲。
+
+比每个工作线程一个Chrome进程省内存，适合内存较小的机器。
+"""
+import os
+import threading
+import time
+
+from selenium.webdriver.remote.webelement import WebElement
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+
+# 读不到浏览器的页面加载超时设置时使用的超时（秒）
+PAGE_LOAD_TIMEOUT = 30
+
+# 等待页面加载时的轮询间隔（秒）
+POLL_INTERVAL = 0.1
+
+# 在旧页面上做标记后再跳转，新页面没有这个标记，以此区分新旧页面
+_NAVIGATE_SCRIPT = """
+window.__tabNavigating = true;
+window.location.href = arguments[0];
+"""
+
+_LOADED_SCRIPT = "return !window.__tabNavigating && document.readyState !== 'loading';"
+
+
+def page_load_timeout(driver):
+    """浏览器设置的页面加载超时（秒）"""
+    try:
+        return driver.timeouts.page_load or PAGE_LOAD_TIMEOUT
+    except Exception:
+        return PAGE_LOAD_TIMEOUT
+
+
+class TabbedBrowser:
+    """
+    共享一个浏览器的多个标签页
+
+    Args:
+        driver: 已初始化的浏览器（页面加载策略为'none'），它的第一个窗口作为第一个标签页；
+            为None时在打开第一个标签页时用driver_factory创建
+        driver_factory: 创建共享浏览器（首次或崩溃后）的函数，参数为下载目录
+        log: 日志函数
+        tab_setup: 可选，新开标签页后调用的函数，参数为driver（已切换到新标签页），
+            用于设置只对单个标签页生效的CDP选项
+    """
+    def __init__(self, driver, driver_factory, log=print, tab_setup=None):
+        self.driver = driver
+        self.driver_factory = driver_factory
+        self.log = log
+        self.tab_setup = tab_setup
+        self.lock = threading.RLock()
+        self.active_handle = None
+        self.home_handle = None
+        self.free_handles = []
+        self.page_load_timeout = PAGE_LOAD_TIMEOUT
+        if driver:
+            self._use_host(driver)
+    
+    def _use_host(self, driver):
+        """使用driver作为共享浏览器"""
+        self.driver = driver
+        # 只使用driver当前所在的窗口，浏览器中其他已有的标签页（如其他工具的）不动
+        self.home_handle = driver.current_window_handle
+        self.free_handles = [self.home_handle]
+        self.active_handle = self.home_handle
+        self.page_load_timeout = page_load_timeout(driver)
+        strategy = (getattr(driver, 'capabilities', None) or {}).get('pageLoadStrategy')
+        if strategy != 'none':
+            self.log(f"⚠ 共享浏览器的页面加载策略为 {strategy}，各标签页只能依次加载")
+
+    def is_alive(self):
+        """检查共享浏览器是否仍可用"""
+        if not self.driver:
+            return False
+        try:
+            self.driver.window_handles
+            return True
+        except Exception:
+            return False
+
+    def open_tab(self, download_dir=None):
+        """打开一个标签页，返回只操作该标签页的TabDriver（可直接作为BrowserWorkerPool的driver_factory）"""
+        with self.lock:
+            if not self.is_alive():
+                if self.driver:
+                    self.log("共享浏览器不可用，正在重新创建")
+                self._quit_host()
+                self._use_host(self.driver_factory(download_dir))
+
+            if self.free_handles:
+                handle = self.free_handles.pop(0)
+                self.driver.switch_to.window(handle)
+            else:
+                self.driver.switch_to.new_window('tab')
+                handle = self.driver.current_window_handle
+                if self.tab_setup:
+                    self.tab_setup(self.driver)
+            self.active_handle = handle
+
+            if download_dir:
+                self.driver.execute_cdp_cmd('Page.setDownloadBehavior', {
+                    'behavior': 'allow',
+                    'downloadPath': os.path.abspath(download_dir)
+                })
+
+        return TabDriver(self, handle)
+
+    def close_tab(self, handle):
+        """关闭标签页；driver原来所在的窗口保留给下次使用，避免浏览器会话结束"""
+        with self.lock:
+            try:
+                if handle != self.home_handle:
+                    self.driver.switch_to.window(handle)
+                    self.driver.close()
+                    self.active_handle = None
+                elif handle not in self.free_handles:
+                    self.free_handles.append(handle)
+                
+                # 让driver回到原来的窗口
+                if self.home_handle and self.active_handle != self.home_handle:
+                    self.driver.switch_to.window(self.home_handle)
+                    self.active_handle = self.home_handle
+            except Exception:
+                pass
+
+    def call(self, handle, func, args=(), kwargs=None):
+        """切换到指定标签页并执行一条WebDriver命令"""
+        with self.lock:
+            if self.active_handle != handle:
+                self.driver.switch_to.window(handle)
+                self.active_handle = handle
+            return func(*args, **(kwargs or {}))
+
+    def quit(self):
+        """关闭共享浏览器"""
+        with self.lock:
+            self._quit_host()
+    
+    def _quit_host(self):
+        """关闭共享浏览器，忽略错误"""
+        driver, self.driver = self.driver, None
+        self.active_handle = None
+        if driver:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+
+def _unwrap(value):
+    """把代理元素还原为真正的WebElement，以便作为脚本参数传给浏览器"""
+    if isinstance(value, TabElement):
+        return value.element
+    if isinstance(value, (list, tuple)):
+        return type(value)(_unwrap(v) for v in value)
+    return value
+
+
+class _TabProxy:
+    """在所属标签页中执行被代理对象的方法和属性"""
+    def __init__(self, tab, target):
+        self._tab = tab
+        self._target = target
+
+    def _resolve(self):
+        """被代理的对象"""
+        return self._target
+
+    def _call(self, func, *args, **kwargs):
+        args = [_unwrap(a) for a in args]
+        kwargs = {k: _unwrap(v) for k, v in kwargs.items()}
+        result = self._tab._browser.call(self._tab.handle, func, args, kwargs)
+        return self._tab._wrap(result)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        target = self._resolve()
+        if callable(getattr(type(target), name, None)):
+            method = getattr(target, name)
+            return lambda *args, **kwargs: self._call(method, *args, **kwargs)
+        # 属性（current_url、page_source、text等）同样要在自己的标签页中读取
+        return self._call(getattr, target, name)
+
+
+class TabElement(_TabProxy):
+    """标签页中的页面元素"""
+    def __init__(self, tab, element):
+        super().__init__(tab, element)
+        self.element = element
+
+
+class _TabSwitchTo:
+    """标签页只能停留在自己的窗口中，switch_to.window切换到自己时什么也不做"""
+    def __init__(self, tab):
+        self._tab = tab
+
+    def window(self, handle):
+        if handle != self._tab.handle:
+            raise WebDriverException("标签页模式下不能切换到其他窗口")
+
+    def __getattr__(self, name):
+        tab = self._tab
+        return tab._call(getattr, tab._browser.driver.switch_to, name)
+
+
+class TabDriver(_TabProxy):
+    """
+    只操作一个标签页的浏览器代理，接口与webdriver.Chrome相同，
+    原有使用self.driver的搜索、下载方法无需修改即可在标签页中运行
+    """
+    def __init__(self, browser, handle):
+        self._browser = browser
+        self.handle = handle
+        super().__init__(self, None)
+
+    def _resolve(self):
+        # 共享浏览器重新创建后自动使用新的driver
+        return self._browser.driver
+
+    def _wrap(self, value):
+        if isinstance(value, WebElement):
+            return TabElement(self, value)
+        if isinstance(value, list) and value and isinstance(value[0], WebElement):
+            return [TabElement(self, v) for v in value]
+        return value
+
+    @property
+    def window_handles(self):
+        return [self.handle]
+
+    @property
+    def current_window_handle(self):
+        return self.handle
+
+    @property
+    def switch_to(self):
+        return _TabSwitchTo(self)
+
+    @property
+    def service(self):
+        # 结束卡死的浏览器时针对整个共享浏览器，open_tab会重新创建
+        return self._browser.driver.service
+
+    def get(self, url):
+        """
+        发起跳转后释放锁等待新页面加载，其他标签页在此期间可以继续工作
+        
+        共享浏览器的页面加载策略为'none'时，轮询加载状态的脚本立即返回，只短暂占用锁；
+        超时与浏览器的页面加载超时设置相同。
+        """
+        self._call(self._browser.driver.execute_script, _NAVIGATE_SCRIPT, url)
+        
+        deadline = time.time() + self._browser.page_load_timeout
+        while time.time() < deadline:
+            try:
+                if self._call(self._browser.driver.execute_script, _LOADED_SCRIPT):
+                    return
+            except WebDriverException:
+                # 页面切换过程中执行脚本可能失败，继续等待
+                if not self._browser.is_alive():
+                    raise
+            time.sleep(POLL_INTERVAL)
+        raise TimeoutException(f"页面加载超时: {url}")
+
+    def quit(self):
+        """只关闭自己的标签页"""
+        self._browser.close_tab(self.handle)
+
+    def close(self):
+        self.quit()
@@ -12,9 +12,12 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
 import queue
 from datetime import datetime
+from urllib.parse import quote
+import site_waits
+import http_client
+import driver_resolver
 
 
 class MusicDownloadAssistant:
@@ -31,6 +34,7 @@ class MusicDownloadAssistant:
         self.is_running = False
         self.is_paused = False
         self.queue = queue.Queue()
+        self.base_url = "https://s.myhkw.cn/"
         
         # 创建界面
         self.create_widgets()
@@ -361,30 +365,7 @@ class MusicDownloadAssistant:
             
             # 使用你的配置
             chrome_path = r"C:\Program Files\Google\Chrome\Application\chrome.exe"
-            driver_path = "chromedriver.exe"  # 假设在当前目录
-            
-            if not os.path.exists(driver_path):
-                self.log_message("✗ ChromeDriver未找到")
-                
-                # 尝试其他位置
-                possible_paths = [
-                    "chromedriver.exe",
-                    "./chromedriver.exe",
-                    "C:/chromedriver/chromedriver.exe",
-                    os.path.join(os.path.dirname(__file__), "chromedriver.exe")
-                ]
-                
-                driver_found = False
-                for path in possible_paths:
-                    if os.path.exists(path):
-                        driver_path = path
-                        driver_found = True
-                        self.log_message(f"找到ChromeDriver: {path}")
-                        break
-                
-                if not driver_found:
-                    raise Exception("请将chromedriver.exe放在程序目录")
-            
+            driver_path = driver_resolver.resolve_driver(chrome_path, log=self.log_message)
             self.log_message(f"使用ChromeDriver: {driver_path}")
             
             # 设置Chrome选项 - 针对音乐网站优化
@@ -514,29 +495,20 @@ class MusicDownloadAssistant:
             # 等待结果
             time.sleep(1)
             
-            # 检查结果
-            page_source = self.driver.page_source
-            if "成功 Get √" in page_source:
+            # 检查结果（一次脚本调用读取全部字段）
+            page_data = site_waits.extract_page_data(self.driver) or {}
+            if page_data.get('success'):
                 self.log_message("✓ 搜索成功！")
                 
-                # 尝试查找下载信息
-                try:
-                    download_button = self.driver.find_element(By.ID, "j-src-btn")
+                # 下载信息
+                if page_data.get('song_url'):
                     self.log_message("✓ 找到下载按钮: j-src-btn")
                     
-                    # 获取下载信息
-                    try:
-                        song_name = self.driver.find_element(By.ID, "j-name").get_attribute('value')
-                        artist = self.driver.find_element(By.ID, "j-author").get_attribute('value')
-                        download_url = self.driver.find_element(By.ID, "j-src").get_attribute('value')
-                        
-                        self.log_message(f"歌曲: {song_name}")
-                        self.log_message(f"歌手: {artist}")
-                        self.log_message(f"下载URL: {download_url[:100]}...")
-                    except:
-                        pass
-                        
-                except:
+                    download_url = page_data.get('src') or ''
+                    self.log_message(f"歌曲: {page_data.get('song_name')}")
+                    self.log_message(f"歌手: {page_data.get('artist')}")
+                    self.log_message(f"下载URL: {download_url[:100]}...")
+                else:
                     self.log_message("⚠ 未找到下载按钮")
                 
                 messagebox.showinfo("测试成功", "搜索功能正常！\n请查看浏览器中的搜索结果。")
@@ -656,8 +628,52 @@ class MusicDownloadAssistant:
         # 处理完成
         self.queue.put(('process_complete', None))
     
+    def build_search_query(self, artist, song_name):
+        """构建搜索词 - 使用"歌曲 作者"格式"""
+        clean_song_name = song_name
+        clean_artist = artist
+        
+        # 清理歌曲名
+        # 移除括号内容、版本信息等
+        clean_song_name = clean_song_name.split('(')[0].split('（')[0].strip()
+        clean_song_name = clean_song_name.split('[')[0].split('【')[0].strip()
+        clean_song_name = clean_song_name.split('-')[0].strip()
+        
+        # 移除特定版本标签
+        version_indicators = ['(Live)', '(live)', '(DJ版)', '(DJ版)', '(Explicit)',
+                            '(Inst.)', '(Instrumental)', '(合唱版)', '(纯享版)',
+                            '(旧版)', '(新版)', '(回忆版)', '(节奏版)', '(弹唱版)',
+                            '(高燃摇滚版)', '(摇滚版)', '(Rehearsal Version)']
+        
+        for indicator in version_indicators:
+            clean_song_name = clean_song_name.replace(indicator, '').strip()
+        
+        # 清理歌手名
+        # 移除特殊字符和处理多个歌手的情况
+        clean_artist = clean_artist.split('（')[0].split('(')[0].strip()
+        clean_artist = clean_artist.split('_')[0].strip()
+        
+        # 处理歌手中的 "&" 和 "and"
+        if '&' in clean_artist:
+            # 取第一个歌手
+            clean_artist = clean_artist.split('&')[0].strip()
+        elif ' and ' in clean_artist.lower():
+            clean_artist = clean_artist.lower().split(' and ')[0].strip().title()
+        elif ' _ ' in clean_artist:
+            # 取第一个歌手
+            clean_artist = clean_artist.split(' _ ')[0].strip()
+        
+        # 构建搜索词：歌曲 作者
+        if clean_artist and len(clean_artist) > 1:
+            return f"{clean_song_name} {clean_artist}"
+        return clean_song_name
+    
+    def build_search_url(self, search_query):
+        """构建搜索URL（与geci.py中的格式一致）"""
+        return f"{self.base_url}?name={quote(search_query)}&type=qq"
+    
     def search_song(self, artist, song_name):
-        """搜索歌曲 - 使用"歌曲 作者"格式搜索"""
+        """搜索歌曲 - 优先直接访问搜索URL，失败时回退到表单输入"""
         try:
             self.log_message(f"正在搜索: {artist} - {song_name}")
             
@@ -667,150 +683,137 @@ class MusicDownloadAssistant:
             except:
                 pass
             
-            # 访问网站主页
-            self.driver.get("https://s.myhkw.cn/")
-            time.sleep(1)
-            
-            # 检查当前页面状态
-            page_source = self.driver.page_source
-            
-            # 判断是否在搜索结果页面
-            if "成功 Get √ 返回继续" in page_source:
-                self.log_message("当前在搜索结果页面，需要返回搜索页面")
-                
-                try:
-                    back_button = self.driver.find_element(By.ID, "j-back")
-                    back_button.click()
-                    self.log_message("已点击返回按钮")
-                    time.sleep(1)
-                except:
-                    self.driver.get("https://s.myhkw.cn/")
-                    time.sleep(1)
-            
-            # 查找搜索框
-            try:
-                search_box = self.driver.find_element(By.ID, "j-input")
-                self.log_message("✓ 找到搜索框: j-input")
-            except:
-                self.log_message("✗ 未找到搜索框")
-                return False
-            
-            # 清空搜索框
-            search_box.clear()
-            
-            # 优化搜索词格式：使用"歌曲 作者"格式
-            clean_song_name = song_name
-            clean_artist = artist
-            
-            # 清理歌曲名
-            # 移除括号内容、版本信息等
-            clean_song_name = clean_song_name.split('(')[0].split('（')[0].strip()
-            clean_song_name = clean_song_name.split('[')[0].split('【')[0].strip()
-            clean_song_name = clean_song_name.split('-')[0].strip()
-            
-            # 移除特定版本标签
-            version_indicators = ['(Live)', '(live)', '(DJ版)', '(DJ版)', '(Explicit)', 
-                                '(Inst.)', '(Instrumental)', '(合唱版)', '(纯享版)',
-                                '(旧版)', '(新版)', '(回忆版)', '(节奏版)', '(弹唱版)',
-                                '(高燃摇滚版)', '(摇滚版)', '(Rehearsal Version)']
-            
-            for indicator in version_indicators:
-                clean_song_name = clean_song_name.replace(indicator, '').strip()
-            
-            # 清理歌手名
-            # 移除特殊字符和处理多个歌手的情况
-            clean_artist = clean_artist.split('（')[0].split('(')[0].strip()
-            clean_artist = clean_artist.split('_')[0].strip()
-            
-            # 处理歌手中的 "&" 和 "and"
-            if '&' in clean_artist:
-                # 取第一个歌手
-                clean_artist = clean_artist.split('&')[0].strip()
-            elif ' and ' in clean_artist.lower():
-                clean_artist = clean_artist.lower().split(' and ')[0].strip().title()
-            elif ' _ ' in clean_artist:
-                # 取第一个歌手
-                clean_artist = clean_artist.split(' _ ')[0].strip()
-            
-            # 构建搜索词：歌曲 作者
-            if clean_artist and len(clean_artist) > 1:
-                search_query = f"{clean_song_name} {clean_artist}"
-            else:
-                search_query = clean_song_name
-            
+            search_query = self.build_search_query(artist, song_name)
             self.log_message(f"搜索词: {search_query}")
             
-            # 逐字符输入（模拟真人输入）
-            for char in search_query:
-                search_box.send_keys(char)
-                time.sleep(0.01)  # 稍微快一点
-            
-            # 选择QQ音乐源
-            try:
-                radio_inputs = self.driver.find_elements(By.XPATH, "//input[@type='radio']")
-                if len(radio_inputs) >= 2:
-                    qq_radio = radio_inputs[1]
-                    if not qq_radio.is_selected():
-                        qq_radio.click()
-                        self.log_message("✓ 已选择QQ音乐源")
-            except:
-                pass
-            
-            # 查找搜索按钮
-            try:
-                search_button = self.driver.find_element(By.ID, "j-submit")
-                self.log_message("✓ 找到搜索按钮: j-submit")
-            except:
-                self.log_message("✗ 未找到搜索按钮")
-                return False
-            
-            # 点击搜索按钮
-            try:
-                search_button.click()
-                self.log_message("已点击搜索按钮")
-            except:
-                self.driver.execute_script("arguments[0].click();", search_button)
-                self.log_message("已通过JavaScript点击搜索按钮")
-            
-            # 等待搜索结果
-            time.sleep(2)
-            
-            return self.check_search_result(song_name, artist)
+            # 直接访问搜索URL，一次页面跳转即可得到结果
+            if self.search_song_by_url(search_query):
+                return self.check_search_result(song_name, artist, require_marker=True)
             
+            self.log_message("⚠ 直接搜索未返回结果，改用表单输入搜索")
+            return self.search_song_by_form(artist, song_name, search_query)
+        
         except Exception as e:
             self.log_message(f"搜索异常: {e}")
             import traceback
             self.log_message(traceback.format_exc())
             return False
     
-    def check_search_result(self, song_name, artist):
+    def search_song_by_url(self, search_query):
+        """通过搜索URL直接搜索"""
+        try:
+            search_url = self.build_search_url(search_query)
+            self.driver.get(search_url)
+            self.log_message(f"已访问搜索URL: {search_url}")
+            
+            # 等待搜索结果出现
+            WebDriverWait(self.driver, 10).until(
+                lambda d: "成功 Get √" in d.page_source
+            )
+            return True
+        except Exception as e:
+            self.log_message(f"直接搜索失败: {e}")
+            return False
+    
+    def search_song_by_form(self, artist, song_name, search_query):
+        """通过搜索表单搜索（备用方式）"""
+        # 访问网站主页
+        self.driver.get(self.base_url)
+        time.sleep(1)
+        
+        # 检查当前页面状态
+        page_source = self.driver.page_source
+        
+        # 判断是否在搜索结果页面
+        if "成功 Get √ 返回继续" in page_source:
+            self.log_message("当前在搜索结果页面，需要返回搜索页面")
+            
+            try:
+                back_button = self.driver.find_element(By.ID, "j-back")
+                back_button.click()
+                self.log_message("已点击返回按钮")
+                time.sleep(1)
+            except:
+                self.driver.get(self.base_url)
+                time.sleep(1)
+        
+        # 查找搜索框
+        try:
+            search_box = self.driver.find_element(By.ID, "j-input")
+            self.log_message("✓ 找到搜索框: j-input")
+        except:
+            self.log_message("✗ 未找到搜索框")
+            return False
+        
+        # 清空搜索框
+        search_box.clear()
+        
+        # 逐字符输入（模拟真人输入）
+        for char in search_query:
+            search_box.send_keys(char)
+            time.sleep(0.01)  # 稍微快一点
+        
+        # 选择QQ音乐源
+        try:
+            radio_inputs = self.driver.find_elements(By.XPATH, "//input[@type='radio']")
+            if len(radio_inputs) >= 2:
+                qq_radio = radio_inputs[1]
+                if not qq_radio.is_selected():
+                    qq_radio.click()
+                    self.log_message("✓ 已选择QQ音乐源")
+        except:
+            pass
+        
+        # 查找搜索按钮
+        try:
+            search_button = self.driver.find_element(By.ID, "j-submit")
+            self.log_message("✓ 找到搜索按钮: j-submit")
+        except:
+            self.log_message("✗ 未找到搜索按钮")
+            return False
+        
+        # 点击搜索按钮
+        try:
+            search_button.click()
+            self.log_message("已点击搜索按钮")
+        except:
+            self.driver.execute_script("arguments[0].click();", search_button)
+            self.log_message("已通过JavaScript点击搜索按钮")
+        
+        # 等待搜索结果
+        time.sleep(2)
+        
+        return self.check_search_result(song_name, artist)
+    
+    def check_search_result(self, song_name, artist, require_marker=False):
         """检查搜索结果"""
         try:
-            current_url = self.driver.current_url
-            page_title = self.driver.title
-            page_source = self.driver.page_source
+            page_data = site_waits.extract_page_data(self.driver) or {}
+            current_url = page_data.get('url') or self.driver.current_url
             
             self.log_message(f"搜索后URL: {current_url}")
-            self.log_message(f"搜索后标题: {page_title}")
+            self.log_message(f"搜索后标题: {page_data.get('title', '')}")
             
             # 检查是否显示搜索结果
-            if "成功 Get √" in page_source:
+            if page_data.get('success'):
                 self.log_message("✓ 搜索成功: 显示'成功 Get √'")
                 
                 # 检查是否找到歌曲
-                if song_name in page_source or artist in page_source:
+                found = f"{page_data.get('song_name') or ''} {page_data.get('artist') or ''}"
+                if song_name in found or artist in found:
                     self.log_message(f"✓ 在页面中找到 '{song_name}'")
                 else:
                     self.log_message(f"⚠ 未在页面中找到 '{song_name}'，但搜索功能正常")
                 
                 return True
-            elif current_url != "https://s.myhkw.cn/":
+            elif not require_marker and current_url != self.base_url:
+                # 直接访问搜索URL时URL本身就已改变，不能作为成功依据
                 self.log_message(f"✓ 搜索成功: URL已改变")
                 return True
             else:
                 self.log_message("✗ 搜索可能失败")
                 return False
-            
+        
         except Exception as e:
             self.log_message(f"检查结果异常: {e}")
             return False
@@ -958,43 +961,15 @@ class MusicDownloadAssistant:
         try:
             self.log_message("正在查找歌词下载链接...")
             
-            # 查找所有链接，特别是歌词链接
-            all_links = self.driver.find_elements(By.TAG_NAME, "a")
-            
-            for link in all_links:
-                href = link.get_attribute('href')
-                if href and 'api.php' in href and 'get=lrc' in href:
-                    self.log_message(f"找到歌词链接: {href}")
-                    
-                    # 下载歌词文件
-                    return self.save_lrc_file(href, song)
-            
-            # 如果没有找到a标签的歌词链接，尝试查找其他元素
-            all_elements = self.driver.find_elements(By.XPATH, "//*[contains(text(), 'api.php')]")
-            for element in all_elements:
-                text = element.text
-                if 'api.php' in text and 'get=lrc' in text:
-                    self.log_message(f"找到歌词文本链接: {text}")
-                    
-                    # 提取URL
-                    import re
-                    url_match = re.search(r'https?://[^\s]+', text)
-                    if url_match:
-                        lrc_url = url_match.group(0)
-                        return self.save_lrc_file(lrc_url, song)
+            # 一次脚本调用读取歌词链接（脚本内依次查找歌词按钮、页面中的链接和页面文本）
+            page_data = site_waits.extract_page_data(self.driver) or {}
+            lrc_url = page_data.get('lyrics_url')
             
-            # 检查页面源代码中是否有歌词链接
-            page_source = self.driver.page_source
-            if 'get=lrc' in page_source:
-                # 使用正则表达式提取歌词URL
-                import re
-                lrc_pattern = r'https?://[^\s"\']*api\.php[^\s"\']*get=lrc[^\s"\']*'
-                matches = re.findall(lrc_pattern, page_source)
+            if lrc_url:
+                self.log_message(f"找到歌词链接: {lrc_url}")
                 
-                if matches:
-                    lrc_url = matches[0]
-                    self.log_message(f"从源代码中找到歌词链接: {lrc_url}")
-                    return self.save_lrc_file(lrc_url, song)
+                # 下载歌词文件
+                return self.save_lrc_file(lrc_url, song)
             
             self.log_message("未找到歌词下载链接")
             return False
@@ -1007,7 +982,6 @@ class MusicDownloadAssistant:
     def save_lrc_file(self, lrc_url, song):
         """保存歌词文件到本地"""
         try:
-            import requests
             from urllib.parse import unquote
             
             # 创建安全的文件名
@@ -1019,7 +993,7 @@ class MusicDownloadAssistant:
             lrc_path = os.path.join(self.download_folder, lrc_filename)
             
             # 下载歌词
-            response = requests.get(lrc_url, timeout=10)
+            response = http_client.get(lrc_url, timeout=10)
             
             if response.status_code == 200:
                 # 保存歌词文件
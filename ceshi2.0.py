@@ -8,13 +8,72 @@ import json
 import os
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
+from selenium.common.exceptions import TimeoutException
 import queue
 from datetime import datetime
+from urllib.parse import quote
+import site_waits
+import driver_resolver
+from browser_pool import BrowserWorkerPool, BrowserWorkerError
+from browser_tabs import TabbedBrowser, TabDriver
+import browser_profile
+import browser_daemon
+from resolver_cache import ResolverCache
+from blob_store import BlobStore
+import http_client
+from audio_downloader import (AudioDownloader, DownloadError, cookies_from_driver, existing_audio_file,
+                              fix_extension, guess_extension)
+from download_tracker import DownloadTracker
+from pipeline import Pipeline, Stage
+from pacing import Pacer, THROTTLE_STATUS_CODES
+import circuit_breaker
+from circuit_breaker import CircuitBreaker
+from progress_journal import ProgressJournal
+from job_store import JobStore, JobList, jobs_db_path
+from virtual_list import SongIndex, VirtualTreeview
+from log_hub import LogHub
+
+
+# 不再处理的歌曲状态（'暂缓重试'为近期反复失败、在等待期内跳过的歌曲）
+FINISHED_STATUSES = ['已下载', '已跳过', '搜索失败', '下载失败', '暂缓重试']
+
+# 熔断期间失败的歌曲最多放回待处理的次数，超过后按普通失败记录（每次熔断结束后重新计数）
+MAX_OUTAGE_RETRIES = 3
+
+# 一首歌曲在一次处理中最多出现多少次网站级失败（不随熔断结束清零），
+# 防止只有这一首歌曲的页面异常时反复触发熔断、永远放回待处理
+MAX_SYSTEMIC_FAILURES = circuit_breaker.FAILURE_THRESHOLD * (MAX_OUTAGE_RETRIES + 1)
+
+# 歌曲列表中显示的字段，只有这些字段变化时才需要刷新对应的行
+DISPLAY_FIELDS = ('status', 'artist', 'song_name', 'notes', 'song_downloaded', 'lrc_downloaded')
+
+# 歌曲列表最快的刷新间隔（毫秒，约一帧），期间的多次变化合并为一次刷新
+REFRESH_INTERVAL_MS = 16
+
+# 歌曲列表的状态筛选项（None为全部）
+STATUS_FILTERS = {
+    '全部': None,
+    '待处理': ['待处理', '搜索中'],
+    '已下载': ['已下载'],
+    '失败': ['搜索失败', '下载失败', '超时'],
+    '暂缓重试': ['暂缓重试'],
+    '已跳过': ['已跳过'],
+}
+
+# 输入筛选文本后等待多久再筛选（毫秒）
+FILTER_DELAY_MS = 300
+
+# 日志文件（超过大小后滚动，见log_hub）
+LOG_FILE = "music_assistant.log"
+
+# 日志框最多保留的行数
+LOG_MAX_LINES = 2000
+
+# 界面取日志的间隔（毫秒）和每次最多取出的条数
+LOG_DRAIN_MS = 100
+LOG_DRAIN_BATCH = 500
 
 
 class MusicDownloadAssistant:
@@ -25,12 +84,40 @@ class MusicDownloadAssistant:
         
         # 初始化变量
         self.songs_list = []
+        self.song_positions = {}  # id(歌曲) -> 在songs_list中的序号，记录进度时使用
         self.current_index = 0
         self.download_folder = ""
+        self.progress_journal = None  # 下载文件夹中的进度日志
+        self.job_store = None  # 任务数据库（超大歌单）
+        self.click_fallback = []  # 流水线中HTTP下载失败、需要点击下载的歌曲
+        self.dirty_rows = {}  # 等待刷新的行：序号 -> 显示字段
+        self.full_refresh = False  # 等待整个列表重建
+        self.refresh_scheduled = False
+        self.highlighted_index = None  # 列表中已选中的当前歌曲
+        self.list_index = SongIndex([])  # 歌曲列表的筛选索引
+        self.log_hub = LogHub(LOG_FILE)  # 各线程的日志先放入队列，由界面定时取出
+        self.filter_job = None
+        self.worker_context = threading.local()  # 并行模式下每个工作线程的浏览器
+        self.progress_lock = threading.Lock()
+        self.worker_pool = None
+        self.tab_browser = None  # 多标签页模式下共享的浏览器
+        self.warm_browser = False  # 是否连接的是常驻浏览器
+        self.home_window = None  # 本工具使用的标签页
+        self.browser_download_dir = None  # 浏览器实际使用的下载目录
+        self.resolver_cache = ResolverCache()  # 各工具共用的解析结果缓存
+        self.blob_store = BlobStore()          # 各工具共用的歌词/封面存储
+        self.audio_downloader = AudioDownloader(log=self.log_message)
+        self.download_trackers = {}  # 浏览器下载目录 -> 下载跟踪器
+        self.pacer = Pacer(log=self.log_message)  # 按网站响应调整请求间隔和并行数
+        self.breaker = CircuitBreaker(self.probe_site, log=self.log_message)  # 网站故障时暂停整个批次
+        self.outage_retries = {}  # 歌曲序号 -> 本次熔断期间放回待处理的次数
+        self.systemic_failures = {}  # 歌曲序号 -> 本次处理中网站级失败的次数
         self.driver = None
         self.is_running = False
         self.is_paused = False
         self.queue = queue.Queue()
+        self.manual_actions = queue.Queue()  # 等待手动下载时用户点击的"完成"/"跳过"
+        self.base_url = "https://s.myhkw.cn/"
         
         # 新增：下载选项默认值
         self.download_song_enabled = tk.BooleanVar(value=True)
@@ -38,6 +125,13 @@ class MusicDownloadAssistant:
         self.auto_click_download = tk.BooleanVar(value=True)  # 自动点击下载按钮
         self.retry_on_fail = tk.BooleanVar(value=True)        # 失败后重试
         self.retry_count = tk.IntVar(value=2)                 # 重试次数
+        self.worker_count = tk.IntVar(value=1)                # 并行数量（浏览器数或标签页数）
+        self.concurrency_mode = tk.StringVar(value="多浏览器")  # 并行方式：多浏览器 / 多标签页
+        self.lean_browser = tk.BooleanVar(value=False)        # 精简浏览器：不加载图片、字体和第三方脚本
+        self.skip_known_failures = tk.BooleanVar(value=True)  # 跳过近期反复失败、仍在等待期内的歌曲
+        self.native_download = tk.BooleanVar(value=True)      # 用HTTP直接下载歌曲文件，失败时再点击下载按钮
+        self.use_pipeline = tk.BooleanVar(value=True)         # 单浏览器时解析与下载流水线并行
+        self.use_job_store = tk.BooleanVar(value=False)       # 歌单保存在数据库中按需读取
         
         # 创建界面
         self.create_widgets()
@@ -49,6 +143,26 @@ class MusicDownloadAssistant:
         self.browser_initialized = False
         self.site_helper = None
     
+    @property
+    def driver(self):
+        """当前线程使用的浏览器（并行模式下为工作线程自己的浏览器）"""
+        worker = getattr(self.worker_context, 'worker', None)
+        return worker.driver if worker else self._driver
+    
+    @driver.setter
+    def driver(self, value):
+        self._driver = value
+    
+    @property
+    def browser_download_dir(self):
+        """当前线程的浏览器实际使用的下载目录"""
+        worker = getattr(self.worker_context, 'worker', None)
+        return worker.download_dir if worker else self._browser_download_dir
+    
+    @browser_download_dir.setter
+    def browser_download_dir(self, value):
+        self._browser_download_dir = value
+    
     def create_widgets(self):
         # 创建主框架
         main_frame = ttk.Frame(self.root, padding="10")
@@ -127,6 +241,33 @@ class MusicDownloadAssistant:
         self.options_status_label = ttk.Label(options_frame, text="当前选项: 下载歌曲和歌词")
         self.options_status_label.grid(row=1, column=3, sticky=tk.W, padx=(20, 0))
         
+        # 第三行选项
+        ttk.Checkbutton(options_frame, text="精简浏览器 (初始化时生效)", 
+                       variable=self.lean_browser).grid(row=2, column=0, padx=(0, 20))
+        
+        ttk.Label(options_frame, text="并行数:").grid(row=2, column=1, padx=(0, 5))
+        ttk.Spinbox(options_frame, from_=1, to=8, width=5,
+                   textvariable=self.worker_count).grid(row=2, column=2, padx=(0, 20))
+        
+        # 多标签页模式只启动一个Chrome，内存较小的机器也能并行
+        mode_frame = ttk.Frame(options_frame)
+        mode_frame.grid(row=2, column=3, sticky=tk.W, padx=(20, 0))
+        ttk.Label(mode_frame, text="并行方式:").pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Combobox(mode_frame, textvariable=self.concurrency_mode, width=10, state='readonly',
+                    values=["多浏览器", "多标签页"]).pack(side=tk.LEFT)
+        
+        ttk.Checkbutton(options_frame, text="跳过近期反复失败的歌曲", 
+                       variable=self.skip_known_failures).grid(row=3, column=0, padx=(0, 20))
+        
+        ttk.Checkbutton(options_frame, text="直接下载歌曲文件 (HTTP, 支持断点续传)", 
+                       variable=self.native_download).grid(row=3, column=1, columnspan=2, padx=(0, 20))
+        
+        ttk.Checkbutton(options_frame, text="流水线 (解析下一首时下载当前歌曲)", 
+                       variable=self.use_pipeline).grid(row=3, column=3, sticky=tk.W, padx=(20, 0))
+        
+        ttk.Checkbutton(options_frame, text="任务数据库 (超大歌单按需加载, 导入时生效)", 
+                       variable=self.use_job_store).grid(row=4, column=0, columnspan=2, sticky=tk.W)
+        
         # 5. 进度控制
         progress_frame = ttk.Frame(main_frame)
         progress_frame.grid(row=4, column=0, sticky=(tk.W, tk.E), pady=(0, 10))
@@ -172,7 +313,26 @@ class MusicDownloadAssistant:
         list_frame = ttk.LabelFrame(main_frame, text="歌曲列表", padding="10")
         list_frame.grid(row=7, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
         list_frame.columnconfigure(0, weight=1)
-        list_frame.rowconfigure(0, weight=1)
+        list_frame.rowconfigure(1, weight=1)
+        
+        # 筛选
+        filter_frame = ttk.Frame(list_frame)
+        filter_frame.grid(row=0, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 5))
+        
+        ttk.Label(filter_frame, text="状态:").pack(side=tk.LEFT, padx=(0, 5))
+        self.filter_status = tk.StringVar(value="全部")
+        status_combo = ttk.Combobox(filter_frame, textvariable=self.filter_status, width=8, state='readonly',
+                                    values=list(STATUS_FILTERS))
+        status_combo.pack(side=tk.LEFT, padx=(0, 15))
+        status_combo.bind('<<ComboboxSelected>>', lambda event: self.apply_filter())
+        
+        ttk.Label(filter_frame, text="歌手/歌曲名:").pack(side=tk.LEFT, padx=(0, 5))
+        self.filter_text = tk.StringVar()
+        self.filter_text.trace_add('write', lambda *args: self.schedule_filter())
+        ttk.Entry(filter_frame, textvariable=self.filter_text, width=30).pack(side=tk.LEFT, padx=(0, 15))
+        
+        self.filter_label = ttk.Label(filter_frame, text="")
+        self.filter_label.pack(side=tk.LEFT)
         
         # 创建Treeview
         columns = ('序号', '状态', '歌手', '歌曲名', '备注')
@@ -188,12 +348,13 @@ class MusicDownloadAssistant:
             else:
                 self.tree.column(col, width=150)
         
-        # 添加滚动条
-        scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        # 添加滚动条；Treeview中只放可见的行，滚动条按在全部歌曲中的位置显示
+        scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL)
+        self.song_view = VirtualTreeview(self.tree, scrollbar,
+                                         lambda index: self.row_values(index, self.songs_list[index]))
         
-        self.tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
-        scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.tree.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        scrollbar.grid(row=1, column=1, sticky=(tk.N, tk.S))
         
         # 8. 日志显示
         log_frame = ttk.LabelFrame(main_frame, text="操作日志", padding="10")
@@ -202,6 +363,7 @@ class MusicDownloadAssistant:
         log_frame.rowconfigure(0, weight=1)
         
         self.log_text = tk.Text(log_frame, height=8, wrap=tk.WORD)
+        self.log_text.tag_configure('error', foreground='red')
         log_scrollbar = ttk.Scrollbar(log_frame, orient=tk.VERTICAL, command=self.log_text.yview)
         self.log_text.configure(yscrollcommand=log_scrollbar.set)
         
@@ -238,13 +400,42 @@ class MusicDownloadAssistant:
         self.options_status_label.config(text=status)
         self.log_message(f"下载选项已更新: {status}")
     
-    def log_message(self, message):
-        """添加日志消息"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        log_entry = f"[{timestamp}] {message}\n"
-        self.log_text.insert(tk.END, log_entry)
-        self.log_text.see(tk.END)
-        self.root.update_idletasks()
+    def log_message(self, message, level='info'):
+        """
+        添加日志消息
+        
+        只放入日志队列（同时写入日志文件），任何线程都可以调用，不等待界面；
+        由drain_logs定时成批显示。
+        """
+        self.log_hub.put(message, level)
+    
+    def drain_logs(self):
+        """成批取出日志显示到日志框，日志框只保留最近LOG_MAX_LINES行"""
+        records = self.log_hub.drain(LOG_DRAIN_BATCH)
+        if records:
+            # 用户向上翻看日志时不自动滚到底部
+            at_bottom = self.log_text.yview()[1] >= 0.999
+            
+            # 相邻的同级别记录合并为一次插入
+            chunks = []
+            for record in records:
+                timestamp = datetime.fromtimestamp(record.time).strftime("%H:%M:%S")
+                line = f"[{timestamp}] {record.message}\n"
+                if chunks and chunks[-1][0] == record.level:
+                    chunks[-1][1].append(line)
+                else:
+                    chunks.append((record.level, [line]))
+            for level, lines in chunks:
+                self.log_text.insert(tk.END, ''.join(lines), level)
+            
+            lines = int(self.log_text.index('end-1c').split('.')[0])
+            if lines > LOG_MAX_LINES:
+                self.log_text.delete('1.0', f'{lines - LOG_MAX_LINES + 1}.0')
+            if at_bottom:
+                self.log_text.see(tk.END)
+        
+        # 还有积压时尽快再取一批
+        self.root.after(1 if len(records) == LOG_DRAIN_BATCH else LOG_DRAIN_MS, self.drain_logs)
     
     def clear_log(self):
         """清空日志"""
@@ -259,14 +450,22 @@ class MusicDownloadAssistant:
         
         if file_path:
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                # 解析歌曲列表
-                self.songs_list = self.parse_songs(content)
+                if self.use_job_store.get():
+                    self.load_songs_into_store(file_path)
+                else:
+                    with open(file_path, 'r', encoding='utf-8') as f:
+                        content = f.read()
+                    
+                    # 解析歌曲列表
+                    self.songs_list = self.parse_songs(content)
+                    self.current_index = 0
+                    
+                    # 下载文件夹中有同一列表的进度时可以继续
+                    self.restore_progress()
+                    self.index_songs()
                 
                 # 更新显示
-                self.update_songs_display()
+                self.update_songs_display(keep_position=False)
                 self.update_progress_display()
                 
                 self.log_message(f"成功导入 {len(self.songs_list)} 首歌曲")
@@ -275,10 +474,57 @@ class MusicDownloadAssistant:
                 messagebox.showerror("错误", f"读取文件失败: {e}")
                 self.log_message(f"读取文件失败: {e}")
     
+    def load_songs_into_store(self, file_path):
+        """
+        把歌曲文件导入任务数据库
+        
+        逐行解析、分批写入，不把整个歌单读入内存；数据库中已是同一列表时询问是否继续上次的进度。
+        """
+        folder = self.folder_path_var.get()
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        path = jobs_db_path(folder)
+        if self.job_store is None or self.job_store.path != path:
+            if self.job_store:
+                self.job_store.close()
+            self.job_store = JobStore(path)
+        store = self.job_store
+        
+        counts = store.count_by_status()
+        finished = sum(counts.get(status, 0) for status in FINISHED_STATUSES)
+        resume = False
+        if finished:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                same_list = store.same_songs(self.iter_songs(f, quiet=True, dedupe=False))
+            if same_list:
+                resume = messagebox.askyesno(
+                    "继续上次进度",
+                    f"任务数据库中有这个歌曲列表的进度（已处理 {finished}/{sum(counts.values())} 首）。\n\n是否继续上次的进度？")
+        
+        if resume:
+            self.log_message(f"已恢复上次进度: 已处理 {finished}/{sum(counts.values())} 首")
+        else:
+            # 重复的歌曲由数据库的歌曲键唯一索引跳过
+            with open(file_path, 'r', encoding='utf-8') as f:
+                count = store.replace_all(self.iter_songs(f, dedupe=False))
+            self.log_message(f"去重后 {count} 首")
+        
+        self.songs_list = JobList(store)
+        self.current_index = 0
+        self.log_message(f"任务数据库: {path}")
+    
     def parse_songs(self, content):
         """解析歌曲文本 - 针对新格式"""
-        songs = []
-        lines = content.split('\n')
+        return list(self.iter_songs(content.split('\n')))
+    
+    def iter_songs(self, lines, quiet=False, dedupe=True):
+        """
+        逐行解析歌曲（可以直接传入文件对象，超大歌单不必整个读入内存）
+        
+        dedupe为True时在内存中记住已解析的歌曲并去重；导入任务数据库时由数据库去重。
+        """
+        total = 0
+        seen = set() if dedupe else None
         
         for line in lines:
             line = line.strip()
@@ -317,7 +563,18 @@ class MusicDownloadAssistant:
                         if '_' in artist:
                             artist = artist.replace('_', ' ')
                         
-                        songs.append({
+                        total += 1
+                        
+                        # 去重，避免重复歌曲
+                        key = f"{song_name}|{artist}"
+                        if seen is not None:
+                            if key in seen:
+                                if not quiet:
+                                    self.log_message(f"跳过重复歌曲: {song_name} - {artist}")
+                                continue
+                            seen.add(key)
+                        
+                        yield {
                             'artist': artist,
                             'song_name': song_name,
                             'status': '待处理',
@@ -325,64 +582,131 @@ class MusicDownloadAssistant:
                             'song_downloaded': False,
                             'lrc_downloaded': False,
                             'attempts': 0  # 尝试次数
-                        })
+                        }
                         
             except Exception as e:
                 # 如果解析失败，记录但继续
-                self.log_message(f"解析行失败: {line} - 错误: {e}")
+                if not quiet:
+                    self.log_message(f"解析行失败: {line} - 错误: {e}")
                 continue
         
-        # 去重，避免重复歌曲
-        unique_songs = []
-        seen = set()
-        
-        for song in songs:
-            key = f"{song['song_name']}|{song['artist']}"
-            if key not in seen:
-                seen.add(key)
-                unique_songs.append(song)
+        if not quiet:
+            if seen is None:
+                self.log_message(f"解析完成: 共 {total} 首歌曲")
             else:
-                self.log_message(f"跳过重复歌曲: {song['song_name']} - {song['artist']}")
-        
-        self.log_message(f"解析完成: 共 {len(songs)} 首歌曲，去重后 {len(unique_songs)} 首")
-        return unique_songs
-    
-    def update_songs_display(self):
-        """更新歌曲列表显示"""
-        # 清空现有项目
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        # 添加新项目
-        for i, song in enumerate(self.songs_list):
-            status = song.get('status', '待处理')
-            
-            # 如果同时记录了下载状态，添加到备注中
-            notes = song.get('notes', '')
-            if song.get('song_downloaded', False):
-                notes += " 歌曲✓" if not notes else " | 歌曲✓"
-            if song.get('lrc_downloaded', False):
-                notes += " 歌词✓" if not notes else " | 歌词✓"
-            
-            self.tree.insert('', 'end', values=(
-                i + 1,
-                status,
-                song.get('artist', ''),
-                song.get('song_name', ''),
-                notes
-            ))
-        
-        # 高亮显示当前歌曲
-        if self.current_index < len(self.songs_list):
-            self.tree.selection_set(self.tree.get_children()[self.current_index])
-            self.tree.see(self.tree.get_children()[self.current_index])
+                self.log_message(f"解析完成: 共 {total} 首歌曲，去重后 {len(seen)} 首")
+    
+    def row_values(self, index, song):
+        """歌曲列表中一行的显示内容"""
+        status = song.get('status') or '待处理'
+        
+        # 如果同时记录了下载状态，添加到备注中
+        notes = song.get('notes') or ''
+        if song.get('song_downloaded', False):
+            notes += " 歌曲✓" if not notes else " | 歌曲✓"
+        if song.get('lrc_downloaded', False):
+            notes += " 歌词✓" if not notes else " | 歌词✓"
+        
+        return (index + 1, status, song.get('artist') or '', song.get('song_name') or '', notes)
+    
+    def update_songs_display(self, keep_position=True):
+        """
+        重建筛选索引并刷新歌曲列表（导入歌曲等整体变化时使用，单首歌曲的变化见notify_song）
+        
+        列表中只放可见的行，行的iid为歌曲序号，单独刷新某一行时直接定位。
+        """
+        self.dirty_rows.clear()
+        if isinstance(self.songs_list, JobList):
+            # 任务数据库自带状态索引
+            self.list_index = self.songs_list
+        else:
+            self.list_index = SongIndex(self.songs_list)
+        self.apply_filter(keep_position)
+        
+        self.highlighted_index = None
+        self.highlight_current()
+    
+    def apply_filter(self, keep_position=False):
+        """按状态和歌手/歌曲名筛选歌曲列表"""
+        self.filter_job = None
+        rows = self.list_index.filter(STATUS_FILTERS.get(self.filter_status.get()), self.filter_text.get())
+        self.song_view.set_rows(rows, self.song_view.top if keep_position else 0)
+        if len(rows) == len(self.songs_list):
+            self.filter_label.config(text="")
+        else:
+            self.filter_label.config(text=f"显示 {len(rows)} / {len(self.songs_list)} 首")
+    
+    def schedule_filter(self):
+        """输入筛选文本时稍等再筛选，连续输入只筛选一次"""
+        if self.filter_job:
+            self.root.after_cancel(self.filter_job)
+        self.filter_job = self.root.after(FILTER_DELAY_MS, self.apply_filter)
+    
+    def highlight_current(self):
+        """高亮显示当前歌曲（当前歌曲变化时才移动，不打断用户滚动列表）"""
+        if self.current_index == self.highlighted_index or self.current_index >= len(self.songs_list):
+            return
+        if self.song_view.see(self.current_index):
+            self.highlighted_index = self.current_index
+    
+    def song_index(self, song):
+        """歌曲在songs_list中的序号"""
+        if '_id' in song:
+            return song['_id']
+        return self.song_positions.get(id(song))
+    
+    def notify_song(self, song):
+        """
+        通知界面一首歌曲的显示内容有变化（可在工作线程中调用）
+        
+        只发送这首歌曲的序号和显示字段的副本，界面只更新这一行。
+        """
+        index = self.song_index(song)
+        if index is None:
+            self.queue.put(('update_display', None))
+            return
+        fields = {key: song.get(key) for key in DISPLAY_FIELDS}
+        self.queue.put(('update_row', (index, fields)))
+    
+    def request_refresh(self, index=None, fields=None):
+        """
+        登记需要刷新的行（index为None时重建整个列表）
+        
+        一个刷新间隔内的多次变化合并，同一行只保留最新的内容，最多每帧刷新一次。
+        """
+        if index is None:
+            self.full_refresh = True
+            self.dirty_rows.clear()
+        elif not self.full_refresh:
+            self.dirty_rows[index] = fields
+        
+        if not self.refresh_scheduled:
+            self.refresh_scheduled = True
+            self.root.after(REFRESH_INTERVAL_MS, self.refresh_display)
+    
+    def refresh_display(self):
+        """把登记的变化应用到歌曲列表和进度显示"""
+        self.refresh_scheduled = False
+        if self.full_refresh:
+            self.full_refresh = False
+            self.update_songs_display()
+        else:
+            rows, self.dirty_rows = self.dirty_rows, {}
+            for index, fields in rows.items():
+                if isinstance(self.list_index, SongIndex):
+                    self.list_index.update(index, fields)
+                # 不在可见范围内的行滚动到时再从歌曲列表读取
+                if self.tree.exists(str(index)):
+                    self.tree.item(str(index), values=self.row_values(index, fields))
+            self.highlight_current()
+        self.update_progress_display()
     
     def update_progress_display(self):
         """更新进度显示"""
         total = len(self.songs_list)
         if total > 0:
-            processed = sum(1 for song in self.songs_list 
-                          if song.get('status') in ['已下载', '已跳过', '搜索失败', '下载失败'])
+            counts = self.status_counts()
+            processed = sum(counts.get(status, 0) for status in FINISHED_STATUSES)
             progress = (processed / total) * 100 if total > 0 else 0
             self.progress_var.set(progress)
             
@@ -416,6 +740,102 @@ class MusicDownloadAssistant:
         else:
             messagebox.showinfo("提示", "浏览器已经初始化")
     
+    def create_driver(self, download_dir=None, page_load_strategy=None):
+        """
+        创建Chrome浏览器，download_dir为该浏览器的下载目录（并行模式下每个浏览器各不相同）
+        
+        page_load_strategy指定页面加载策略（如多标签页的共享浏览器使用'none'），
+        不指定时为默认策略，精简模式下为'eager'。
+        """
+        # 使用你的配置
+        chrome_path = r"C:\Program Files\Google\Chrome\Application\chrome.exe"
+        driver_path = driver_resolver.resolve_driver(chrome_path, log=self.log_message)
+        self.log_message(f"使用ChromeDriver: {driver_path}")
+        
+        lean = self.lean_browser.get()
+        
+        # 常驻浏览器（browser_daemon.py）在运行时直接连接，不再冷启动
+        # （并行模式的工作浏览器需要各自的下载目录，仍然单独启动）
+        if download_dir is None:
+            driver = browser_daemon.attach(driver_path, page_load_strategy='eager' if lean else None)
+            if driver:
+                self.warm_browser = True
+                self.log_message(f"✓ 已连接常驻浏览器: {browser_daemon.daemon_address()}")
+                if lean:
+                    browser_profile.apply_lean_blocking(driver, block_media=False, block_images=True)
+                driver.set_page_load_timeout(30)
+                driver.implicitly_wait(10)
+                return driver
+        
+        # 设置Chrome选项 - 针对音乐网站优化
+        chrome_options = Options()
+        chrome_options.binary_location = chrome_path
+        
+        # 基础选项
+        chrome_options.add_argument('--no-sandbox')
+        chrome_options.add_argument('--disable-dev-shm-usage')
+        chrome_options.add_argument('--window-size=1920,1080')
+        chrome_options.add_argument('--start-maximized')
+        
+        # 避免被检测为自动化工具
+        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+        chrome_options.add_experimental_option('useAutomationExtension', False)
+        
+        # 用户代理
+        chrome_options.add_argument('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36')
+        
+        # 禁用自动化特征
+        chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+        
+        # 其他有用的选项
+        chrome_options.add_argument('--disable-extensions')
+        chrome_options.add_argument('--disable-popup-blocking')
+        chrome_options.add_argument('--disable-notifications')
+        
+        # 指定下载目录
+        if download_dir:
+            chrome_options.add_experimental_option("prefs", {
+                "download.default_directory": os.path.abspath(download_dir),
+                "download.prompt_for_download": False,
+            })
+        
+        # 精简模式：eager加载，不加载图片
+        if lean:
+            browser_profile.apply_lean_options(chrome_options)
+        if page_load_strategy:
+            chrome_options.page_load_strategy = page_load_strategy
+        
+        # 创建driver
+        service = Service(driver_path)
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+        
+        # 执行JavaScript绕过检测
+        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        
+        # 精简模式：屏蔽字体和第三方请求（歌曲需要点击下载，不屏蔽媒体文件）
+        if lean:
+            browser_profile.apply_lean_blocking(driver, block_media=False)
+        
+        # 设置超时时间
+        driver.set_page_load_timeout(30)
+        driver.implicitly_wait(10)
+        
+        return driver
+    
+    def create_tab_host(self, download_dir=None):
+        """
+        多标签页模式的共享浏览器
+        
+        单独启动（不连接常驻浏览器，也不使用主浏览器），页面加载策略为'none'，
+        标签页等待页面加载时不阻塞其他标签页。
+        """
+        return self.create_driver(download_dir or self.download_folder, page_load_strategy='none')
+    
+    def setup_tab(self, driver):
+        """多标签页模式下新开标签页的设置（网络屏蔽只对单个标签页生效）"""
+        if self.lean_browser.get():
+            browser_profile.apply_lean_blocking(driver, block_media=False)
+    
     def initialize_browser_thread(self):
         """修复版的浏览器初始化方法"""
         try:
@@ -423,78 +843,20 @@ class MusicDownloadAssistant:
             self.browser_status_label.config(text="浏览器状态: 正在初始化...")
             self.init_browser_button.config(state=tk.DISABLED)
             
-            # 使用你的配置
-            chrome_path = r"C:\Program Files\Google\Chrome\Application\chrome.exe"
-            driver_path = "chromedriver.exe"  # 假设在当前目录
-            
-            if not os.path.exists(driver_path):
-                self.log_message("✗ ChromeDriver未找到")
-                
-                # 尝试其他位置
-                possible_paths = [
-                    "chromedriver.exe",
-                    "./chromedriver.exe",
-                    "C:/chromedriver/chromedriver.exe",
-                    os.path.join(os.path.dirname(__file__), "chromedriver.exe")
-                ]
-                
-                driver_found = False
-                for path in possible_paths:
-                    if os.path.exists(path):
-                        driver_path = path
-                        driver_found = True
-                        self.log_message(f"找到ChromeDriver: {path}")
-                        break
-                
-                if not driver_found:
-                    raise Exception("请将chromedriver.exe放在程序目录")
-            
-            self.log_message(f"使用ChromeDriver: {driver_path}")
-            
-            # 设置Chrome选项 - 针对音乐网站优化
-            chrome_options = Options()
-            chrome_options.binary_location = chrome_path
-            
-            # 基础选项
-            chrome_options.add_argument('--no-sandbox')
-            chrome_options.add_argument('--disable-dev-shm-usage')
-            chrome_options.add_argument('--window-size=1920,1080')
-            chrome_options.add_argument('--start-maximized')
-            
-            # 避免被检测为自动化工具
-            chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-            chrome_options.add_experimental_option('useAutomationExtension', False)
-            
-            # 用户代理
-            chrome_options.add_argument('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36')
-            
-            # 禁用自动化特征
-            chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-            
-            # 其他有用的选项
-            chrome_options.add_argument('--disable-extensions')
-            chrome_options.add_argument('--disable-popup-blocking')
-            chrome_options.add_argument('--disable-notifications')
-            
-            # 创建driver
-            service = Service(driver_path)
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
-            
-            # 执行JavaScript绕过检测
-            self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-            
-            # 设置超时时间
-            self.driver.set_page_load_timeout(30)
-            self.driver.implicitly_wait(10)
+            self.driver = self.create_driver()
+            self.home_window = self.driver.current_window_handle
             
             self.log_message("✓ WebDriver创建成功")
             
+            if self.concurrency_mode.get() == "多标签页":
+                self.log_message("多标签页模式: 并行处理时另外启动一个浏览器，在其中打开多个标签页")
+            
             # 访问网站
             self.log_message("正在访问音乐网站...")
             
             try:
                 self.driver.get("https://s.myhkw.cn/")
-                time.sleep(1)
+                site_waits.wait_for_search_page(self.driver)
                 
                 # 检查页面元素，确认网站结构
                 try:
@@ -556,10 +918,11 @@ class MusicDownloadAssistant:
             
             # 刷新到主页
             self.driver.get("https://s.myhkw.cn/")
-            time.sleep(1)
             
-            # 查找搜索框
-            search_box = self.driver.find_element(By.ID, "j-input")
+            # 查找搜索框（出现即继续）
+            search_box = site_waits.wait_for_search_page(self.driver)
+            if not search_box:
+                raise Exception("未找到搜索框: j-input")
             self.log_message("✓ 找到搜索框: j-input")
             
             # 输入搜索词
@@ -575,32 +938,23 @@ class MusicDownloadAssistant:
             search_button.click()
             self.log_message("已点击搜索按钮")
             
-            # 等待结果
-            time.sleep(1)
+            # 等待结果（成功或无结果状态出现即继续）
+            site_waits.wait_for_search_result(self.driver)
             
-            # 检查结果
-            page_source = self.driver.page_source
-            if "成功 Get √" in page_source:
+            # 检查结果（一次脚本调用读取全部字段）
+            page_data = site_waits.extract_page_data(self.driver) or {}
+            if page_data.get('success'):
                 self.log_message("✓ 搜索成功！")
                 
-                # 尝试查找下载信息
-                try:
-                    download_button = self.driver.find_element(By.ID, "j-src-btn")
+                # 下载信息
+                if page_data.get('song_url'):
                     self.log_message("✓ 找到下载按钮: j-src-btn")
                     
-                    # 获取下载信息
-                    try:
-                        song_name = self.driver.find_element(By.ID, "j-name").get_attribute('value')
-                        artist = self.driver.find_element(By.ID, "j-author").get_attribute('value')
-                        download_url = self.driver.find_element(By.ID, "j-src").get_attribute('value')
-                        
-                        self.log_message(f"歌曲: {song_name}")
-                        self.log_message(f"歌手: {artist}")
-                        self.log_message(f"下载URL: {download_url[:100]}...")
-                    except:
-                        pass
-                        
-                except:
+                    download_url = page_data.get('src') or ''
+                    self.log_message(f"歌曲: {page_data.get('song_name')}")
+                    self.log_message(f"歌手: {page_data.get('artist')}")
+                    self.log_message(f"下载URL: {download_url[:100]}...")
+                else:
                     self.log_message("⚠ 未找到下载按钮")
                 
                 messagebox.showinfo("测试成功", "搜索功能正常！\n请查看浏览器中的搜索结果。")
@@ -622,7 +976,11 @@ class MusicDownloadAssistant:
             messagebox.showwarning("警告", "请选择下载文件夹")
             return
         
-        if not self.browser_initialized or not self.driver:
+        # 并行模式由工作池自行启动浏览器（或多标签页的共享浏览器），单线程模式需要先初始化浏览器；
+        # 可以用解析缓存时先开始，缓存之外还有歌曲时由处理线程提示（逐首查缓存不放在界面线程中）
+        own_browsers = self.worker_count.get() > 1
+        if (not own_browsers and (not self.browser_initialized or not self.driver)
+                and not self.cache_fields()):
             messagebox.showwarning("警告", "请先初始化浏览器")
             return
         
@@ -631,13 +989,32 @@ class MusicDownloadAssistant:
             messagebox.showwarning("警告", "请至少选择一个下载选项（歌曲或歌词）")
             return
         
-        # 创建下载文件夹
+        # 创建下载文件夹；更换了文件夹时原来的下载跟踪器不再使用
+        if self.folder_path_var.get() != self.download_folder:
+            self.close_download_trackers()
         self.download_folder = self.folder_path_var.get()
         os.makedirs(self.download_folder, exist_ok=True)
         
+        # 以当前列表写一份完整进度，之后每首歌曲只追加变化
+        self.save_progress()
+        
+        # 让浏览器把歌曲下载到下载文件夹，便于检测下载是否开始
+        # （并行模式下各工作浏览器在创建时已指定自己的下载目录）
+        self.browser_download_dir = None
+        if self.driver:
+            try:
+                self.driver.execute_cdp_cmd('Page.setDownloadBehavior', {
+                    'behavior': 'allow',
+                    'downloadPath': os.path.abspath(self.download_folder)
+                })
+                self.browser_download_dir = self.download_folder
+            except Exception as e:
+                self.log_message(f"设置浏览器下载目录失败: {e}")
+        
         # 记录当前下载选项
         self.log_message(f"下载选项: 歌曲={self.download_song_enabled.get()}, 歌词={self.download_lrc_enabled.get()}")
         self.log_message(f"自动点击: {self.auto_click_download.get()}, 重试: {self.retry_on_fail.get()}({self.retry_count.get()}次)")
+        self.log_message(f"并行数: {self.worker_count.get()} ({self.concurrency_mode.get()})")
         
         # 启动处理线程
         self.is_running = True
@@ -662,236 +1039,788 @@ class MusicDownloadAssistant:
     
     def process_songs(self):
         """处理歌曲的主循环"""
+        # 先处理命中解析缓存的歌曲，全部命中时不需要浏览器
+        self.process_cached_songs()
+        
+        # 近期反复失败的歌曲在等待期内不再搜索
+        self.defer_known_failures()
+        
+        worker_count = max(1, self.worker_count.get())
+        if (worker_count == 1 and self.is_running and not self.driver
+                and self.next_pending_index(0) < len(self.songs_list)):
+            self.queue.put(('process_aborted', "还有歌曲未命中解析缓存，请先初始化浏览器"))
+            return
+        self.pacer = Pacer(max_workers=worker_count, log=self.log_message)
+        self.breaker.stop()
+        self.breaker = CircuitBreaker(self.probe_site, log=self.log_message, on_close=self.reset_outage_retries)
+        self.outage_retries = {}
+        self.systemic_failures = {}
+        if worker_count > 1:
+            self.process_songs_parallel(worker_count)
+            self.queue.put(('process_complete', None))
+            return
+        
+        if self.can_pipeline():
+            self.process_songs_pipelined()
+            # 改为点击下载的歌曲在后台跟踪，停止处理时跟踪器会关闭，先等待下载结束
+            self.wait_for_browser_downloads()
+            self.queue.put(('process_complete', None))
+            return
+        
         # 找到第一个未处理的歌曲
-        for i, song in enumerate(self.songs_list):
-            if song.get('status') not in ['已下载', '已跳过', '搜索失败', '下载失败']:
-                self.current_index = i
-                break
+        self.current_index = self.next_pending_index(0)
         
         while self.is_running and self.current_index < len(self.songs_list):
-            if self.is_paused:
+            # 用户暂停或网站故障熔断时等待
+            if self.is_paused or self.breaker.is_open:
                 time.sleep(1)
                 continue
             
             try:
                 song = self.songs_list[self.current_index]
                 
-                # 如果已经处理过，跳过
-                if song.get('status') in ['已下载', '已跳过', '搜索失败', '下载失败']:
-                    self.current_index += 1
-                    self.queue.put(('update_display', None))
+                # 如果已经处理过，跳到下一首未处理的歌曲
+                if song.get('status') in FINISHED_STATUSES:
+                    self.current_index = self.next_pending_index(self.current_index + 1)
+                    self.notify_song(song)
                     continue
                 
                 # 更新状态
                 self.queue.put(('update_status', f"正在处理: {song['artist']} - {song['song_name']}"))
                 self.log_message(f"处理第 {self.current_index + 1}/{len(self.songs_list)} 首: {song['artist']} - {song['song_name']}")
                 
-                # 搜索歌曲
-                search_success = self.search_song(song['artist'], song['song_name'])
+                self.process_song(song)
                 
-                if search_success:
-                    # 更新歌曲状态为"搜索中"
-                    song['status'] = '搜索中'
-                    self.queue.put(('update_display', None))
-                    
-                    # 根据设置尝试下载
-                    download_success = self.download_song_with_options(song)
-                    
-                    if download_success:
-                        song['status'] = '已下载'
-                        self.log_message(f"✓ 处理完成: {song['song_name']}")
-                        self.current_index += 1
-                    else:
-                        # 检查是否需要重试
-                        if self.retry_on_fail.get() and song.get('attempts', 0) < self.retry_count.get():
-                            attempts = song.get('attempts', 0)
-                            song['attempts'] = attempts + 1
-                            self.log_message(f"准备重试 ({attempts + 1}/{self.retry_count.get()}): {song['song_name']}")
-                            time.sleep(2)  # 重试前等待
-                            continue
-                        else:
-                            song['status'] = '下载失败'
-                            self.current_index += 1
-                            self.log_message(f"✗ 下载失败: {song['song_name']}")
-                else:
-                    self.log_message(f"搜索失败: {song['song_name']}")
-                    song['status'] = '搜索失败'
-                    song['notes'] = '搜索失败'
+                # 网站故障时歌曲放回了待处理，网站恢复后重新处理这一首
+                if song.get('status') != '待处理':
                     self.current_index += 1
                 
                 # 保存进度
-                self.save_progress()
+                self.save_progress(song)
                 
                 # 更新显示
-                self.queue.put(('update_display', None))
-                
-                # 短暂延迟，避免请求过快
-                time.sleep(1)
-                
+                self.notify_song(song)
+            
             except Exception as e:
-                self.log_message(f"处理歌曲时出错: {e}")
+                self.log_message(f"处理歌曲时出错: {e}", 'error')
                 import traceback
-                self.log_message(traceback.format_exc())
-                time.sleep(2)
-            
+                self.log_message(traceback.format_exc(), 'error')
+                time.sleep(self.pacer.retry_delay(1))
+        
+        # 等待后台跟踪中的浏览器下载结束，歌曲的下载状态才准确
+        self.wait_for_browser_downloads()
+        
         # 处理完成
         self.queue.put(('process_complete', None))
     
-    def search_song(self, artist, song_name):
-        """搜索歌曲 - 使用"歌曲 作者"格式搜索"""
-        try:
-            self.log_message(f"正在搜索: {artist} - {song_name}")
-            
-            # 确保浏览器窗口在前面
-            try:
-                self.driver.switch_to.window(self.driver.window_handles[0])
-            except:
-                pass
-            
-            # 访问网站主页
-            self.driver.get("https://s.myhkw.cn/")
-            time.sleep(1)
+    def cache_fields(self):
+        """命中解析缓存所需的字段；歌曲只能在浏览器中点击下载时返回None"""
+        if self.download_song_enabled.get() and not self.native_download.get():
+            return None
+        fields = []
+        if self.download_lrc_enabled.get():
+            fields.append('lyrics_url')
+        if self.download_song_enabled.get():
+            fields.append('audio_url')
+        return tuple(fields)
+    
+    def process_cached_songs(self):
+        """用缓存的歌词、歌曲地址直接下载，不打开搜索页"""
+        required = self.cache_fields()
+        if not required:
+            return
+        
+        hits = 0
+        for song in self.songs_list:
+            if not self.is_running:
+                break
+            if song.get('status') in FINISHED_STATUSES:
+                continue
             
-            # 检查当前页面状态
-            page_source = self.driver.page_source
+            cached = self.resolver_cache.get(song['song_name'], song['artist'], required)
+            if not cached:
+                continue
             
-            # 判断是否在搜索结果页面
-            if "成功 Get √ 返回继续" in page_source:
-                self.log_message("当前在搜索结果页面，需要返回搜索页面")
+            self.log_message(f"命中解析缓存: {song['artist']} - {song['song_name']}")
+            success = True
+            if 'lyrics_url' in required:
+                song['lrc_downloaded'] = self.save_lrc_file(cached['lyrics_url'], song)
+                success = success and song['lrc_downloaded']
+            if 'audio_url' in required:
+                song['song_downloaded'] = self.download_audio(song, cached['audio_url'])
+                success = success and song['song_downloaded']
+            
+            if success:
+                song['status'] = '已下载'
+                hits += 1
+                self.save_progress(song)
+            else:
+                # 缓存的地址已失效，交给正常流程重新搜索
+                self.resolver_cache.remove(song['song_name'], song['artist'])
+        
+        if hits:
+            self.log_message(f"解析缓存命中 {hits} 首")
+            self.save_progress()
+            self.queue.put(('update_display', None))
+    
+    def defer_known_failures(self):
+        """把仍在失败等待期内的歌曲标记为'暂缓重试'，等待期已过的恢复为待处理"""
+        deferred = 0
+        for song in self.songs_list:
+            status = song.get('status')
+            if status not in FINISHED_STATUSES or status == '暂缓重试':
+                backoff = None
+                if self.skip_known_failures.get():
+                    backoff = self.resolver_cache.get_backoff(song['song_name'], song['artist'])
                 
-                try:
-                    back_button = self.driver.find_element(By.ID, "j-back")
-                    back_button.click()
-                    self.log_message("已点击返回按钮")
-                    time.sleep(1)
-                except:
-                    self.driver.get("https://s.myhkw.cn/")
-                    time.sleep(1)
-            
-            # 查找搜索框
-            try:
-                search_box = self.driver.find_element(By.ID, "j-input")
-                self.log_message("✓ 找到搜索框: j-input")
-            except:
-                self.log_message("✗ 未找到搜索框")
-                return False
-            
-            # 清空搜索框
-            search_box.clear()
-            
-            # 优化搜索词格式：使用"歌曲 作者"格式
-            clean_song_name = song_name
-            clean_artist = artist
-            
-            # 清理歌曲名
-            # 移除括号内容、版本信息等
-            clean_song_name = clean_song_name.split('(')[0].split('（')[0].strip()
-            clean_song_name = clean_song_name.split('[')[0].split('【')[0].strip()
-            clean_song_name = clean_song_name.split('-')[0].strip()
-            
-            # 移除特定版本标签
-            version_indicators = ['(Live)', '(live)', '(DJ版)', '(DJ版)', '(Explicit)', 
-                                '(Inst.)', '(Instrumental)', '(合唱版)', '(纯享版)',
-                                '(旧版)', '(新版)', '(回忆版)', '(节奏版)', '(弹唱版)',
-                                '(高燃摇滚版)', '(摇滚版)', '(Rehearsal Version)']
-            
-            for indicator in version_indicators:
-                clean_song_name = clean_song_name.replace(indicator, '').strip()
-            
-            # 清理歌手名
-            # 移除特殊字符和处理多个歌手的情况
-            clean_artist = clean_artist.split('（')[0].split('(')[0].strip()
-            clean_artist = clean_artist.split('_')[0].strip()
-            
-            # 处理歌手中的 "&" 和 "and"
-            if '&' in clean_artist:
-                # 取第一个歌手
-                clean_artist = clean_artist.split('&')[0].strip()
-            elif ' and ' in clean_artist.lower():
-                clean_artist = clean_artist.lower().split(' and ')[0].strip().title()
-            elif ' _ ' in clean_artist:
-                # 取第一个歌手
-                clean_artist = clean_artist.split(' _ ')[0].strip()
-            
-            # 构建搜索词：歌曲 作者
-            if clean_artist and len(clean_artist) > 1:
-                search_query = f"{clean_song_name} {clean_artist}"
+                if backoff:
+                    retry_time = datetime.fromtimestamp(backoff['retry_after']).strftime('%m-%d %H:%M')
+                    song['status'] = '暂缓重试'
+                    song['notes'] = f"已连续失败{backoff['failures']}次({backoff['last_error']})，{retry_time}后重试"
+                    deferred += 1
+                    self.save_progress(song)
+                elif status == '暂缓重试':
+                    song['status'] = '待处理'
+                    song['notes'] = ''
+                    self.save_progress(song)
+        
+        if deferred:
+            self.log_message(f"跳过 {deferred} 首近期反复失败的歌曲（状态: 暂缓重试）")
+            self.queue.put(('update_display', None))
+    
+    def record_result(self, song):
+        """把处理结果记入负缓存：失败时延长等待时间，成功时清除失败记录"""
+        if song.get('status') in ['搜索失败', '下载失败']:
+            self.resolver_cache.record_failure(song['song_name'], song['artist'], song['status'])
+        elif song.get('status') == '已下载':
+            self.resolver_cache.clear_failure(song['song_name'], song['artist'])
+    
+    def note_failure(self, kind):
+        """记录当前线程最近一次失败的类型（circuit_breaker中的分类）"""
+        if kind:
+            self.worker_context.failure = kind
+    
+    def take_failure(self):
+        """取出并清除当前线程最近一次失败的类型"""
+        kind = getattr(self.worker_context, 'failure', None)
+        self.worker_context.failure = None
+        return kind
+    
+    def handle_failure(self, song, status):
+        """
+        按失败类型处理失败的歌曲
+        
+        网站级失败（网站无法访问、页面结构变化、限流）与歌曲本身无关，
+        歌曲放回待处理，连续出现时熔断；其他失败记为status。
+        
+        Returns:
+            bool: 歌曲是否放回了待处理
+        """
+        kind = self.take_failure()
+        if self.breaker.record_failure(kind):
+            key = self.song_index(song)
+            if key is None:
+                key = id(song)
+            with self.progress_lock:
+                failures = self.systemic_failures.get(key, 0) + 1
+                self.systemic_failures[key] = failures
+                # 熔断前（连续失败未达到阈值）的失败不计入重试次数，网站出问题时第一首歌曲不会被误记为失败
+                retries = self.outage_retries.get(key, 0)
+                if self.breaker.is_open:
+                    retries += 1
+                    self.outage_retries[key] = retries
+            requeue = retries <= MAX_OUTAGE_RETRIES and failures <= MAX_SYSTEMIC_FAILURES
+        else:
+            requeue = False
+        
+        if requeue:
+            song['status'] = '待处理'
+            song['notes'] = f"{circuit_breaker.FAILURE_NAMES[kind]}，网站恢复后重试"
+            self.log_message(f"⚠ {circuit_breaker.FAILURE_NAMES[kind]}，放回待处理: {song['song_name']}")
+            return True
+        
+        song['status'] = status
+        song['notes'] = f"{status}({circuit_breaker.FAILURE_NAMES[kind]})" if kind else status
+        return False
+    
+    def browser_alive(self):
+        """主浏览器是否仍可用"""
+        if not self._driver:
+            return False
+        try:
+            self._driver.window_handles
+            return True
+        except Exception:
+            return False
+    
+    def restart_main_browser(self):
+        """主浏览器崩溃后重新启动（流水线等单浏览器模式），失败时停止处理"""
+        self.log_message("⚠ 浏览器已无法使用，正在重新启动", 'error')
+        try:
+            self.quit_driver()
+        except Exception:
+            pass
+        try:
+            self.driver = self.create_driver()
+            self.home_window = self.driver.current_window_handle
+            if self.browser_download_dir:
+                self.driver.execute_cdp_cmd('Page.setDownloadBehavior', {
+                    'behavior': 'allow',
+                    'downloadPath': os.path.abspath(self.browser_download_dir)
+                })
+            self.log_message("✓ 浏览器已重新启动")
+            return True
+        except Exception as e:
+            self.driver = None
+            self.log_message(f"✗ 重新启动浏览器失败，停止处理: {e}", 'error')
+            self.is_running = False
+            return False
+    
+    def reset_outage_retries(self):
+        """熔断结束（网站恢复）时清零各歌曲在熔断期间的重试次数"""
+        with self.progress_lock:
+            self.outage_retries = {}
+    
+    def probe_site(self):
+        """
+        熔断后的探测：网站能打开，并且搜索框、搜索按钮还在
+        
+        在熔断器的后台线程中运行，只用HTTP请求，不使用浏览器（浏览器可能正被解析阶段或其他标签页使用）
+        """
+        return circuit_breaker.probe_url(self.base_url, markers=site_waits.SEARCH_PAGE_MARKERS)
+    
+    def process_song(self, song):
+        """处理单首歌曲（搜索、下载、失败重试），返回时歌曲状态已确定；网站故障时放回待处理"""
+        self.take_failure()
+        while self.is_running:
+            # 搜索歌曲
+            search_success = self.search_song(song['artist'], song['song_name'])
+            
+            if search_success:
+                self.breaker.record_success()
+                
+                # 更新歌曲状态为"搜索中"
+                song['status'] = '搜索中'
+                self.notify_song(song)
+                
+                # 根据设置尝试下载
+                download_success = self.download_song_with_options(song)
+                
+                if download_success:
+                    song['status'] = '已下载'
+                    self.log_message(f"✓ 处理完成: {song['song_name']}")
+                    self.record_result(song)
+                    return
+                
+                # 检查是否需要重试
+                if self.retry_on_fail.get() and song.get('attempts', 0) < self.retry_count.get():
+                    attempts = song.get('attempts', 0)
+                    song['attempts'] = attempts + 1
+                    self.log_message(f"准备重试 ({attempts + 1}/{self.retry_count.get()}): {song['song_name']}")
+                    time.sleep(self.pacer.retry_delay(attempts + 1))  # 重试前等待，网站限流时等待更久
+                    continue
+                
+                if self.handle_failure(song, '下载失败'):
+                    return
+                self.log_message(f"✗ 下载失败: {song['song_name']}")
             else:
-                search_query = clean_song_name
+                self.log_message(f"搜索失败: {song['song_name']}")
+                if self.handle_failure(song, '搜索失败'):
+                    return
+            self.record_result(song)
+            return
+    
+    def can_pipeline(self):
+        """歌曲不需要在浏览器中点击下载时，下载可以与浏览器解析分开进行"""
+        return self.use_pipeline.get() and (not self.download_song_enabled.get() or self.native_download.get())
+    
+    def process_songs_pipelined(self):
+        """
+        流水线处理：解析 → 下载 → 收尾
+        
+        浏览器解析下一首歌曲的同时，HTTP下载当前歌曲的歌词和歌曲文件，
+        第三个阶段记录结果、保存进度和刷新界面。
+        """
+        download_workers = 4 if self.download_song_enabled.get() else 2
+        http_client.configure(download_workers * 2)
+        
+        while self.is_running:
+            if self.next_pending_index(0) >= len(self.songs_list):
+                break
+            self.click_fallback = []
+            self.log_message(f"流水线模式: 解析 1 线程，下载 {download_workers} 线程，待处理 {self.pending_count()} 首")
+            
+            pipeline = Pipeline([
+                Stage("解析", self.resolve_stage, 1, on_error=self.resolve_failed),
+                Stage("下载", self.download_stage, download_workers, on_error=self.download_failed),
+                Stage("收尾", self.finish_stage, 1),
+            ], queue_size=download_workers * 2, log=self.log_message)
+            pipeline.run(self.iter_pending(), should_continue=lambda: self.is_running,
+                         is_paused=lambda: self.is_paused or self.breaker.is_open)
+            self.process_click_fallback()
+            self.save_progress()
+            
+            # 网站故障时放回待处理的歌曲，等网站恢复后再处理一轮
+            if not self.has_requeued_songs():
+                break
+            self.breaker.wait_until_closed(lambda: self.is_running)
+    
+    def resolve_stage(self, index):
+        """流水线第一阶段：在浏览器中搜索并读取歌词、歌曲链接"""
+        song = self.songs_list[index]
+        self.current_index = index
+        self.queue.put(('update_status', f"正在解析: {song['artist']} - {song['song_name']}"))
+        self.log_message(f"解析第 {index + 1}/{len(self.songs_list)} 首: {song['artist']} - {song['song_name']}")
+        
+        # 浏览器崩溃后每首歌曲都会搜索失败，先重新启动
+        if not self.browser_alive() and not self.restart_main_browser():
+            return None
+        
+        self.take_failure()
+        if not self.search_song(song['artist'], song['song_name']):
+            self.log_message(f"搜索失败: {song['song_name']}")
+            self.handle_failure(song, '搜索失败')
+            return index, None
+        
+        self.breaker.record_success()
+        song['status'] = '搜索中'
+        self.notify_song(song)
+        
+        # 等待需要的按钮带上链接，再用一次脚本调用读取
+        if self.download_lrc_enabled.get():
+            site_waits.wait_for_href(self.driver, "j-lrc-btn")
+        if self.download_song_enabled.get():
+            site_waits.wait_for_href(self.driver, "j-src-btn")
+        page_data = site_waits.extract_page_data(self.driver) or {}
+        
+        resolved = {
+            'lyrics_url': page_data.get('lyrics_url'),
+            'audio_url': page_data.get('song_url'),
+            # 下载阶段在其他线程中进行，Cookie在这里先复制出来
+            'cookies': cookies_from_driver(self.driver) if self.download_song_enabled.get() else {},
+        }
+        self.resolver_cache.put(
+            song['song_name'], song['artist'],
+            actual_song=page_data.get('song_name'),
+            actual_artist=page_data.get('artist'),
+            lyrics_url=page_data.get('lyrics_url'),
+            audio_url=page_data.get('song_url'),
+            cover_url=page_data.get('cover_url')
+        )
+        return index, resolved
+    
+    def resolve_failed(self, index, error):
+        """解析阶段出错：记为搜索失败（网站级失败时放回待处理），交给收尾阶段保存"""
+        song = self.songs_list[index]
+        self.note_failure(circuit_breaker.classify_exception(error))
+        self.handle_failure(song, '搜索失败')
+        if not self.browser_alive():
+            self.restart_main_browser()
+        return index
+    
+    def download_failed(self, item, error):
+        """下载阶段出错：记为下载失败（网站级失败时放回待处理），交给收尾阶段保存"""
+        index, _ = item
+        self.note_failure(circuit_breaker.classify_exception(error))
+        self.handle_failure(self.songs_list[index], '下载失败')
+        return index
+    
+    def download_stage(self, item):
+        """流水线第二阶段：用HTTP下载歌词和歌曲文件"""
+        index, resolved = item
+        song = self.songs_list[index]
+        if resolved is None:
+            return index
+        
+        results = []
+        attempts = 0
+        self.take_failure()
+        while self.is_running:
+            if self.download_lrc_enabled.get() and not song.get('lrc_downloaded', False):
+                lrc_url = resolved['lyrics_url']
+                if lrc_url:
+                    self.save_download_link(song, lrc_url, "lrc")
+                    song['lrc_downloaded'] = self.save_lrc_file(lrc_url, song)
+                else:
+                    self.log_message(f"未找到歌词下载链接: {song['song_name']}")
+            
+            if self.download_song_enabled.get() and not song.get('song_downloaded', False):
+                audio_url = resolved['audio_url']
+                if audio_url:
+                    song['song_download_url'] = audio_url
+                    self.save_download_link(song, audio_url, "song")
+                    song['song_downloaded'] = self.download_audio(song, audio_url, resolved['cookies'])
+                else:
+                    self.log_message(f"未找到歌曲下载链接: {song['song_name']}")
             
-            self.log_message(f"搜索词: {search_query}")
+            results = []
+            if self.download_lrc_enabled.get():
+                results.append(song.get('lrc_downloaded', False))
+            if self.download_song_enabled.get():
+                results.append(song.get('song_downloaded', False))
             
-            # 逐字符输入（模拟真人输入）
-            for char in search_query:
-                search_box.send_keys(char)
-                time.sleep(0.01)  # 稍微快一点
+            # 全部失败时按设置重试（链接已解析，只重试下载）
+            if any(results) or not self.retry_on_fail.get() or attempts >= self.retry_count.get():
+                break
+            attempts += 1
+            self.log_message(f"准备重试 ({attempts}/{self.retry_count.get()}): {song['song_name']}")
+            time.sleep(self.pacer.retry_delay(attempts))
+        
+        # HTTP下载不到歌曲文件时与单线程模式相同，改为在浏览器中点击下载按钮；
+        # 浏览器由解析阶段占用，这一轮结束后再依次处理
+        if (self.download_song_enabled.get() and not song.get('song_downloaded', False)
+                and self.auto_click_download.get() and self.is_running):
+            with self.progress_lock:
+                self.click_fallback.append(index)
+            return None
+        
+        # 部分成功也视为成功
+        if any(results):
+            song['status'] = '已下载'
+        else:
+            self.handle_failure(song, '下载失败')
+        return index
+    
+    def process_click_fallback(self):
+        """流水线一轮结束后，在浏览器中重新处理HTTP下载失败的歌曲（点击下载按钮）"""
+        for index in sorted(self.click_fallback):
+            if not self.is_running:
+                break
+            song = self.songs_list[index]
+            self.current_index = index
+            self.log_message(f"HTTP下载失败，改为点击下载按钮: {song['artist']} - {song['song_name']}")
+            if not self.browser_alive() and not self.restart_main_browser():
+                break
             
-            # 选择QQ音乐源
+            # 歌词已经下载过时不再下载，歌曲直接点击下载按钮
+            self.worker_context.skip_native = True
             try:
-                radio_inputs = self.driver.find_elements(By.XPATH, "//input[@type='radio']")
-                if len(radio_inputs) >= 2:
-                    qq_radio = radio_inputs[1]
-                    if not qq_radio.is_selected():
-                        qq_radio.click()
-                        self.log_message("✓ 已选择QQ音乐源")
-            except:
-                pass
+                self.process_song(song)
+            finally:
+                self.worker_context.skip_native = False
+            self.finish_stage(index)
+        self.click_fallback = []
+    
+    def finish_stage(self, index):
+        """流水线第三阶段：记录结果、保存进度、刷新界面"""
+        song = self.songs_list[index]
+        if song.get('status') == '已下载':
+            self.log_message(f"✓ 处理完成: {song['song_name']}")
+        elif song.get('status') == '下载失败':
+            self.log_message(f"✗ 下载失败: {song['song_name']}")
+        self.record_result(song)
+        self.save_progress(song)
+        self.notify_song(song)
+    
+    def process_songs_parallel(self, worker_count):
+        """并行处理歌曲，每个浏览器（或标签页）从共享队列中取歌曲"""
+        if self.next_pending_index(0) >= len(self.songs_list):
+            return
+        
+        tabbed = self.concurrency_mode.get() == "多标签页"
+        if tabbed and self.download_song_enabled.get() and not self.native_download.get():
+            # 各标签页共用一个下载目录，点击下载的文件无法对应到歌曲
+            self.log_message("⚠ 多标签页模式不支持点击下载歌曲，改用多浏览器模式")
+            tabbed = False
+        if tabbed:
+            if not self.tab_browser:
+                self.tab_browser = TabbedBrowser(None, self.create_tab_host, self.log_message,
+                                                 tab_setup=self.setup_tab)
+            driver_factory = self.tab_browser.open_tab
+            label = "标签页"
+        else:
+            driver_factory = self.create_driver
+            label = "浏览器"
+        self.log_message(f"并行模式: {worker_count} 个{label}，待处理 {self.pending_count()} 首")
+        
+        # 歌词等HTTP下载共用的连接池与并行数匹配
+        http_client.configure(worker_count * 2)
+        
+        self.worker_pool = BrowserWorkerPool(
+            driver_factory=driver_factory,
+            handler=self.process_song_in_worker,
+            worker_count=worker_count,
+            download_folder=self.download_folder,
+            log=self.log_message,
+            separate_download_dirs=not tabbed,
+            worker_label=label,
+            on_give_up=self.worker_gave_up
+        )
+        try:
+            self.worker_pool.run(
+                self.iter_pending(),
+                should_continue=lambda: self.is_running,
+                is_paused=lambda: self.is_paused or self.breaker.is_open
+            )
+        except BrowserWorkerError as e:
+            self.log_message(f"✗ 并行处理失败: {e}")
+            self.queue.put(('show_error', f"并行处理失败: {e}"))
+        finally:
+            # 关闭浏览器会中断其中的下载，先等待下载结束
+            self.wait_for_browser_downloads()
+            self.worker_pool.collect_downloads()
+            self.worker_pool.close()
+            self.worker_pool = None
+            # 工作线程的下载目录不再使用
+            self.close_download_trackers()
+            self.save_progress()
+    
+    def worker_gave_up(self, index):
+        """歌曲多次因浏览器故障没有处理完，记为搜索失败（状态不再停在处理中，之后可以重试）"""
+        song = self.songs_list[index]
+        song['status'] = '搜索失败'
+        song['notes'] = '浏览器多次失效'
+        self.log_message(f"✗ 放弃: {song['song_name']}（浏览器多次失效）")
+        self.record_result(song)
+        self.save_progress(song)
+        self.notify_song(song)
+    
+    def process_song_in_worker(self, worker, index):
+        """在工作线程中处理一首歌曲，self.driver指向该工作线程自己的浏览器"""
+        self.worker_context.worker = worker
+        song = self.songs_list[index]
+        if song.get('status') in FINISHED_STATUSES:
+            return
+        
+        self.current_index = index
+        self.queue.put(('update_status', f"正在处理: {song['artist']} - {song['song_name']}"))
+        self.log_message(f"[{worker.name}] 处理第 {index + 1}/{len(self.songs_list)} 首: {song['artist']} - {song['song_name']}")
+        
+        # 网站限流时减少同时工作的浏览器数
+        with self.pacer.slot(lambda: self.is_running):
+            self.process_song(song)
+        
+        # 浏览器在处理过程中崩溃或被重启时，结果不可信，交回队列重新处理
+        if not worker.is_alive():
+            song['status'] = '待处理'
+            song['notes'] = ''
+            raise BrowserWorkerError(f"浏览器失效，重新排队: {song['song_name']}")
+        
+        # 网站故障时歌曲放回了待处理，重新排队，熔断期间工作线程暂停
+        if song.get('status') == '待处理':
+            self.worker_pool.requeue(index)
+        
+        # 保存进度
+        self.save_progress(song)
+        
+        # 更新显示
+        self.notify_song(song)
+    
+    def build_search_query(self, artist, song_name):
+        """构建搜索词 - 使用"歌曲 作者"格式"""
+        clean_song_name = song_name
+        clean_artist = artist
+        
+        # 清理歌曲名
+        # 移除括号内容、版本信息等
+        clean_song_name = clean_song_name.split('(')[0].split('（')[0].strip()
+        clean_song_name = clean_song_name.split('[')[0].split('【')[0].strip()
+        clean_song_name = clean_song_name.split('-')[0].strip()
+        
+        # 移除特定版本标签
+        version_indicators = ['(Live)', '(live)', '(DJ版)', '(DJ版)', '(Explicit)',
+                            '(Inst.)', '(Instrumental)', '(合唱版)', '(纯享版)',
+                            '(旧版)', '(新版)', '(回忆版)', '(节奏版)', '(弹唱版)',
+                            '(高燃摇滚版)', '(摇滚版)', '(Rehearsal Version)']
+        
+        for indicator in version_indicators:
+            clean_song_name = clean_song_name.replace(indicator, '').strip()
+        
+        # 清理歌手名
+        # 移除特殊字符和处理多个歌手的情况
+        clean_artist = clean_artist.split('（')[0].split('(')[0].strip()
+        clean_artist = clean_artist.split('_')[0].strip()
+        
+        # 处理歌手中的 "&" 和 "and"
+        if '&' in clean_artist:
+            # 取第一个歌手
+            clean_artist = clean_artist.split('&')[0].strip()
+        elif ' and ' in clean_artist.lower():
+            clean_artist = clean_artist.lower().split(' and ')[0].strip().title()
+        elif ' _ ' in clean_artist:
+            # 取第一个歌手
+            clean_artist = clean_artist.split(' _ ')[0].strip()
+        
+        # 构建搜索词：歌曲 作者
+        if clean_artist and len(clean_artist) > 1:
+            return f"{clean_song_name} {clean_artist}"
+        return clean_song_name
+    
+    def build_search_url(self, search_query):
+        """构建搜索URL（与geci.py中的格式一致）"""
+        return f"{self.base_url}?name={quote(search_query)}&type=qq"
+    
+    def search_song(self, artist, song_name):
+        """搜索歌曲 - 优先直接访问搜索URL，失败时回退到表单输入"""
+        try:
+            self.log_message(f"正在搜索: {artist} - {song_name}")
             
-            # 查找搜索按钮
+            # 确保浏览器窗口在前面（连接常驻浏览器时回到本工具的标签页）
             try:
-                search_button = self.driver.find_element(By.ID, "j-submit")
-                self.log_message("✓ 找到搜索按钮: j-submit")
+                handles = self.driver.window_handles
+                self.driver.switch_to.window(self.home_window if self.home_window in handles else handles[0])
             except:
-                self.log_message("✗ 未找到搜索按钮")
-                return False
+                pass
             
-            # 点击搜索按钮
-            try:
-                search_button.click()
-                self.log_message("已点击搜索按钮")
-            except:
-                self.driver.execute_script("arguments[0].click();", search_button)
-                self.log_message("已通过JavaScript点击搜索按钮")
+            search_query = self.build_search_query(artist, song_name)
+            self.log_message(f"搜索词: {search_query}")
             
-            # 等待搜索结果
-            time.sleep(2)
+            # 按当前节奏等待，代替固定的请求间隔
+            self.pacer.wait(lambda: self.is_running)
             
-            return self.check_search_result(song_name, artist)
+            # 直接访问搜索URL，一次页面跳转即可得到结果
+            state = self.search_song_by_url(search_query)
+            if state == 'success':
+                self.log_message("✓ 搜索成功")
+                return True
+            if state == 'no_result':
+                self.log_message("✗ 网站返回无结果")
+                self.note_failure(circuit_breaker.NOT_FOUND)
+                return False
             
+            self.log_message("⚠ 直接搜索未返回结果，改用表单输入搜索")
+            return self.search_song_by_form(artist, song_name, search_query)
+        
         except Exception as e:
             self.log_message(f"搜索异常: {e}")
+            self.note_failure(circuit_breaker.classify_exception(e))
             import traceback
             self.log_message(traceback.format_exc())
             return False
     
+    def search_song_by_url(self, search_query):
+        """
+        通过搜索URL直接搜索，返回搜索状态（'success'/'no_result'/None）
+        
+        同时按结果调整请求节奏：只有超时和限流说明网站忙需要减速，
+        页面结构变化等其他错误只记入熔断器，不减速。
+        """
+        start = time.time()
+        try:
+            search_url = self.build_search_url(search_query)
+            self.driver.get(search_url)
+            self.log_message(f"已访问搜索URL: {search_url}")
+            
+            # 等待搜索结果出现
+            state = site_waits.wait_for_search_result(self.driver)
+        except Exception as e:
+            self.log_message(f"直接搜索失败: {e}")
+            failure = circuit_breaker.classify_exception(e)
+            self.note_failure(failure)
+            message = str(e).lower()
+            if isinstance(e, TimeoutException) or 'timeout' in message or 'timed out' in message:
+                self.pacer.failure('timeout')
+            elif failure == circuit_breaker.THROTTLED:
+                self.pacer.failure('throttled')
+            else:
+                self.pacer.failure('error')
+            return None
+        
+        if state is None:
+            # 搜索结果在时间预算内没有出现
+            self.pacer.failure('timeout')
+        else:
+            self.pacer.success(time.time() - start)
+        return state
+    
+    def search_song_by_form(self, artist, song_name, search_query):
+        """通过搜索表单搜索（备用方式）"""
+        # 访问网站主页
+        self.driver.get(self.base_url)
+        
+        # 主页能打开，直接搜索时记录的失败类型作废
+        self.take_failure()
+        
+        # 判断是否在搜索结果页面
+        if site_waits.search_state(self.driver) == 'success':
+            self.log_message("当前在搜索结果页面，需要返回搜索页面")
+            
+            try:
+                back_button = self.driver.find_element(By.ID, "j-back")
+                back_button.click()
+                self.log_message("已点击返回按钮")
+            except:
+                self.driver.get(self.base_url)
+        
+        # 查找搜索框
+        search_box = site_waits.wait_for_search_page(self.driver)
+        if search_box:
+            self.log_message("✓ 找到搜索框: j-input")
+        else:
+            self.log_message("✗ 未找到搜索框")
+            self.note_failure(circuit_breaker.LAYOUT_CHANGED)
+            return False
+        
+        # 清空搜索框
+        search_box.clear()
+        
+        # 逐字符输入（模拟真人输入）
+        for char in search_query:
+            search_box.send_keys(char)
+            time.sleep(0.01)  # 稍微快一点
+        
+        # 选择QQ音乐源
+        try:
+            radio_inputs = self.driver.find_elements(By.XPATH, "//input[@type='radio']")
+            if len(radio_inputs) >= 2:
+                qq_radio = radio_inputs[1]
+                if not qq_radio.is_selected():
+                    qq_radio.click()
+                    self.log_message("✓ 已选择QQ音乐源")
+        except:
+            pass
+        
+        # 查找搜索按钮
+        try:
+            search_button = self.driver.find_element(By.ID, "j-submit")
+            self.log_message("✓ 找到搜索按钮: j-submit")
+        except:
+            self.log_message("✗ 未找到搜索按钮")
+            self.note_failure(circuit_breaker.LAYOUT_CHANGED)
+            return False
+        
+        # 点击搜索按钮
+        try:
+            search_button.click()
+            self.log_message("已点击搜索按钮")
+        except:
+            self.driver.execute_script("arguments[0].click();", search_button)
+            self.log_message("已通过JavaScript点击搜索按钮")
+        
+        # 等待搜索结果
+        if site_waits.wait_for_search_result(self.driver) is None:
+            self.log_message("⚠ 等待搜索结果超时")
+        
+        return self.check_search_result(song_name, artist)
+    
     def check_search_result(self, song_name, artist):
         """检查搜索结果"""
         try:
-            current_url = self.driver.current_url
-            page_title = self.driver.title
-            page_source = self.driver.page_source
+            page_data = site_waits.extract_page_data(self.driver) or {}
+            current_url = page_data.get('url') or self.driver.current_url
             
             self.log_message(f"搜索后URL: {current_url}")
-            self.log_message(f"搜索后标题: {page_title}")
+            self.log_message(f"搜索后标题: {page_data.get('title', '')}")
             
             # 检查是否显示搜索结果
-            if "成功 Get √" in page_source:
+            if page_data.get('success'):
                 self.log_message("✓ 搜索成功: 显示'成功 Get √'")
                 
                 # 检查是否找到歌曲
-                if song_name in page_source or artist in page_source:
+                found = f"{page_data.get('song_name') or ''} {page_data.get('artist') or ''}"
+                if song_name in found or artist in found:
                     self.log_message(f"✓ 在页面中找到 '{song_name}'")
                 else:
                     self.log_message(f"⚠ 未在页面中找到 '{song_name}'，但搜索功能正常")
                 
                 return True
-            elif current_url != "https://s.myhkw.cn/":
+            elif current_url != self.base_url:
                 self.log_message(f"✓ 搜索成功: URL已改变")
                 return True
             else:
                 self.log_message("✗ 搜索可能失败")
                 return False
-            
+        
         except Exception as e:
             self.log_message(f"检查结果异常: {e}")
             return False
@@ -926,11 +1855,11 @@ class MusicDownloadAssistant:
         }
         
         try:
-            # 等待页面完全加载
-            time.sleep(1)
-            
             # 如果启用了歌词下载，先尝试下载歌词
-            if download_lrc:
+            if (download_lrc and getattr(self.worker_context, 'skip_native', False)
+                    and song.get('lrc_downloaded', False)):
+                download_results['lrc'] = True
+            elif download_lrc:
                 lrc_success = self.download_lrc(song)
                 download_results['lrc'] = lrc_success
                 song['lrc_downloaded'] = lrc_success
@@ -986,46 +1915,63 @@ class MusicDownloadAssistant:
     def download_song_file(self, song, auto_click=True):
         """下载歌曲文件"""
         try:
-            # 查找歌曲下载按钮
+            # 等待歌曲下载按钮带上下载链接
             try:
+                song_download_url = site_waits.wait_for_href(self.driver, "j-src-btn")
                 song_download_button = self.driver.find_element(By.ID, "j-src-btn")
                 self.log_message("✓ 找到歌曲下载按钮: j-src-btn")
                 
                 # 获取歌曲下载链接
-                try:
-                    song_download_url = song_download_button.get_attribute('href')
-                    if song_download_url:
-                        self.log_message(f"歌曲下载链接: {song_download_url[:100]}...")
-                        song['song_download_url'] = song_download_url
-                        
-                        # 保存链接到文件，供以后手动下载
-                        self.save_download_link(song, song_download_url, "song")
-                except:
-                    pass
+                if song_download_url:
+                    self.log_message(f"歌曲下载链接: {song_download_url[:100]}...")
+                    song['song_download_url'] = song_download_url
+                    self.resolver_cache.put(song['song_name'], song['artist'], audio_url=song_download_url)
+                    
+                    # 保存链接到文件，供以后手动下载
+                    self.save_download_link(song, song_download_url, "song")
+                    
+                    # 直接用HTTP下载，完成时文件大小已核对（流水线中已经试过时直接点击）
+                    if self.native_download.get() and not getattr(self.worker_context, 'skip_native', False):
+                        if self.download_audio(song, song_download_url):
+                            return True
+                        if isinstance(self.driver, TabDriver):
+                            # 各标签页共用下载目录，点击下载的文件无法对应到歌曲
+                            self.log_message("HTTP下载失败（多标签页模式不点击下载按钮）")
+                            return False
+                        self.log_message("HTTP下载失败，改为点击下载按钮")
                 
                 # 根据设置决定是否自动点击
                 if auto_click:
+                    # 点击前登记，由下载跟踪器在后台确认下载完成，这里不必等待
+                    tracker = self.get_download_tracker()
+                    ticket = None
+                    if tracker:
+                        ticket = tracker.expect(
+                            song['song_name'],
+                            callback=lambda result: self.on_browser_download_finished(song, result)
+                        )
+                    
                     try:
                         song_download_button.click()
                         self.log_message("✓ 已自动点击歌曲下载按钮")
-                        
-                        # 等待下载开始
-                        time.sleep(2)
-                        self.log_message("等待歌曲下载完成...")
-                        time.sleep(3)
-                        
-                        return True
                     except Exception as e:
                         # 尝试JavaScript点击
                         try:
                             self.driver.execute_script("arguments[0].click();", song_download_button)
                             self.log_message("✓ 已通过JavaScript点击下载按钮")
-                            
-                            time.sleep(3)
-                            return True
                         except:
                             self.log_message(f"点击下载按钮失败: {e}")
+                            if ticket:
+                                tracker.cancel(ticket)
                             return False
+                    
+                    # 下载目录未知时无法确认，沿用点击即视为成功的旧行为
+                    if not ticket:
+                        self.log_message("⚠ 浏览器下载目录未知，无法确认下载是否完成")
+                        return True
+                    
+                    self.log_message("歌曲下载已交给浏览器，完成情况在后台跟踪")
+                    return True
                 else:
                     self.log_message("自动点击已禁用，请手动点击下载按钮")
                     return False
@@ -1038,6 +1984,125 @@ class MusicDownloadAssistant:
             self.log_message(f"下载歌曲文件时出错: {e}")
             return False
     
+    def get_download_tracker(self):
+        """当前浏览器下载目录的下载跟踪器，下载目录未知时返回None"""
+        download_dir = self.browser_download_dir
+        if not download_dir:
+            return None
+        
+        with self.progress_lock:
+            tracker = self.download_trackers.get(download_dir)
+            if tracker is None:
+                # 并行模式下完成的文件会被移动到最终下载文件夹
+                moved_to = None
+                if os.path.abspath(download_dir) != os.path.abspath(self.download_folder):
+                    moved_to = self.download_folder
+                tracker = DownloadTracker(download_dir, self.log_message, moved_to=moved_to)
+                self.download_trackers[download_dir] = tracker
+            return tracker
+    
+    def close_download_trackers(self):
+        """停止所有下载跟踪器的跟踪线程（停止处理、更换下载文件夹、退出时）"""
+        with self.progress_lock:
+            trackers = list(self.download_trackers.values())
+            self.download_trackers = {}
+        for tracker in trackers:
+            tracker.close()
+    
+    def final_download_path(self, path):
+        """
+        浏览器下载的文件最终所在的路径
+        
+        并行模式下文件先下载到工作线程的下载目录，这里先把它移到最终下载文件夹，
+        再返回移动后的路径（同名文件已存在而没有移动时返回原路径）。
+        """
+        if os.path.dirname(os.path.abspath(path)) == os.path.abspath(self.download_folder):
+            return path
+        pool = self.worker_pool
+        if pool:
+            pool.collect_downloads()
+        moved = os.path.join(self.download_folder, os.path.basename(path))
+        if not os.path.exists(path) and os.path.exists(moved):
+            return moved
+        return path
+    
+    def on_browser_download_finished(self, song, result):
+        """浏览器下载结束（在下载跟踪线程中调用），更新歌曲的下载状态"""
+        if result['success']:
+            song['song_downloaded'] = True
+            song['song_file'] = self.final_download_path(result['path'])
+            self.log_message(f"✓ 歌曲下载完成: {os.path.basename(result['path'])} "
+                             f"({result['size'] / 1024 / 1024:.1f} MB, {result['seconds']:.1f}s)")
+        else:
+            song['song_downloaded'] = False
+            song['notes'] = f"歌曲{result['error']}"
+            self.log_message(f"✗ 歌曲{result['error']}: {song['song_name']}")
+            
+            # 歌词也没有下载成功时，整首歌曲视为下载失败
+            if song.get('status') == '已下载' and not song.get('lrc_downloaded', False):
+                song['status'] = '下载失败'
+                self.record_result(song)
+        
+        self.save_progress(song)
+        self.notify_song(song)
+    
+    def wait_for_browser_downloads(self, timeout=600):
+        """等待后台跟踪中的浏览器下载全部结束（停止处理时不再等待）"""
+        deadline = time.time() + timeout
+        logged = False
+        while self.is_running and time.time() < deadline:
+            pending = sum(tracker.pending_count() for tracker in list(self.download_trackers.values()))
+            if not pending:
+                return
+            if not logged:
+                self.log_message(f"等待 {pending} 个浏览器下载完成...")
+                logged = True
+            time.sleep(1)
+    
+    def download_audio(self, song, url, cookies=None):
+        """用HTTP直接下载歌曲文件，返回是否下载完成；cookies为None时从当前浏览器复制"""
+        try:
+            # 创建安全的文件名
+            safe_artist = "".join(c for c in song['artist'] if c.isalnum() or c in (' ', '-', '_')).strip()
+            safe_song_name = "".join(c for c in song['song_name'] if c.isalnum() or c in (' ', '-', '_')).strip()
+            
+            filename = f"{safe_song_name} - {safe_artist}{guess_extension(url)}"
+            file_path = os.path.join(self.download_folder, filename)
+            
+            # 检查文件是否已存在（可能已按实际格式改过扩展名）
+            existing = existing_audio_file(os.path.splitext(file_path)[0])
+            if existing:
+                self.log_message(f"歌曲文件已存在: {os.path.basename(existing)}")
+                song['song_file'] = existing
+                return True
+            
+            # 复制浏览器会话中的Cookie，链接需要登录状态时也能下载
+            if cookies is None:
+                cookies = cookies_from_driver(self.driver) if self.driver else {}
+            
+            self.log_message(f"正在下载歌曲文件: {filename}")
+            result = self.audio_downloader.download(
+                url, file_path,
+                headers={'Referer': self.base_url},
+                cookies=cookies,
+                should_continue=lambda: self.is_running
+            )
+            file_path = fix_extension(file_path, result)
+            filename = os.path.basename(file_path)
+            
+            resumed = "，断点续传" if result['resumed'] else ""
+            self.log_message(f"✓ 歌曲已下载: {filename} ({result['size'] / 1024 / 1024:.1f} MB, "
+                             f"{result['seconds']:.1f}s, {result['segments']} 段{resumed})")
+            song['song_file'] = file_path
+            return True
+        
+        except DownloadError as e:
+            self.log_message(f"✗ 歌曲下载失败: {e}")
+            return False
+        except Exception as e:
+            self.log_message(f"下载歌曲文件时出错: {e}")
+            return False
+    
     def save_download_link(self, song, url, file_type):
         """保存下载链接到文件"""
         try:
@@ -1068,54 +2133,27 @@ class MusicDownloadAssistant:
         try:
             self.log_message("正在查找歌词下载链接...")
             
-            # 查找所有链接，特别是歌词链接
-            all_links = self.driver.find_elements(By.TAG_NAME, "a")
-            
-            for link in all_links:
-                href = link.get_attribute('href')
-                if href and 'api.php' in href and 'get=lrc' in href:
-                    self.log_message(f"找到歌词链接: {href}")
-                    
-                    # 保存链接到文件
-                    self.save_download_link(song, href, "lrc")
-                    
-                    # 下载歌词文件
-                    return self.save_lrc_file(href, song)
-            
-            # 如果没有找到a标签的歌词链接，尝试查找其他元素
-            all_elements = self.driver.find_elements(By.XPATH, "//*[contains(text(), 'api.php')]")
-            for element in all_elements:
-                text = element.text
-                if 'api.php' in text and 'get=lrc' in text:
-                    self.log_message(f"找到歌词文本链接: {text}")
-                    
-                    # 提取URL
-                    import re
-                    url_match = re.search(r'https?://[^\s]+', text)
-                    if url_match:
-                        lrc_url = url_match.group(0)
-                        
-                        # 保存链接到文件
-                        self.save_download_link(song, lrc_url, "lrc")
-                        
-                        return self.save_lrc_file(lrc_url, song)
-            
-            # 检查页面源代码中是否有歌词链接
-            page_source = self.driver.page_source
-            if 'get=lrc' in page_source:
-                # 使用正则表达式提取歌词URL
-                import re
-                lrc_pattern = r'https?://[^\s"\']*api\.php[^\s"\']*get=lrc[^\s"\']*'
-                matches = re.findall(lrc_pattern, page_source)
+            # 等待歌词按钮带上链接，再用一次脚本调用读取歌词链接
+            # （脚本内依次查找歌词按钮、页面中的链接和页面文本）
+            site_waits.wait_for_href(self.driver, "j-lrc-btn")
+            page_data = site_waits.extract_page_data(self.driver) or {}
+            lrc_url = page_data.get('lyrics_url')
+            
+            if lrc_url:
+                self.log_message(f"找到歌词链接: {lrc_url}")
+                self.resolver_cache.put(
+                    song['song_name'], song['artist'],
+                    actual_song=page_data.get('song_name'),
+                    actual_artist=page_data.get('artist'),
+                    lyrics_url=lrc_url,
+                    cover_url=page_data.get('cover_url')
+                )
                 
-                if matches:
-                    lrc_url = matches[0]
-                    self.log_message(f"从源代码中找到歌词链接: {lrc_url}")
-                    
-                    # 保存链接到文件
-                    self.save_download_link(song, lrc_url, "lrc")
-                    
-                    return self.save_lrc_file(lrc_url, song)
+                # 保存链接到文件
+                self.save_download_link(song, lrc_url, "lrc")
+                
+                # 下载歌词文件
+                return self.save_lrc_file(lrc_url, song)
             
             self.log_message("未找到歌词下载链接")
             return False
@@ -1127,7 +2165,6 @@ class MusicDownloadAssistant:
     def save_lrc_file(self, lrc_url, song):
         """保存歌词文件到本地"""
         try:
-            import requests
             from urllib.parse import unquote
             
             # 创建安全的文件名
@@ -1145,21 +2182,50 @@ class MusicDownloadAssistant:
                 song['lrc_downloaded'] = True
                 return True
             
+            # 同一地址已下载过时直接使用存储中的内容
+            stored = self.blob_store.lookup_url(lrc_url)
+            if stored:
+                self.blob_store.materialize(stored['digest'], lrc_path)
+                self.log_message(f"✓ 歌词已保存(已下载过): {lrc_filename}")
+                song['lrc_file'] = lrc_path
+                song['lrc_downloaded'] = True
+                return True
+            
             # 下载歌词
-            response = requests.get(lrc_url, timeout=10)
+            start = time.time()
+            try:
+                response = http_client.get(lrc_url, timeout=10)
+            except requests.exceptions.Timeout:
+                self.pacer.failure('timeout')
+                raise
+            
+            if response.status_code in THROTTLE_STATUS_CODES:
+                self.pacer.failure('throttled')
             
             if response.status_code == 200:
-                # 保存歌词文件
-                with open(lrc_path, 'w', encoding='utf-8') as f:
-                    # 如果是纯文本歌词，直接保存
-                    if response.text.strip():
-                        f.write(response.text)
-                    # 如果是二进制或其他格式，尝试解码
-                    else:
-                        try:
-                            f.write(response.content.decode('utf-8'))
-                        except:
-                            f.write(response.content.decode('gbk', errors='ignore'))
+                # 网站限流时可能返回HTML页面而不是歌词
+                content = response.text.strip()
+                if content.startswith('<!DOCTYPE') or '<html' in content.lower():
+                    self.pacer.failure('html')
+                    self.note_failure(circuit_breaker.THROTTLED)
+                    self.log_message("歌词下载失败: 返回的是HTML页面，不是歌词文件")
+                    return False
+                self.pacer.success(time.time() - start)
+                
+                # 如果是纯文本歌词，直接保存
+                # 与 geci.py、music_downloader.py 一样去掉首尾空白，同一歌词在存储中只保存一份
+                if content:
+                    text = content
+                # 如果是二进制或其他格式，尝试解码
+                else:
+                    try:
+                        text = response.content.decode('utf-8').strip()
+                    except:
+                        text = response.content.decode('gbk', errors='ignore').strip()
+                
+                # 保存歌词文件（指向存储中内容的硬链接）
+                digest = self.blob_store.put(text.encode('utf-8'), lrc_url, 'text/plain')
+                self.blob_store.materialize(digest, lrc_path)
                 
                 self.log_message(f"✓ 歌词已保存: {lrc_filename}")
                 
@@ -1170,10 +2236,12 @@ class MusicDownloadAssistant:
                 return True
             else:
                 self.log_message(f"歌词下载失败，HTTP状态码: {response.status_code}")
+                self.note_failure(circuit_breaker.classify_status(response.status_code))
                 return False
                 
         except Exception as e:
             self.log_message(f"保存歌词文件失败: {e}")
+            self.note_failure(circuit_breaker.classify_exception(e))
             return False
     
     def wait_for_manual_download(self, song):
@@ -1184,17 +2252,36 @@ class MusicDownloadAssistant:
         self.log_message("等待用户手动操作...")
         self.log_message("下载完成后，请点击'我已下载完成'按钮")
         
+        # 丢弃不是在等待这首歌曲时点击的"完成"/"跳过"
+        while True:
+            try:
+                self.manual_actions.get_nowait()
+            except queue.Empty:
+                break
+        
+        # 用户在浏览器中手动下载时，下载完成即可自动记录
+        tracker = self.get_download_tracker() if self.download_song_enabled.get() else None
+        ticket = tracker.expect(song['song_name']) if tracker else None
+        
         # 等待用户操作或超时
         while self.is_running and not self.is_paused:
             # 检查是否超时
             if time.time() - start_time > timeout:
                 self.log_message(f"等待超时: {song['song_name']}")
+                if ticket:
+                    tracker.cancel(ticket)
                 return False
             
-            # 检查队列中是否有完成标记
+            if ticket and ticket.done and ticket.result['success']:
+                song['song_downloaded'] = True
+                song['song_file'] = self.final_download_path(ticket.result['path'])
+                self.log_message(f"✓ 检测到手动下载完成: {os.path.basename(ticket.result['path'])}")
+                return True
+            
+            # 检查用户是否点击了完成或跳过（界面消息队列由界面线程处理，这里不能取）
             try:
-                msg = self.queue.get_nowait()
-                if msg[0] == 'download_complete':
+                action = self.manual_actions.get(timeout=1)
+                if action == 'download_complete':
                     # 用户点击完成时，根据选项记录下载状态
                     if self.download_song_enabled.get():
                         song['song_downloaded'] = True
@@ -1203,17 +2290,21 @@ class MusicDownloadAssistant:
                         self.download_lrc(song)
                     
                     self.log_message(f"已记录手动下载完成: {song['song_name']}")
+                    if ticket:
+                        tracker.cancel(ticket)
                     return True
-                elif msg[0] == 'skip_song':
+                elif action == 'skip_song':
                     song['status'] = '已跳过'
                     song['notes'] = '手动跳过'
                     self.log_message(f"已跳过: {song['song_name']}")
+                    if ticket:
+                        tracker.cancel(ticket)
                     return True
             except queue.Empty:
                 pass
-            
-            time.sleep(1)
         
+        if ticket:
+            tracker.cancel(ticket)
         return False
     
     def update_gui_status(self, status):
@@ -1223,13 +2314,13 @@ class MusicDownloadAssistant:
     def mark_as_downloaded(self):
         """标记当前歌曲为已下载"""
         if self.is_running and not self.is_paused:
-            self.queue.put(('download_complete', None))
+            self.manual_actions.put('download_complete')
             self.log_message("已标记当前歌曲为下载完成")
     
     def skip_current(self):
         """跳过当前歌曲"""
         if self.is_running and not self.is_paused:
-            self.queue.put(('skip_song', None))
+            self.manual_actions.put('skip_song')
             self.log_message("已跳过当前歌曲")
     
     def pause_process(self):
@@ -1246,6 +2337,8 @@ class MusicDownloadAssistant:
     def stop_process(self):
         """停止处理"""
         self.is_running = False
+        self.breaker.stop()
+        self.close_download_trackers()
         self.log_message("正在停止处理...")
         
         # 恢复按钮状态
@@ -1265,12 +2358,18 @@ class MusicDownloadAssistant:
                 if msg_type == 'update_status':
                     self.status_label.config(text=f"状态: {data}")
                 elif msg_type == 'update_display':
-                    self.update_songs_display()
-                    self.update_progress_display()
+                    self.request_refresh()
+                elif msg_type == 'update_row':
+                    index, fields = data
+                    self.request_refresh(index, fields)
                 elif msg_type == 'process_complete':
                     self.log_message("所有歌曲处理完成!")
                     self.stop_process()
                     messagebox.showinfo("完成", "所有歌曲处理完成!")
+                elif msg_type == 'process_aborted':
+                    self.log_message(data)
+                    self.stop_process()
+                    messagebox.showwarning("警告", data)
                 elif msg_type == 'show_message':
                     messagebox.showinfo("提示", data)
                 elif msg_type == 'show_error':
@@ -1304,6 +2403,20 @@ class MusicDownloadAssistant:
                     self.retry_on_fail.set(config['retry_on_fail'])
                 if 'retry_count' in config:
                     self.retry_count.set(config['retry_count'])
+                if 'worker_count' in config:
+                    self.worker_count.set(config['worker_count'])
+                if 'concurrency_mode' in config:
+                    self.concurrency_mode.set(config['concurrency_mode'])
+                if 'lean_browser' in config:
+                    self.lean_browser.set(config['lean_browser'])
+                if 'skip_known_failures' in config:
+                    self.skip_known_failures.set(config['skip_known_failures'])
+                if 'native_download' in config:
+                    self.native_download.set(config['native_download'])
+                if 'use_pipeline' in config:
+                    self.use_pipeline.set(config['use_pipeline'])
+                if 'use_job_store' in config:
+                    self.use_job_store.set(config['use_job_store'])
                 
                 # 更新选项状态标签
                 self.update_options_status()
@@ -1319,7 +2432,14 @@ class MusicDownloadAssistant:
             'download_lrc_enabled': self.download_lrc_enabled.get(),
             'auto_click_download': self.auto_click_download.get(),
             'retry_on_fail': self.retry_on_fail.get(),
-            'retry_count': self.retry_count.get()
+            'retry_count': self.retry_count.get(),
+            'worker_count': self.worker_count.get(),
+            'concurrency_mode': self.concurrency_mode.get(),
+            'lean_browser': self.lean_browser.get(),
+            'skip_known_failures': self.skip_known_failures.get(),
+            'native_download': self.native_download.get(),
+            'use_pipeline': self.use_pipeline.get(),
+            'use_job_store': self.use_job_store.get()
         }
         
         try:
@@ -1331,23 +2451,106 @@ class MusicDownloadAssistant:
         except Exception as e:
             messagebox.showerror("错误", f"保存配置失败: {e}")
     
-    def save_progress(self):
-        """保存进度"""
+    def get_progress_journal(self, folder=None):
+        """下载文件夹对应的进度日志，文件夹改变时重新打开"""
+        folder = folder or self.download_folder
+        if self.progress_journal is None or self.progress_journal.folder != folder:
+            if self.progress_journal:
+                self.progress_journal.close()
+            self.progress_journal = ProgressJournal(folder)
+        return self.progress_journal
+    
+    def index_songs(self):
+        """记录每首歌曲在列表中的序号（任务数据库中的歌曲自带序号'_id'）"""
+        if isinstance(self.songs_list, JobList):
+            self.song_positions = {}
+            return
+        self.song_positions = {id(song): i for i, song in enumerate(self.songs_list)}
+    
+    def status_counts(self):
+        """各状态的歌曲数：内存列表由筛选索引随行刷新更新，任务数据库在写入时更新"""
+        return self.list_index.count_by_status()
+    
+    def next_pending_index(self, start):
+        """从start开始的第一首未处理歌曲的序号，没有时返回歌曲总数"""
+        if isinstance(self.songs_list, JobList):
+            return self.songs_list.next_pending(start, FINISHED_STATUSES)
+        for i in range(start, len(self.songs_list)):
+            if self.songs_list[i].get('status') not in FINISHED_STATUSES:
+                return i
+        return len(self.songs_list)
+    
+    def iter_pending(self):
+        """
+        逐个给出未处理歌曲的序号
+        
+        每次从上一首之后查找下一首（任务数据库按状态索引查询），不一次列出全部序号。
+        """
+        index = self.next_pending_index(0)
+        while index < len(self.songs_list):
+            yield index
+            index = self.next_pending_index(index + 1)
+    
+    def pending_count(self):
+        """未处理的歌曲数"""
+        counts = self.status_counts()
+        return len(self.songs_list) - sum(counts.get(status, 0) for status in FINISHED_STATUSES)
+    
+    def has_requeued_songs(self):
+        """是否有放回待处理的歌曲（网站故障时）"""
+        if isinstance(self.songs_list, JobList):
+            return self.songs_list.has_status('待处理')
+        return any(song.get('status') == '待处理' for song in self.songs_list)
+    
+    def save_progress(self, song=None):
+        """
+        保存进度
+        
+        给出歌曲时只在进度日志末尾追加这首歌曲的变化；不给出时写一份完整快照。
+        并行模式下多个工作线程同时保存，由进度日志内部加锁。
+        使用任务数据库时进度就在数据库中，只写回这首歌曲。
+        """
         try:
-            progress_file = os.path.join(self.download_folder, "download_progress.json")
-            
-            progress_data = {
-                'songs': self.songs_list,
-                'current_index': self.current_index,
-                'timestamp': datetime.now().isoformat()
-            }
-            
-            with open(progress_file, 'w', encoding='utf-8') as f:
-                json.dump(progress_data, f, ensure_ascii=False, indent=2)
-            
+            if isinstance(self.songs_list, JobList):
+                if song is not None:
+                    self.songs_list.save(song)
+                return
+            
+            journal = self.get_progress_journal()
+            if song is None:
+                journal.compact(self.songs_list, self.current_index)
+            else:
+                journal.record(self.song_positions[id(song)], song, self.songs_list, self.current_index)
+        
         except Exception as e:
             self.log_message(f"保存进度失败: {e}")
     
+    def restore_progress(self):
+        """下载文件夹中有同一歌曲列表的进度时，询问是否继续上次的进度"""
+        folder = self.folder_path_var.get()
+        if not folder:
+            return
+        
+        progress = self.get_progress_journal(folder).load()
+        if not progress:
+            return
+        
+        saved = progress.get('songs', [])
+        same_list = len(saved) == len(self.songs_list) and all(
+            (old.get('artist'), old.get('song_name')) == (new['artist'], new['song_name'])
+            for old, new in zip(saved, self.songs_list)
+        )
+        finished = sum(1 for song in saved if song.get('status') in FINISHED_STATUSES)
+        if not same_list or not finished:
+            return
+        
+        if messagebox.askyesno("继续上次进度",
+                               f"下载文件夹中有这个歌曲列表的进度（已处理 {finished}/{len(saved)} 首，"
+                               f"保存于 {progress.get('timestamp', '')[:19].replace('T', ' ')}）。\n\n是否继续上次的进度？"):
+            self.songs_list = saved
+            self.current_index = progress.get('current_index', 0)
+            self.log_message(f"已恢复上次进度: 已处理 {finished}/{len(saved)} 首")
+    
     def export_results(self):
         """导出结果"""
         if not self.songs_list:
@@ -1367,12 +2570,11 @@ class MusicDownloadAssistant:
                     f.write("=" * 50 + "\n\n")
                     
                     total = len(self.songs_list)
-                    downloaded = sum(1 for song in self.songs_list 
-                                   if song.get('status') == '已下载')
-                    skipped = sum(1 for song in self.songs_list 
-                                 if song.get('status') == '已跳过')
-                    failed = sum(1 for song in self.songs_list 
-                                if song.get('status') in ['搜索失败', '下载失败', '超时'])
+                    counts = self.status_counts()
+                    downloaded = counts.get('已下载', 0)
+                    skipped = counts.get('已跳过', 0)
+                    failed = sum(counts.get(status, 0) for status in ['搜索失败', '下载失败', '超时'])
+                    deferred = counts.get('暂缓重试', 0)
                     
                     # 统计下载详情
                     songs_downloaded = sum(1 for song in self.songs_list 
@@ -1384,7 +2586,8 @@ class MusicDownloadAssistant:
                     f.write(f"已下载: {downloaded}\n")
                     f.write(f"已跳过: {skipped}\n")
                     f.write(f"失败: {failed}\n")
-                    f.write(f"待处理: {total - downloaded - skipped - failed}\n\n")
+                    f.write(f"暂缓重试(近期反复失败): {deferred}\n")
+                    f.write(f"待处理: {total - downloaded - skipped - failed - deferred}\n\n")
                     
                     f.write(f"歌曲文件下载成功: {songs_downloaded}\n")
                     f.write(f"歌词文件下载成功: {lrc_downloaded}\n\n")
@@ -1416,6 +2619,13 @@ class MusicDownloadAssistant:
             except Exception as e:
                 messagebox.showerror("错误", f"导出失败: {e}")
     
+    def quit_driver(self):
+        """关闭浏览器；连接的是常驻浏览器时只关闭本工具的标签页"""
+        if self.warm_browser:
+            browser_daemon.release(self.driver)
+        else:
+            self.driver.quit()
+    
     def on_closing(self):
         """关闭窗口时的处理"""
         if self.is_running:
@@ -1423,18 +2633,26 @@ class MusicDownloadAssistant:
                 self.stop_process()
                 if self.driver:
                     try:
-                        self.driver.quit()
+                        self.quit_driver()
                         self.log_message("浏览器已关闭")
                     except:
                         pass
+                if self.tab_browser:
+                    self.tab_browser.quit()
+                self.close_download_trackers()
+                self.log_hub.close()
                 self.root.destroy()
         else:
             if self.driver:
                 try:
-                    self.driver.quit()
+                    self.quit_driver()
                     self.log_message("浏览器已关闭")
                 except:
                     pass
+            if self.tab_browser:
+                self.tab_browser.quit()
+            self.close_download_trackers()
+            self.log_hub.close()
             self.root.destroy()
 
 
@@ -1447,6 +2665,7 @@ def main():
     
     # 启动队列消息处理
     root.after(100, app.process_queue_messages)
+    root.after(LOG_DRAIN_MS, app.drain_logs)
     
     root.mainloop()
 
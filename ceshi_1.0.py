@@ -11,9 +11,11 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
 import queue
 from datetime import datetime
+from urllib.parse import quote
+import site_waits
+import driver_resolver
 
 
 class MusicDownloadAssistant:
@@ -30,6 +32,7 @@ class MusicDownloadAssistant:
         self.is_running = False
         self.is_paused = False
         self.queue = queue.Queue()
+        self.base_url = "https://s.myhkw.cn/"
         
         # 创建界面
         self.create_widgets()
@@ -360,30 +363,7 @@ class MusicDownloadAssistant:
             
             # 使用你的配置
             chrome_path = r"C:\Program Files\Google\Chrome\Application\chrome.exe"
-            driver_path = "chromedriver.exe"  # 假设在当前目录
-            
-            if not os.path.exists(driver_path):
-                self.log_message("✗ ChromeDriver未找到")
-                
-                # 尝试其他位置
-                possible_paths = [
-                    "chromedriver.exe",
-                    "./chromedriver.exe",
-                    "C:/chromedriver/chromedriver.exe",
-                    os.path.join(os.path.dirname(__file__), "chromedriver.exe")
-                ]
-                
-                driver_found = False
-                for path in possible_paths:
-                    if os.path.exists(path):
-                        driver_path = path
-                        driver_found = True
-                        self.log_message(f"找到ChromeDriver: {path}")
-                        break
-                
-                if not driver_found:
-                    raise Exception("请将chromedriver.exe放在程序目录")
-            
+            driver_path = driver_resolver.resolve_driver(chrome_path, log=self.log_message)
             self.log_message(f"使用ChromeDriver: {driver_path}")
             
             # 设置Chrome选项 - 针对音乐网站优化
@@ -513,29 +493,20 @@ class MusicDownloadAssistant:
             # 等待结果
             time.sleep(1)
             
-            # 检查结果
-            page_source = self.driver.page_source
-            if "成功 Get √" in page_source:
+            # 检查结果（一次脚本调用读取全部字段）
+            page_data = site_waits.extract_page_data(self.driver) or {}
+            if page_data.get('success'):
                 self.log_message("✓ 搜索成功！")
                 
-                # 尝试查找下载信息
-                try:
-                    download_button = self.driver.find_element(By.ID, "j-src-btn")
+                # 下载信息
+                if page_data.get('song_url'):
                     self.log_message("✓ 找到下载按钮: j-src-btn")
                     
-                    # 获取下载信息
-                    try:
-                        song_name = self.driver.find_element(By.ID, "j-name").get_attribute('value')
-                        artist = self.driver.find_element(By.ID, "j-author").get_attribute('value')
-                        download_url = self.driver.find_element(By.ID, "j-src").get_attribute('value')
-                        
-                        self.log_message(f"歌曲: {song_name}")
-                        self.log_message(f"歌手: {artist}")
-                        self.log_message(f"下载URL: {download_url[:100]}...")
-                    except:
-                        pass
-                        
-                except:
+                    download_url = page_data.get('src') or ''
+                    self.log_message(f"歌曲: {page_data.get('song_name')}")
+                    self.log_message(f"歌手: {page_data.get('artist')}")
+                    self.log_message(f"下载URL: {download_url[:100]}...")
+                else:
                     self.log_message("⚠ 未找到下载按钮")
                 
                 messagebox.showinfo("测试成功", "搜索功能正常！\n请查看浏览器中的搜索结果。")
@@ -655,8 +626,12 @@ class MusicDownloadAssistant:
         # 处理完成
         self.queue.put(('process_complete', None))
     
+    def build_search_url(self, search_query):
+        """构建搜索URL（与geci.py中的格式一致）"""
+        return f"{self.base_url}?name={quote(search_query)}&type=qq"
+    
     def search_song(self, artist, song_name):
-        """搜索歌曲 - 修复版，使用正确的元素ID并选择QQ音乐源"""
+        """搜索歌曲 - 优先直接访问搜索URL（已指定QQ音乐源），失败时回退到表单输入"""
         try:
             self.log_message(f"正在搜索: {artist} - {song_name}")
             
@@ -666,131 +641,158 @@ class MusicDownloadAssistant:
             except:
                 pass
             
-            # 访问网站主页
-            self.driver.get("https://s.myhkw.cn/")
-            time.sleep(1)  # 减少等待时间
-            
-            # 检查当前页面状态
-            page_source = self.driver.page_source
-            
-            # 判断是否在搜索结果页面（显示"成功 Get √ 返回继续"按钮）
-            if "成功 Get √ 返回继续" in page_source:
-                self.log_message("当前在搜索结果页面，需要返回搜索页面")
-                
-                # 找到"返回继续"按钮并点击
-                try:
-                    back_button = self.driver.find_element(By.ID, "j-back")
-                    back_button.click()
-                    self.log_message("已点击返回按钮")
-                    time.sleep(1)  # 减少等待时间
-                except:
-                    # 如果找不到按钮，直接刷新页面
-                    self.driver.get("https://s.myhkw.cn/")
-                    time.sleep(1)  # 减少等待时间
-            
-            # 查找搜索框
-            search_box = None
-            try:
-                search_box = self.driver.find_element(By.ID, "j-input")
-                self.log_message("✓ 找到搜索框: j-input")
-            except:
-                self.log_message("✗ 未找到搜索框")
-                return False
-            
-            # 清空并输入搜索词
-            search_box.clear()
             search_query = f"{song_name}"
             
-            # 逐字符输入，模拟真人
-            for char in search_query:
-                search_box.send_keys(char)
-                time.sleep(0.02)  # 稍微加快输入速度
+            # 直接访问搜索URL，一次页面跳转即可得到结果
+            if self.search_song_by_url(search_query):
+                return self.check_search_result(song_name, artist, require_marker=True)
             
-            self.log_message(f"已输入搜索词: {search_query}")
-            
-            # 选择QQ音乐源（根据截图，QQ选项已经是选中的状态）
-            # 但为了确保，我们可以检查一下QQ选项是否已选中
-            try:
-                # 查找所有的音乐平台选项
-                # 根据截图，QQ是第二个选项（索引1）
-                # 使用XPath查找所有type="radio"的input元素
-                radio_inputs = self.driver.find_elements(By.XPATH, "//input[@type='radio']")
-                
-                if len(radio_inputs) >= 2:  # 至少有两个选项
-                    # 第二个是QQ选项（索引1）
-                    qq_radio = radio_inputs[1]
-                    
-                    # 检查是否已选中
-                    if not qq_radio.is_selected():
-                        # 点击QQ选项
-                        qq_radio.click()
-                        self.log_message("✓ 已选择QQ音乐源")
-                    else:
-                        self.log_message("✓ QQ音乐源已默认选中")
-                else:
-                    self.log_message("⚠ 未找到音乐源选项")
-                    
-            except Exception as e:
-                self.log_message(f"选择音乐源时出错: {e}")
-                # 继续执行，因为QQ通常是默认选中的
+            self.log_message("⚠ 直接搜索未返回结果，改用表单输入搜索")
+            return self.search_song_by_form(artist, song_name, search_query)
+        
+        except Exception as e:
+            self.log_message(f"搜索异常: {e}")
+            import traceback
+            self.log_message(traceback.format_exc())
+            return False
+    
+    def search_song_by_url(self, search_query):
+        """通过搜索URL直接搜索"""
+        try:
+            search_url = self.build_search_url(search_query)
+            self.driver.get(search_url)
+            self.log_message(f"已访问搜索URL: {search_url}")
             
-            # 查找搜索按钮
-            search_button = None
-            try:
-                search_button = self.driver.find_element(By.ID, "j-submit")
-                self.log_message("✓ 找到搜索按钮: j-submit")
-            except:
-                self.log_message("✗ 未找到搜索按钮")
-                return False
+            # 等待搜索结果出现
+            WebDriverWait(self.driver, 10).until(
+                lambda d: "成功 Get √" in d.page_source
+            )
+            return True
+        except Exception as e:
+            self.log_message(f"直接搜索失败: {e}")
+            return False
+    
+    def search_song_by_form(self, artist, song_name, search_query):
+        """通过搜索表单搜索（备用方式），使用正确的元素ID并选择QQ音乐源"""
+        # 访问网站主页
+        self.driver.get(self.base_url)
+        time.sleep(1)  # 减少等待时间
+        
+        # 检查当前页面状态
+        page_source = self.driver.page_source
+        
+        # 判断是否在搜索结果页面（显示"成功 Get √ 返回继续"按钮）
+        if "成功 Get √ 返回继续" in page_source:
+            self.log_message("当前在搜索结果页面，需要返回搜索页面")
             
-            # 点击搜索按钮
+            # 找到"返回继续"按钮并点击
             try:
-                search_button.click()
-                self.log_message("已点击搜索按钮")
+                back_button = self.driver.find_element(By.ID, "j-back")
+                back_button.click()
+                self.log_message("已点击返回按钮")
+                time.sleep(1)  # 减少等待时间
             except:
-                # 尝试JavaScript点击
-                self.driver.execute_script("arguments[0].click();", search_button)
-                self.log_message("已通过JavaScript点击搜索按钮")
-            
-            # 等待搜索结果 - 减少等待时间
-            time.sleep(2)  # 减少到2秒
-            
-            return self.check_search_result(song_name, artist)
+                # 如果找不到按钮，直接刷新页面
+                self.driver.get(self.base_url)
+                time.sleep(1)  # 减少等待时间
+        
+        # 查找搜索框
+        search_box = None
+        try:
+            search_box = self.driver.find_element(By.ID, "j-input")
+            self.log_message("✓ 找到搜索框: j-input")
+        except:
+            self.log_message("✗ 未找到搜索框")
+            return False
+        
+        # 清空并输入搜索词
+        search_box.clear()
+        
+        # 逐字符输入，模拟真人
+        for char in search_query:
+            search_box.send_keys(char)
+            time.sleep(0.02)  # 稍微加快输入速度
+        
+        self.log_message(f"已输入搜索词: {search_query}")
+        
+        # 选择QQ音乐源（根据截图，QQ选项已经是选中的状态）
+        # 但为了确保，我们可以检查一下QQ选项是否已选中
+        try:
+            # 查找所有的音乐平台选项
+            # 根据截图，QQ是第二个选项（索引1）
+            # 使用XPath查找所有type="radio"的input元素
+            radio_inputs = self.driver.find_elements(By.XPATH, "//input[@type='radio']")
             
+            if len(radio_inputs) >= 2:  # 至少有两个选项
+                # 第二个是QQ选项（索引1）
+                qq_radio = radio_inputs[1]
+                
+                # 检查是否已选中
+                if not qq_radio.is_selected():
+                    # 点击QQ选项
+                    qq_radio.click()
+                    self.log_message("✓ 已选择QQ音乐源")
+                else:
+                    self.log_message("✓ QQ音乐源已默认选中")
+            else:
+                self.log_message("⚠ 未找到音乐源选项")
+        
         except Exception as e:
-            self.log_message(f"搜索异常: {e}")
-            import traceback
-            self.log_message(traceback.format_exc())
+            self.log_message(f"选择音乐源时出错: {e}")
+            # 继续执行，因为QQ通常是默认选中的
+        
+        # 查找搜索按钮
+        search_button = None
+        try:
+            search_button = self.driver.find_element(By.ID, "j-submit")
+            self.log_message("✓ 找到搜索按钮: j-submit")
+        except:
+            self.log_message("✗ 未找到搜索按钮")
             return False
+        
+        # 点击搜索按钮
+        try:
+            search_button.click()
+            self.log_message("已点击搜索按钮")
+        except:
+            # 尝试JavaScript点击
+            self.driver.execute_script("arguments[0].click();", search_button)
+            self.log_message("已通过JavaScript点击搜索按钮")
+        
+        # 等待搜索结果 - 减少等待时间
+        time.sleep(2)  # 减少到2秒
+        
+        return self.check_search_result(song_name, artist)
     
-    def check_search_result(self, song_name, artist):
+    def check_search_result(self, song_name, artist, require_marker=False):
         """检查搜索结果"""
         try:
-            current_url = self.driver.current_url
-            page_title = self.driver.title
-            page_source = self.driver.page_source
+            page_data = site_waits.extract_page_data(self.driver) or {}
+            current_url = page_data.get('url') or self.driver.current_url
             
             self.log_message(f"搜索后URL: {current_url}")
-            self.log_message(f"搜索后标题: {page_title}")
+            self.log_message(f"搜索后标题: {page_data.get('title', '')}")
             
             # 检查是否显示搜索结果
-            if "成功 Get √" in page_source:
+            if page_data.get('success'):
                 self.log_message("✓ 搜索成功: 显示'成功 Get √'")
                 
                 # 检查是否找到歌曲
-                if song_name in page_source or artist in page_source:
+                found = f"{page_data.get('song_name') or ''} {page_data.get('artist') or ''}"
+                if song_name in found or artist in found:
                     self.log_message(f"✓ 在页面中找到 '{song_name}'")
                 else:
                     self.log_message(f"⚠ 未在页面中找到 '{song_name}'，但搜索功能正常")
                 
                 return True
-            elif current_url != "https://s.myhkw.cn/":
+            elif not require_marker and current_url != self.base_url:
+                # 直接访问搜索URL时URL本身就已改变，不能作为成功依据
                 self.log_message(f"✓ 搜索成功: URL已改变")
                 return True
             else:
                 self.log_message("✗ 搜索可能失败")
                 return False
-            
+        
         except Exception as e:
             self.log_message(f"检查结果异常: {e}")
             return False
@@ -0,0 +1,191 @@
+"""失败分类与熔断
+
+把每次失败归入以下几类：
+- site_down       网站无法访问（连接失败、超时、5xx）
+- layout_changed  页面能打开但找不到搜索框、按钮等元素（网站改版）
+- throttled       被限流（429/503、返回HTML页面而不是歌词）
+- not_found       网站正常，但搜不到这首歌
+- local_io        本地文件读写失败（磁盘满、没有权限等）
+
+前三类是整个网站的问题，与具体歌曲无关。连续出现多次时熔断：暂停整个批次，
+按指数退避探测网站，恢复后自动继续。熔断期间失败的歌曲放回待处理，不记为失败。
+"""
+import threading
+
+import requests
+
+import http_client
+
+
+SITE_DOWN = 'site_down'
+LAYOUT_CHANGED = 'layout_changed'
+THROTTLED = 'throttled'
+NOT_FOUND = 'not_found'
+LOCAL_IO = 'local_io'
+
+FAILURE_NAMES = {
+    SITE_DOWN: '网站无法访问',
+    LAYOUT_CHANGED: '页面结构变化',
+    THROTTLED: '网站限流',
+    NOT_FOUND: '未找到歌曲',
+    LOCAL_IO: '本地文件错误',
+}
+
+# 与具体歌曲无关的失败，连续出现时熔断
+SYSTEMIC_FAILURES = (SITE_DOWN, LAYOUT_CHANGED, THROTTLED)
+
+# 连续多少次网站级失败后熔断
+FAILURE_THRESHOLD = 5
+
+# 探测间隔（秒），每次探测失败翻倍
+PROBE_DELAY = 30
+PROBE_DELAY_MAX = 600
+
+
+def classify_exception(e):
+    """根据异常判断失败类型"""
+    if isinstance(e, OSError) and not isinstance(e, requests.exceptions.RequestException):
+        return LOCAL_IO
+    if isinstance(e, requests.exceptions.HTTPError) and e.response is not None:
+        return classify_status(e.response.status_code) or SITE_DOWN
+    if isinstance(e, requests.exceptions.RequestException):
+        return SITE_DOWN
+    message = str(e).lower()
+    # selenium的页面加载失败（net::ERR_CONNECTION_REFUSED、ERR_NAME_NOT_RESOLVED等）和超时
+    if 'net::err' in message or 'timeout' in message or 'timed out' in message:
+        return SITE_DOWN
+    if 'no such element' in message or 'unable to locate element' in message:
+        return LAYOUT_CHANGED
+    return None
+
+
+def classify_status(status_code):
+    """根据HTTP状态码判断失败类型，正常状态返回None"""
+    if status_code in (429, 503):
+        return THROTTLED
+    if status_code >= 500:
+        return SITE_DOWN
+    return None
+
+
+def probe_url(url, markers=(), timeout=10):
+    """
+    HTTP探测：网站能正常返回页面，并且页面中有markers中的全部文字时返回True
+    
+    只检查状态码时，页面结构变化（layout_changed）引起的熔断探测一次就会"恢复"，
+    接着又被后面的歌曲触发；给出搜索框等元素的标记可以一并确认页面结构。
+    """
+    try:
+        response = http_client.get(url, timeout=timeout)
+        if response.status_code >= 400:
+            return False
+        return all(marker in response.text for marker in markers)
+    except Exception:
+        return False
+
+
+class CircuitBreaker:
+    """
+    多个工作线程共用的熔断器
+
+    熔断后在后台线程中按退避间隔探测，探测成功即恢复；
+    处理循环在is_open为True时暂停，与用户点击暂停相同。
+
+    Args:
+        probe: 探测函数，返回True表示网站已恢复
+        threshold: 连续多少次网站级失败后熔断
+        probe_delay: 首次探测前的等待时间（秒）
+        probe_delay_max: 探测间隔上限
+        log: 日志函数
+        on_close: 网站恢复、熔断结束时调用（在探测线程中）
+    """
+    def __init__(self, probe, threshold=FAILURE_THRESHOLD, probe_delay=PROBE_DELAY,
+                 probe_delay_max=PROBE_DELAY_MAX, log=print, on_close=None):
+        self.probe = probe
+        self.on_close = on_close
+        self.threshold = threshold
+        self.probe_delay = probe_delay
+        self.probe_delay_max = probe_delay_max
+        self.log = log
+        self.lock = threading.Lock()
+        self.closed = threading.Event()
+        self.closed.set()
+        self.stopped = threading.Event()
+        self.consecutive = 0
+        self.reason = None
+
+    @property
+    def is_open(self):
+        return not self.closed.is_set()
+
+    def record_success(self):
+        with self.lock:
+            self.consecutive = 0
+
+    def record_failure(self, kind):
+        """
+        记录一次失败
+
+        Returns:
+            bool: 是否为网站级失败（调用方应把歌曲放回待处理，而不是记为失败）
+        """
+        if kind not in SYSTEMIC_FAILURES:
+            # 网站能正常回答"没有这首歌"，说明网站本身没有问题
+            if kind == NOT_FOUND:
+                self.record_success()
+            return False
+
+        with self.lock:
+            self.consecutive += 1
+            if self.consecutive < self.threshold or self.is_open or self.stopped.is_set():
+                return True
+            self.reason = kind
+            self.closed.clear()
+        self.log(f"⚠ 连续 {self.threshold} 次{FAILURE_NAMES[kind]}，暂停处理，等待网站恢复")
+        threading.Thread(target=self._probe_loop, daemon=True).start()
+        return True
+
+    def wait_until_closed(self, should_continue=lambda: True):
+        """
+        熔断时阻塞到网站恢复
+
+        Returns:
+            bool: 网站已恢复返回True，等待中被停止返回False
+        """
+        while not self.closed.wait(0.5):
+            if not should_continue():
+                return False
+        return True
+
+    def stop(self):
+        """结束探测（批次结束时调用）"""
+        self.stopped.set()
+        self.closed.set()
+
+    def _probe_loop(self):
+        delay = self.probe_delay
+        while self.is_open:
+            self.log(f"{delay} 秒后探测网站是否恢复...")
+            if self.stopped.wait(delay):
+                return
+
+            try:
+                healthy = self.probe()
+            except Exception as e:
+                self.log(f"探测网站出错: {e}")
+                healthy = False
+
+            if healthy:
+                if self.on_close:
+                    # 先于恢复处理调用，工作线程看到熔断结束时已是新的状态
+                    try:
+                        self.on_close()
+                    except Exception as e:
+                        self.log(f"熔断结束回调出错: {e}")
+                with self.lock:
+                    self.consecutive = 0
+                    self.reason = None
+                    self.closed.set()
+                self.log("✓ 网站已恢复，继续处理")
+                return
+            delay = min(self.probe_delay_max, delay * 2)
@@ -0,0 +1,269 @@
+"""浏览器下载完成跟踪
+
+监视Chrome的下载目录，把新出现的 .crdownload 临时文件对应到正在处理的歌曲，
+临时文件改名为最终文件名时即为下载完成，记录文件大小和耗时。
+点击下载按钮后不必等待，下载完成或失败时通过回调通知。
+
+安装了watchdog时使用系统的文件变化通知（Windows的ReadDirectoryChangesW、
+Linux的inotify），否则定时扫描目录。
+"""
+import os
+import threading
+import time
+from collections import deque
+
+
+# Chrome下载中的临时文件扩展名（包括 "Unconfirmed 123.crdownload"）
+TEMP_EXTENSIONS = ('.crdownload',)
+
+# 下载目录中不属于浏览器下载的文件：链接、歌词、进度文件，
+# 直接下载的 .part/.part.json，写快照用的临时文件
+IGNORED_EXTENSIONS = ('.txt', '.lrc', '.json', '.part', '.journal', '.tmp', '.new')
+
+# 程序自己写在下载目录中的文件（进度记录、任务数据库及其-wal/-shm、日志及滚动的旧日志）
+APP_FILE_PREFIXES = ('download_progress.', 'song_jobs.db', 'music_assistant.log')
+
+# 点击后多久没有出现临时文件视为下载未开始（秒）
+START_TIMEOUT = 30
+
+# 临时文件多久没有增长视为下载停滞（秒）
+STALL_TIMEOUT = 120
+
+# 没有watchdog时的扫描间隔（秒）；有watchdog时只用于检查超时
+POLL_INTERVAL = 0.5
+
+
+class DownloadTicket:
+    """一次预期的下载"""
+    def __init__(self, label, callback=None):
+        self.label = label
+        self.callback = callback
+        self.created = time.time()
+        self.temp_name = None       # 当前的临时文件名
+        self.temp_gone = False      # 临时文件已消失（改名或被删除）
+        self.last_size = -1
+        self.last_growth = self.created
+        self.result = None
+        self.event = threading.Event()
+
+    @property
+    def done(self):
+        return self.event.is_set()
+
+    def wait(self, timeout=None):
+        """
+        等待下载结束
+
+        Returns:
+            dict: {'success', 'path', 'size', 'seconds', 'error'}；超时仍未结束返回None
+        """
+        self.event.wait(timeout)
+        return self.result
+
+
+class DownloadTracker:
+    """
+    跟踪一个下载目录中的浏览器下载
+
+    Args:
+        download_dir: 浏览器下载目录
+        log: 日志函数
+        moved_to: 完成的文件可能被移动到的目录（如并行模式的最终下载文件夹）
+    """
+    def __init__(self, download_dir, log=print, moved_to=None):
+        self.download_dir = download_dir
+        self.log = log
+        self.moved_to = moved_to
+        self.lock = threading.Lock()
+        self.tickets = deque()
+        self.known = self._list_files()
+        self.changed = threading.Event()
+        self.running = True
+        self.observer = self._start_observer()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _start_observer(self):
+        """有watchdog时订阅目录变化通知"""
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            return None
+
+        tracker = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                tracker.changed.set()
+
+        observer = Observer()
+        observer.schedule(Handler(), self.download_dir, recursive=False)
+        observer.daemon = True
+        observer.start()
+        return observer
+
+    def expect(self, label, callback=None):
+        """
+        登记一次即将开始的下载，在点击下载按钮之前调用
+
+        Args:
+            label: 说明（如歌曲名），用于日志
+            callback: 下载结束时调用 callback(result)，在跟踪线程中执行
+
+        Returns:
+            DownloadTicket
+        """
+        ticket = DownloadTicket(label, callback)
+        with self.lock:
+            self.tickets.append(ticket)
+        return ticket
+
+    def cancel(self, ticket):
+        """不再跟踪一次下载（如点击下载按钮失败）"""
+        with self.lock:
+            if ticket in self.tickets:
+                self.tickets.remove(ticket)
+
+    def pending_count(self):
+        """尚未结束的下载数"""
+        with self.lock:
+            return len(self.tickets)
+
+    def close(self):
+        self.running = False
+        self.changed.set()
+        if self.observer:
+            self.observer.stop()
+
+    def _list_files(self):
+        try:
+            with os.scandir(self.download_dir) as entries:
+                return {entry.name: entry.stat().st_size for entry in entries
+                        if entry.is_file() and not self._ignored(entry.name)}
+        except OSError:
+            return {}
+    
+    @staticmethod
+    def _ignored(name):
+        """隐藏文件、程序自己的文件和直接下载的文件不参与跟踪"""
+        lower = name.lower()
+        return (name.startswith('.') or lower.endswith(IGNORED_EXTENSIONS)
+                or lower.startswith(APP_FILE_PREFIXES))
+
+    def _run(self):
+        while self.running:
+            self.changed.wait(POLL_INTERVAL)
+            self.changed.clear()
+            try:
+                self._scan()
+            except Exception as e:
+                self.log(f"下载跟踪出错: {e}")
+
+    def _scan(self):
+        """对比目录内容，把新文件对应到等待中的下载"""
+        current = self._list_files()
+        added = sorted(set(current) - set(self.known), key=lambda name: self._mtime(name))
+        removed = set(self.known) - set(current)
+        self.known = current
+        now = time.time()
+        finished = []
+
+        with self.lock:
+            for ticket in self.tickets:
+                if ticket.temp_name in removed:
+                    ticket.temp_gone = True
+
+            for name in added:
+                if name.lower().endswith(TEMP_EXTENSIONS):
+                    # Chrome先建 "Unconfirmed xxx.crdownload"，确定文件名后改名为 "歌曲.mp3.crdownload"
+                    ticket = (self._find(lambda t: t.temp_gone)
+                              or self._find(lambda t: t.temp_name is None))
+                    if ticket:
+                        ticket.temp_name = name
+                        ticket.temp_gone = False
+                        ticket.last_growth = now
+                else:
+                    # 最终文件出现：只对应到临时文件同名或临时文件刚消失的下载，
+                    # 没有经过 .crdownload 的新文件（如直接下载的歌曲）不是浏览器下载
+                    ticket = (self._find(lambda t: t.temp_name == name + '.crdownload')
+                              or self._find(lambda t: t.temp_gone))
+                    if ticket:
+                        ticket.result = {
+                            'success': True,
+                            'path': os.path.join(self.download_dir, name),
+                            'size': current[name],
+                            'seconds': now - ticket.created,
+                            'error': None,
+                        }
+                        finished.append(ticket)
+
+            # 超时检查
+            for ticket in self.tickets:
+                if ticket in finished:
+                    continue
+                if ticket.temp_name and not ticket.temp_gone:
+                    size = current.get(ticket.temp_name, 0)
+                    if size != ticket.last_size:
+                        ticket.last_size = size
+                        ticket.last_growth = now
+                    elif now - ticket.last_growth > STALL_TIMEOUT:
+                        ticket.result = self._failure(ticket, now, "下载停滞")
+                        finished.append(ticket)
+                elif ticket.temp_name is None and now - ticket.created > START_TIMEOUT:
+                    ticket.result = self._failure(ticket, now, "下载未开始")
+                    finished.append(ticket)
+                elif ticket.temp_gone:
+                    moved_path = self._moved_path(ticket.temp_name)
+                    if moved_path:
+                        # 完成后在两次扫描之间就被移走了
+                        ticket.result = {
+                            'success': True,
+                            'path': moved_path,
+                            'size': os.path.getsize(moved_path),
+                            'seconds': now - ticket.created,
+                            'error': None,
+                        }
+                        finished.append(ticket)
+                    elif now - ticket.last_growth > START_TIMEOUT:
+                        # 临时文件消失后没有出现最终文件（下载被取消）
+                        ticket.result = self._failure(ticket, now, "下载被取消")
+                        finished.append(ticket)
+
+            for ticket in finished:
+                self.tickets.remove(ticket)
+
+        for ticket in finished:
+            ticket.event.set()
+            if ticket.callback:
+                try:
+                    ticket.callback(ticket.result)
+                except Exception as e:
+                    self.log(f"下载完成回调出错: {e}")
+
+    def _find(self, predicate):
+        """按登记顺序找第一个符合条件的下载"""
+        for ticket in self.tickets:
+            if ticket.result is None and predicate(ticket):
+                return ticket
+        return None
+
+    def _moved_path(self, temp_name):
+        """临时文件对应的最终文件已在moved_to目录中时返回其路径"""
+        if not self.moved_to:
+            return None
+        final_name, ext = os.path.splitext(temp_name)
+        if ext.lower() not in TEMP_EXTENSIONS or not final_name:
+            return None
+        path = os.path.join(self.moved_to, final_name)
+        return path if os.path.isfile(path) else None
+    
+    def _mtime(self, name):
+        try:
+            return os.path.getmtime(os.path.join(self.download_dir, name))
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _failure(ticket, now, error):
+        return {'success': False, 'path': None, 'size': 0, 'seconds': now - ticket.created, 'error': error}
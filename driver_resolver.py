@@ -0,0 +1,195 @@
+"""ChromeDriver路径解析（带离线缓存）
+
+所有工具共用的chromedriver查找逻辑：
+1. 缓存中已有与当前Chrome版本对应的chromedriver且文件仍在，直接使用，不访问网络
+2. 依次检查程序目录中自带的chromedriver、以前约定的几个位置和PATH，
+   主版本号与Chrome一致的即可使用
+3. 以上都没有时才用webdriver_manager联网下载
+解析结果按Chrome版本写入缓存，离线环境下也能稳定、快速地启动浏览器。
+"""
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 解析结果缓存：{Chrome版本: {'path': chromedriver路径, 'driver_version': 版本}}
+CACHE_FILE = os.path.join(APP_DIR, "chromedriver_cache.json")
+
+DRIVER_NAME = "chromedriver.exe" if os.name == 'nt' else "chromedriver"
+
+# 程序目录中自带的chromedriver优先，其次是以前约定的位置
+DRIVER_CANDIDATES = [
+    os.path.join(APP_DIR, DRIVER_NAME),
+    DRIVER_NAME,
+    "C:/chromedriver/chromedriver.exe",
+]
+
+CHROME_PATHS = [
+    r"C:\Program Files\Google\Chrome\Application\chrome.exe",
+    r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
+    "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+]
+
+_VERSION_PATTERN = re.compile(r'(\d+)\.(\d+)\.(\d+)\.(\d+)')
+
+
+def _major(version):
+    """主版本号"""
+    return version.split('.', 1)[0] if version else None
+
+
+def _run_version(path):
+    """运行 path --version 并提取版本号"""
+    try:
+        result = subprocess.run([path, '--version'], capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = _VERSION_PATTERN.search(result.stdout or '')
+    return match.group(0) if match else None
+
+
+def find_chrome(chrome_path=None):
+    """查找Chrome可执行文件"""
+    if chrome_path and os.path.exists(chrome_path):
+        return chrome_path
+    for path in CHROME_PATHS:
+        if os.path.exists(path):
+            return path
+    for name in ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser"):
+        path = shutil.which(name)
+        if path:
+            return path
+    return None
+
+
+def get_chrome_version(chrome_path=None):
+    """获取已安装的Chrome版本，获取不到返回None"""
+    if sys.platform == 'win32':
+        # Windows上chrome.exe --version不输出内容，从注册表读取
+        try:
+            import winreg
+            for root in (winreg.HKEY_CURRENT_USER, winreg.HKEY_LOCAL_MACHINE):
+                try:
+                    with winreg.OpenKey(root, r"Software\Google\Chrome\BLBeacon") as key:
+                        return winreg.QueryValueEx(key, "version")[0]
+                except OSError:
+                    continue
+        except ImportError:
+            pass
+
+        # 安装目录下有以版本号命名的文件夹
+        chrome_path = find_chrome(chrome_path)
+        if chrome_path:
+            try:
+                for name in os.listdir(os.path.dirname(chrome_path)):
+                    if _VERSION_PATTERN.fullmatch(name):
+                        return name
+            except OSError:
+                pass
+        return None
+
+    chrome_path = find_chrome(chrome_path)
+    return _run_version(chrome_path) if chrome_path else None
+
+
+def get_driver_version(driver_path):
+    """获取chromedriver版本"""
+    return _run_version(driver_path)
+
+
+def _load_cache():
+    try:
+        with open(CACHE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(chrome_version, driver_path, driver_version):
+    # 不知道Chrome版本时不缓存，否则Chrome升级后仍会一直使用旧的chromedriver
+    if not chrome_version:
+        return
+    cache = _load_cache()
+    cache[chrome_version] = {
+        'path': os.path.abspath(driver_path),
+        'driver_version': driver_version,
+    }
+    try:
+        with open(CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False, indent=2)
+    except OSError:
+        pass
+
+
+def _local_candidates():
+    """本地可能存在的chromedriver"""
+    seen = set()
+    paths = list(DRIVER_CANDIDATES)
+    which = shutil.which('chromedriver')
+    if which:
+        paths.append(which)
+    for path in paths:
+        full = os.path.abspath(path)
+        if full not in seen and os.path.isfile(full):
+            seen.add(full)
+            yield full
+
+
+def resolve_driver(chrome_path=None, log=print, allow_download=True):
+    """
+    解析与已安装Chrome匹配的chromedriver路径
+
+    Args:
+        chrome_path: Chrome可执行文件路径，用于确定版本
+        log: 日志函数
+        allow_download: 本地没有匹配的chromedriver时是否联网下载
+
+    Returns:
+        str: chromedriver路径
+
+    Raises:
+        Exception: 找不到可用的chromedriver
+    """
+    chrome_version = get_chrome_version(chrome_path)
+    chrome_major = _major(chrome_version)
+
+    # 1. 缓存命中：同一Chrome版本直接使用上次的结果（版本未知时每次重新查找）
+    cached = _load_cache().get(chrome_version) if chrome_version else None
+    if cached and os.path.isfile(cached.get('path', '')):
+        return cached['path']
+
+    # 2. 本地chromedriver，主版本号一致即可
+    fallback = None
+    for path in _local_candidates():
+        driver_version = get_driver_version(path)
+        if chrome_major is None or _major(driver_version) == chrome_major:
+            log(f"找到ChromeDriver: {path} ({driver_version or '版本未知'})")
+            _save_cache(chrome_version, path, driver_version)
+            return path
+        if fallback is None:
+            fallback = (path, driver_version)
+
+    # 3. 联网下载
+    if allow_download:
+        try:
+            from webdriver_manager.chrome import ChromeDriverManager
+            log("本地没有匹配的ChromeDriver，正在联网下载...")
+            path = ChromeDriverManager().install()
+            driver_version = get_driver_version(path)
+            _save_cache(chrome_version, path, driver_version)
+            return path
+        except Exception as e:
+            log(f"下载ChromeDriver失败: {e}")
+
+    # 版本不一致的chromedriver也比没有强，交给Chrome启动时报告具体错误
+    if fallback:
+        path, driver_version = fallback
+        log(f"⚠ ChromeDriver版本({driver_version})与Chrome({chrome_version})不一致: {path}")
+        return path
+
+    raise Exception("请将chromedriver.exe放在程序目录")
@@ -11,11 +11,16 @@ from datetime import datetime
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
+import site_waits
+from http_resolver import HttpResolver
+import network_capture
+import browser_profile
+import browser_daemon
+import driver_resolver
+from resolver_cache import ResolverCache
+from blob_store import BlobStore
+import http_client
+from pacing import Pacer, THROTTLE_STATUS_CODES
 
 class MusicLyricsDownloaderGUI:
     def __init__(self, root):
@@ -30,7 +35,7 @@ class MusicLyricsDownloaderGUI:
         self.create_widgets()
         
         # 初始化下载器
-        self.downloader = SeleniumLyricsDownloader()
+        self.downloader = SeleniumLyricsDownloader(log=lambda msg: self.log_message(msg, "warning"))
         
         # 状态变量
         self.is_processing = False
@@ -86,6 +91,33 @@ class MusicLyricsDownloaderGUI:
         )
         self.init_browser_btn.grid(row=0, column=1)
         
+        # HTTP直连解析：页面能直接解析时不启动浏览器
+        self.http_first_var = tk.BooleanVar(value=True)
+        http_first_check = ttk.Checkbutton(
+            browser_frame,
+            text="优先HTTP直连解析 (无需浏览器)",
+            variable=self.http_first_var
+        )
+        http_first_check.grid(row=0, column=2, padx=(20, 0))
+        
+        # 网络请求捕获：从播放器发出的请求中直接拿到资源地址（初始化浏览器时生效）
+        self.capture_network_var = tk.BooleanVar(value=False)
+        capture_network_check = ttk.Checkbutton(
+            browser_frame,
+            text="捕获网络请求",
+            variable=self.capture_network_var
+        )
+        capture_network_check.grid(row=0, column=3, padx=(20, 0))
+        
+        # 精简模式：不加载图片、字体、媒体和第三方脚本（初始化浏览器时生效）
+        self.lean_profile_var = tk.BooleanVar(value=True)
+        lean_profile_check = ttk.Checkbutton(
+            browser_frame,
+            text="精简模式",
+            variable=self.lean_profile_var
+        )
+        lean_profile_check.grid(row=0, column=4, padx=(20, 0))
+        
         # 文件选择区域
         file_frame = ttk.LabelFrame(main_frame, text="歌曲列表文件", padding="10")
         file_frame.grid(row=2, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 10))
@@ -262,11 +294,22 @@ class MusicLyricsDownloaderGUI:
         """初始化浏览器"""
         try:
             self.log_message("正在初始化Chrome浏览器...", "info")
+            self.apply_resolver_settings()
             self.downloader.init_browser(self.headless_var.get())
-            self.log_message("✓ 浏览器初始化成功", "success")
+            if self.downloader.attached:
+                self.log_message("✓ 已连接常驻浏览器", "success")
+            else:
+                self.log_message("✓ 浏览器初始化成功", "success")
         except Exception as e:
             self.log_message(f"✗ 浏览器初始化失败: {e}", "error")
             
+    def apply_resolver_settings(self):
+        """把界面上的解析设置同步给下载器"""
+        self.downloader.use_http_resolver = self.http_first_var.get()
+        self.downloader.headless = self.headless_var.get()
+        self.downloader.capture_network = self.capture_network_var.get()
+        self.downloader.lean_profile = self.lean_profile_var.get()
+        
     def log_message(self, message, level="info"):
         """记录日志消息"""
         timestamp = datetime.now().strftime("%H:%M:%S")
@@ -372,8 +415,10 @@ class MusicLyricsDownloaderGUI:
             messagebox.showerror("错误", f"解析歌曲列表失败: {e}")
             return
             
-        # 检查浏览器是否初始化
-        if not self.downloader.is_initialized():
+        # 检查浏览器是否初始化（HTTP直连解析时按需启动浏览器，全部命中缓存时不需要浏览器）
+        self.apply_resolver_settings()
+        if (not self.http_first_var.get() and not self.downloader.is_initialized()
+                and not self.downloader.all_cached(self.songs)):
             messagebox.showwarning("警告", "请先初始化浏览器")
             return
             
@@ -427,9 +472,6 @@ class MusicLyricsDownloaderGUI:
                 
                 # 更新统计
                 self.update_stats(success_count, fail_count, total)
-                
-                # 延迟
-                time.sleep(1)
             
             # 处理完成
             self.log_message(f"处理完成! 成功: {success_count}, 失败: {fail_count}", "info")
@@ -453,8 +495,10 @@ class MusicLyricsDownloaderGUI:
             messagebox.showerror("错误", "请输入歌曲名和歌手")
             return
             
-        # 检查浏览器是否初始化
-        if not self.downloader.is_initialized():
+        # 检查浏览器是否初始化（HTTP直连解析时按需启动浏览器，命中缓存时不需要浏览器）
+        self.apply_resolver_settings()
+        if (not self.http_first_var.get() and not self.downloader.is_initialized()
+                and not self.downloader.all_cached([{'song': song_name, 'artist': artist}])):
             messagebox.showwarning("警告", "请先初始化浏览器")
             return
             
@@ -505,11 +549,12 @@ class MusicLyricsDownloaderGUI:
             test_url = "https://s.myhkw.cn/?name=Always%20Online%20%E6%9E%97%E4%BF%8A%E6%9D%B0&type=qq"
             self.log_message(f"测试URL: {test_url}", "info")
             
-            if not self.downloader.is_initialized():
+            self.apply_resolver_settings()
+            if not self.http_first_var.get() and not self.downloader.is_initialized():
                 self.downloader.init_browser(self.headless_var.get())
             
             # 获取页面
-            page_data = self.downloader.get_page_with_selenium(test_url)
+            page_data = self.downloader.get_page(test_url)
             
             if page_data and page_data.get('lyrics_url'):
                 self.log_message(f"✓ 连接成功，找到歌词链接", "success")
@@ -644,13 +689,33 @@ class MusicLyricsDownloaderGUI:
 
 
 class SeleniumLyricsDownloader:
-    """使用Selenium的歌词下载器"""
-    def __init__(self):
+    """
+    使用Selenium的歌词下载器
+    
+    Args:
+        log: 日志函数（如界面的日志框），默认打印到控制台
+        resolver_cache / blob_store: 共用的解析缓存和存储，不传时自己创建
+    """
+    def __init__(self, log=print, resolver_cache=None, blob_store=None):
+        self.log = log
         self.driver = None
         self.base_url = "https://s.myhkw.cn/"
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
         }
+        self.http_resolver = HttpResolver(self.headers)
+        self.use_http_resolver = True  # 优先HTTP直连解析
+        self.headless = True           # 回退到Selenium时按需启动浏览器所用的模式
+        self.capture_network = False   # 从网络请求中捕获资源地址
+        self.lean_profile = True       # 精简浏览器，不加载图片、字体、媒体和第三方脚本
+        self.attached = False          # 是否连接的是常驻浏览器
+        self.network = None
+        # 解析结果缓存和歌词/封面存储可由调用方传入共用的实例，只关闭自己创建的
+        self.owns_resolver_cache = resolver_cache is None
+        self.owns_blob_store = blob_store is None
+        self.resolver_cache = resolver_cache or ResolverCache()
+        self.blob_store = blob_store or BlobStore()
+        self.pacer = Pacer(log=log)            # 按网站响应调整请求间隔
         
     def is_initialized(self):
         """检查浏览器是否已初始化"""
@@ -658,6 +723,7 @@ class SeleniumLyricsDownloader:
         
     def init_browser(self, headless=True):
         """初始化Chrome浏览器"""
+        self.headless = headless
         chrome_options = Options()
         if headless:
             chrome_options.add_argument("--headless")
@@ -671,8 +737,26 @@ class SeleniumLyricsDownloader:
         chrome_options.add_experimental_option('useAutomationExtension', False)
         chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
         
-        service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=service, options=chrome_options)
+        if self.capture_network:
+            network_capture.enable_performance_logging(chrome_options)
+        if self.lean_profile:
+            browser_profile.apply_lean_options(chrome_options)
+        
+        driver_path = driver_resolver.resolve_driver()
+        
+        # 常驻浏览器（browser_daemon.py）在运行时直接连接，不再冷启动
+        self.driver = browser_daemon.attach(
+            driver_path,
+            page_load_strategy=chrome_options.page_load_strategy,
+            logging_prefs=chrome_options.capabilities.get('goog:loggingPrefs')
+        )
+        self.attached = self.driver is not None
+        if not self.driver:
+            service = Service(driver_path)
+            self.driver = webdriver.Chrome(service=service, options=chrome_options)
+        if self.lean_profile:
+            browser_profile.apply_lean_blocking(self.driver, block_images=self.attached)
+        self.network = network_capture.NetworkCapture(self.driver) if self.capture_network else None
         
     def parse_song_list(self, file_path):
         """解析歌曲列表文件"""
@@ -704,72 +788,110 @@ class SeleniumLyricsDownloader:
         encoded_query = quote(search_query)
         return f"{self.base_url}?name={encoded_query}&type=qq"
     
+    def get_page(self, url):
+        """获取搜索页面：优先HTTP直连解析，内容由前端渲染而缺失时再使用Selenium"""
+        if self.use_http_resolver:
+            try:
+                page_data = self.http_resolver.fetch_page(url)
+                if page_data:
+                    return page_data
+            except Exception as e:
+                self.log(f"HTTP解析失败，改用Selenium: {e}")
+        
+        if not self.driver:
+            self.init_browser(self.headless)
+        return self.get_page_with_selenium(url)
+    
     def get_page_with_selenium(self, url):
         """使用Selenium获取页面"""
         try:
             if not self.driver:
                 raise Exception("浏览器未初始化")
             
-            self.driver.get(url)
+            if self.network:
+                self.network.reset()
             
-            # 等待页面加载
-            WebDriverWait(self.driver, 20).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
+            self.driver.get(url)
             
-            # 等待歌词按钮出现
-            try:
-                WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.ID, "j-lrc-btn"))
+            # 网络捕获模式：播放器请求歌词后即可结束，不必等待元素渲染
+            captured = None
+            if self.network:
+                captured = self.network.wait_for(
+                    ('lyrics_url',),
+                    give_up=lambda: site_waits.search_state(self.driver) == 'no_result'
                 )
-            except:
-                pass
             
-            time.sleep(2)  # 确保页面完全渲染
-            
-            # 获取页面信息
-            page_source = self.driver.page_source
-            soup = BeautifulSoup(page_source, 'html.parser')
+            if not captured:
+                # 等待搜索结果或无结果状态，信号出现即返回
+                state = site_waits.wait_for_search_result(self.driver)
+                
+                # 等待歌词按钮带上链接
+                if state == 'success':
+                    site_waits.wait_for_href(self.driver, "j-lrc-btn")
             
-            # 查找歌词链接
-            lrc_btn = soup.find('a', {'id': 'j-lrc-btn'})
-            lyrics_url = lrc_btn['href'] if lrc_btn and lrc_btn.get('href') else None
+            # 一次脚本调用获取页面信息
+            page_data = site_waits.extract_page_data(self.driver)
+            if page_data is None:
+                raise Exception("读取页面信息失败")
+            if captured:
+                page_data['lyrics_url'] = captured['lyrics_url']
             
             # 获取歌曲信息
             song_info = None
-            name_input = soup.find('input', {'id': 'j-name'})
-            author_input = soup.find('input', {'id': 'j-author'})
-            
-            if name_input and name_input.get('value') and author_input and author_input.get('value'):
-                song_info = f"{name_input['value']} - {author_input['value']}"
+            if page_data['song_name'] and page_data['artist']:
+                song_info = f"{page_data['song_name']} - {page_data['artist']}"
             
             return {
-                'title': self.driver.title,
-                'current_url': self.driver.current_url,
-                'lyrics_url': lyrics_url,
+                'title': page_data['title'],
+                'current_url': page_data['url'],
+                'lyrics_url': page_data['lyrics_url'],
                 'song_info': song_info,
-                'page_source': page_source[:1000]  # 只取部分用于调试
+                'actual_song': page_data['song_name'],
+                'actual_artist': page_data['artist']
             }
             
         except Exception as e:
             raise Exception(f"Selenium获取页面失败: {e}")
     
+    def all_cached(self, songs):
+        """歌曲列表是否全部命中解析缓存"""
+        return all(self.resolver_cache.has(s['song'], s['artist']) for s in songs)
+    
     def get_lyrics_for_song(self, song_name, artist):
         """获取歌曲的歌词信息"""
         try:
             search_url = self.build_search_url(song_name, artist)
-            page_data = self.get_page_with_selenium(search_url)
+            
+            # 命中缓存时不再打开搜索页
+            cached = self.resolver_cache.get(song_name, artist)
+            if cached:
+                return {
+                    'actual_song': cached['actual_song'] or song_name,
+                    'actual_artist': cached['actual_artist'] or artist,
+                    'lyrics_url': cached['lyrics_url'],
+                    'title': '（解析缓存）',
+                    'current_url': search_url
+                }
+            
+            # 按当前节奏等待，代替固定的请求间隔
+            self.pacer.wait()
+            start = time.time()
+            try:
+                page_data = self.get_page(search_url)
+            except Exception as e:
+                self.pacer.failure('timeout' if 'timeout' in str(e).lower() else 'error')
+                raise
+            self.pacer.success(time.time() - start)
             
             if not page_data or not page_data.get('lyrics_url'):
                 return None
             
-            # 提取实际的歌曲名和歌手
-            soup = BeautifulSoup(page_data['page_source'], 'html.parser')
-            name_input = soup.find('input', {'id': 'j-name'})
-            author_input = soup.find('input', {'id': 'j-author'})
+            # 实际的歌曲名和歌手
+            actual_song = page_data.get('actual_song') or song_name
+            actual_artist = page_data.get('actual_artist') or artist
             
-            actual_song = name_input['value'] if name_input and name_input.get('value') else song_name
-            actual_artist = author_input['value'] if author_input and author_input.get('value') else artist
+            self.resolver_cache.put(song_name, artist, actual_song=actual_song,
+                                    actual_artist=actual_artist, lyrics_url=page_data['lyrics_url'])
             
             return {
                 'actual_song': actual_song,
@@ -785,18 +907,34 @@ class SeleniumLyricsDownloader:
     def download_lyrics(self, lyrics_url, song_name, artist):
         """下载歌词文件"""
         try:
-            # 直接使用requests下载歌词
-            response = requests.get(lyrics_url, headers=self.headers, timeout=30)
-            response.raise_for_status()
-            
-            content = response.text.strip()
-            
-            # 检查是否为有效的歌词文件
-            if not content:
-                return {'success': False, 'error': '歌词文件为空'}
-            
-            if content.startswith('<!DOCTYPE') or '<html' in content.lower():
-                return {'success': False, 'error': '下载到的是HTML页面，不是歌词文件'}
+            # 同一地址已下载过时直接使用存储中的内容
+            stored = self.blob_store.lookup_url(lyrics_url)
+            if stored:
+                digest = stored['digest']
+                size = stored['size']
+            else:
+                # 直接使用requests下载歌词
+                start = time.time()
+                response = http_client.get(lyrics_url, headers=self.headers, timeout=30)
+                if response.status_code in THROTTLE_STATUS_CODES:
+                    self.pacer.failure('throttled')
+                response.raise_for_status()
+                
+                content = response.text.strip()
+                
+                # 检查是否为有效的歌词文件
+                if not content:
+                    return {'success': False, 'error': '歌词文件为空'}
+                
+                if content.startswith('<!DOCTYPE') or '<html' in content.lower():
+                    # 网站限流时常返回HTML页面
+                    self.pacer.failure('html')
+                    return {'success': False, 'error': '下载到的是HTML页面，不是歌词文件'}
+                self.pacer.success(time.time() - start)
+                
+                data = content.encode('utf-8')
+                digest = self.blob_store.put(data, lyrics_url, 'text/plain')
+                size = len(data)
             
             # 创建保存目录
             save_dir = "downloaded_lyrics_selenium"
@@ -809,26 +947,36 @@ class SeleniumLyricsDownloader:
             
             filepath = os.path.join(save_dir, filename)
             
-            # 保存文件
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(content)
+            # 保存文件（指向存储中内容的硬链接）
+            self.blob_store.materialize(digest, filepath)
             
             return {
                 'success': True,
                 'filename': filename,
                 'filepath': filepath,
-                'size': len(content)
+                'size': size
             }
             
         except requests.exceptions.RequestException as e:
+            if isinstance(e, requests.exceptions.Timeout):
+                self.pacer.failure('timeout')
             return {'success': False, 'error': f'下载失败: {e}'}
         except Exception as e:
             return {'success': False, 'error': f'保存失败: {e}'}
     
     def close(self):
         """关闭浏览器"""
+        self.http_resolver.close()
+        if self.owns_resolver_cache:
+            self.resolver_cache.close()
+        if self.owns_blob_store:
+            self.blob_store.close()
         if self.driver:
-            self.driver.quit()
+            if self.attached:
+                # 只关闭自己的标签页，常驻浏览器继续运行
+                browser_daemon.release(self.driver)
+            else:
+                self.driver.quit()
 
 
 def main():
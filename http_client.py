@@ -0,0 +1,102 @@
+"""进程内共用的HTTP客户端
+
+歌词、封面、搜索页等小文件请求都经过同一个requests会话：
+- 长连接复用，连续下载几千个歌词时不必每次重新建立TCP和TLS连接
+- 每个域名的连接数有上限（连接池满时等待空闲连接，不会无限新建连接）
+- 统一的请求头（含gzip）、超时和对连接错误/5xx的有限重试
+
+并行下载时调用 configure(pool_size) 让连接池与工作线程数匹配。
+"""
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept-Encoding': 'gzip, deflate',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+}
+
+# (连接超时, 读取超时) 秒
+DEFAULT_TIMEOUT = (5, 30)
+
+# 每个域名的最大连接数
+POOL_SIZE = 10
+
+# 缓存连接池的域名数（搜索站、歌词接口、封面CDN、音频CDN等）
+POOL_HOSTS = 20
+
+
+class HttpClient:
+    """
+    带连接池的HTTP会话，可在多个线程间共用
+
+    Args:
+        pool_size: 每个域名的最大连接数
+        timeout: 默认超时
+        retries: 连接错误和502/503/504的重试次数
+    """
+    def __init__(self, pool_size=POOL_SIZE, timeout=DEFAULT_TIMEOUT, retries=2):
+        self.timeout = timeout
+        self.retries = retries
+        self.pool_size = 0
+        self.lock = threading.Lock()
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        self.resize(pool_size)
+
+    def resize(self, pool_size):
+        """调整每个域名的连接数上限，只会增大"""
+        with self.lock:
+            if pool_size <= self.pool_size:
+                return
+            retry = Retry(total=self.retries, connect=self.retries, read=0, backoff_factor=0.5,
+                          status_forcelist=(502, 503, 504), allowed_methods=('GET', 'HEAD'),
+                          raise_on_status=False)
+            adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=pool_size,
+                                  pool_block=True, max_retries=retry)
+            old_adapters = {self.session.adapters.get(prefix) for prefix in ('https://', 'http://')}
+            self.session.mount('https://', adapter)
+            self.session.mount('http://', adapter)
+            self.pool_size = pool_size
+            # 关闭旧连接池中的空闲连接；正在使用的连接用完后随旧连接池关闭
+            for old in old_adapters:
+                if old is not None:
+                    old.close()
+
+    def get(self, url, **kwargs):
+        """GET请求，未指定timeout时使用默认超时；headers与默认请求头合并"""
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.get(url, **kwargs)
+
+    def head(self, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.head(url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """进程内共用的客户端"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
+
+
+def configure(pool_size):
+    """按并行数调整共用客户端的连接池大小"""
+    get_client().resize(max(pool_size, POOL_SIZE))
+
+
+def get(url, **kwargs):
+    return get_client().get(url, **kwargs)
@@ -0,0 +1,94 @@
+"""HTTP直连解析器
+
+build_search_url 生成的搜索页地址是确定的，很多情况下服务器返回的HTML里已经
+带有歌词按钮链接和歌曲信息，用连接池复用的HTTP会话直接请求即可，不需要启动
+浏览器。字段缺失（由前端脚本渲染）时由调用方回退到Selenium。
+请求经过http_client中共用的会话，与歌词、封面下载共用连接。
+"""
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+import http_client
+
+
+class HttpResolver:
+    """
+    用HTTP请求解析搜索页面
+
+    Args:
+        headers: 请求头
+        pool_size: 连接池大小
+        timeout: 请求超时（秒）
+    """
+    def __init__(self, headers=None, pool_size=10, timeout=15):
+        self.timeout = timeout
+        self.headers = headers
+        self.client = http_client.get_client()
+        self.client.resize(pool_size)
+
+    def fetch_page(self, url, required=('lyrics_url',)):
+        """
+        请求搜索页面并提取字段
+
+        Args:
+            url: 搜索页地址
+            required: 必须提取到的字段，任一缺失视为页面由前端渲染
+
+        Returns:
+            dict: 与get_page_with_selenium相同的字段，另有soup供调用方继续提取；
+                  必需字段缺失时返回None
+        """
+        response = self.client.get(url, headers=self.headers, timeout=self.timeout)
+        response.raise_for_status()
+
+        # 服务器未声明编码时requests默认按ISO-8859-1解码，中文会乱码
+        if not response.encoding or response.encoding.lower() == 'iso-8859-1':
+            response.encoding = response.apparent_encoding or 'utf-8'
+
+        page_data = self.parse_page(response.text, response.url)
+        if any(not page_data.get(field) for field in required):
+            return None
+        return page_data
+
+    @staticmethod
+    def parse_page(html, url):
+        """从搜索页HTML中提取歌词链接和歌曲信息"""
+        soup = BeautifulSoup(html, 'html.parser')
+
+        # 查找歌词链接
+        lrc_btn = soup.find('a', {'id': 'j-lrc-btn'})
+        lrc_href = lrc_btn.get('href') if lrc_btn else None
+        lyrics_url = urljoin(url, lrc_href) if lrc_href else None
+        
+        # 查找歌曲下载链接
+        src_btn = soup.find('a', {'id': 'j-src-btn'})
+        src_href = src_btn.get('href') if src_btn else None
+        audio_url = urljoin(url, src_href) if src_href else None
+
+        # 获取歌曲信息
+        name_input = soup.find('input', {'id': 'j-name'})
+        author_input = soup.find('input', {'id': 'j-author'})
+        actual_song = name_input.get('value') if name_input else None
+        actual_artist = author_input.get('value') if author_input else None
+
+        song_info = None
+        if actual_song and actual_artist:
+            song_info = f"{actual_song} - {actual_artist}"
+
+        title = soup.title.get_text(strip=True) if soup.title else ''
+
+        return {
+            'title': title,
+            'current_url': url,
+            'lyrics_url': lyrics_url,
+            'audio_url': audio_url,
+            'song_info': song_info,
+            'actual_song': actual_song,
+            'actual_artist': actual_artist,
+            'page_source': html[:1000],  # 只取部分用于调试
+            'soup': soup
+        }
+
+    def close(self):
+        """连接池由进程内共用，这里不关闭"""
@@ -1,23 +1,10 @@
 import os
 import re
-import requests
 import threading
-import time
-import json
-from urllib.parse import quote
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox, filedialog
 from datetime import datetime
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
-import urllib.parse
-import shutil
+from music_downloader import MusicDownloader
 
 class MusicLyricsCoverDownloaderGUI:
     def __init__(self, root):
@@ -32,7 +19,7 @@ class MusicLyricsCoverDownloaderGUI:
         self.create_widgets()
         
         # 初始化下载器
-        self.downloader = MusicDownloader()
+        self.downloader = MusicDownloader(log=lambda msg: self.log_message(msg, "warning"))
         
         # 状态变量
         self.is_processing = False
@@ -88,6 +75,33 @@ class MusicLyricsCoverDownloaderGUI:
         )
         self.init_browser_btn.grid(row=0, column=1)
         
+        # HTTP直连解析：页面能直接解析时不启动浏览器
+        self.http_first_var = tk.BooleanVar(value=True)
+        http_first_check = ttk.Checkbutton(
+            browser_frame,
+            text="优先HTTP直连解析 (无需浏览器)",
+            variable=self.http_first_var
+        )
+        http_first_check.grid(row=0, column=2, padx=(20, 0))
+        
+        # 网络请求捕获：从播放器发出的请求中直接拿到资源地址（初始化浏览器时生效）
+        self.capture_network_var = tk.BooleanVar(value=False)
+        capture_network_check = ttk.Checkbutton(
+            browser_frame,
+            text="捕获网络请求",
+            variable=self.capture_network_var
+        )
+        capture_network_check.grid(row=0, column=3, padx=(20, 0))
+        
+        # 精简模式：不加载图片、字体、媒体和第三方脚本（初始化浏览器时生效）
+        self.lean_profile_var = tk.BooleanVar(value=True)
+        lean_profile_check = ttk.Checkbutton(
+            browser_frame,
+            text="精简模式",
+            variable=self.lean_profile_var
+        )
+        lean_profile_check.grid(row=0, column=4, padx=(20, 0))
+        
         # 下载选项区域
         options_frame = ttk.LabelFrame(main_frame, text="下载选项", padding="10")
         options_frame.grid(row=2, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 10))
@@ -342,11 +356,22 @@ class MusicLyricsCoverDownloaderGUI:
         """初始化浏览器"""
         try:
             self.log_message("正在初始化Chrome浏览器...", "info")
+            self.apply_resolver_settings()
             self.downloader.init_browser(self.headless_var.get())
-            self.log_message("✓ 浏览器初始化成功", "success")
+            if self.downloader.attached:
+                self.log_message("✓ 已连接常驻浏览器", "success")
+            else:
+                self.log_message("✓ 浏览器初始化成功", "success")
         except Exception as e:
             self.log_message(f"✗ 浏览器初始化失败: {e}", "error")
             
+    def apply_resolver_settings(self):
+        """把界面上的解析设置同步给下载器"""
+        self.downloader.use_http_resolver = self.http_first_var.get()
+        self.downloader.headless = self.headless_var.get()
+        self.downloader.capture_network = self.capture_network_var.get()
+        self.downloader.lean_profile = self.lean_profile_var.get()
+        
     def log_message(self, message, level="info"):
         """记录日志消息"""
         timestamp = datetime.now().strftime("%H:%M:%S")
@@ -448,7 +473,7 @@ class MusicLyricsCoverDownloaderGUI:
     def open_download_folder(self):
         """打开下载文件夹"""
         try:
-            save_dir = "downloaded_music"
+            save_dir = self.downloader.output_dir
             if os.path.exists(save_dir):
                 os.startfile(os.path.abspath(save_dir))
             else:
@@ -482,8 +507,10 @@ class MusicLyricsCoverDownloaderGUI:
             messagebox.showwarning("警告", "请至少选择一个下载选项")
             return
             
-        # 检查浏览器是否初始化
-        if not self.downloader.is_initialized():
+        # 检查浏览器是否初始化（HTTP直连解析时按需启动浏览器，全部命中缓存时不需要浏览器）
+        self.apply_resolver_settings()
+        if (not self.http_first_var.get() and not self.downloader.is_initialized()
+                and not self.downloader.all_cached(self.songs, self.download_cover_var.get())):
             messagebox.showwarning("警告", "请先初始化浏览器")
             return
             
@@ -536,9 +563,6 @@ class MusicLyricsCoverDownloaderGUI:
                 
                 # 更新统计
                 self.update_stats(lyrics_count, cover_count, i)
-                
-                # 延迟
-                time.sleep(1)
             
             # 处理完成
             self.log_message(f"处理完成! 歌词: {lyrics_count}, 封面: {cover_count}, 总计: {total}", "info")
@@ -567,8 +591,11 @@ class MusicLyricsCoverDownloaderGUI:
             messagebox.showwarning("警告", "请至少选择一个下载选项")
             return
             
-        # 检查浏览器是否初始化
-        if not self.downloader.is_initialized():
+        # 检查浏览器是否初始化（HTTP直连解析时按需启动浏览器，命中缓存时不需要浏览器）
+        self.apply_resolver_settings()
+        if (not self.http_first_var.get() and not self.downloader.is_initialized()
+                and not self.downloader.all_cached([{'song': song_name, 'artist': artist}],
+                                                   self.download_cover_var.get())):
             messagebox.showwarning("警告", "请先初始化浏览器")
             return
             
@@ -624,11 +651,12 @@ class MusicLyricsCoverDownloaderGUI:
             test_url = "https://s.myhkw.cn/?name=Always%20Online%20%E6%9E%97%E4%BF%8A%E6%9D%B0&type=qq"
             self.log_message(f"测试URL: {test_url}", "info")
             
-            if not self.downloader.is_initialized():
+            self.apply_resolver_settings()
+            if not self.http_first_var.get() and not self.downloader.is_initialized():
                 self.downloader.init_browser(self.headless_var.get())
             
             # 获取页面
-            page_data = self.downloader.get_page_with_selenium(test_url)
+            page_data = self.downloader.get_page(test_url)
             
             if page_data:
                 lyrics_url = page_data.get('lyrics_url')
@@ -664,7 +692,9 @@ class MusicLyricsCoverDownloaderGUI:
             self.log_message(info_msg, "info")
             
             # 使用Selenium获取页面
-            page_data = self.downloader.get_music_resources(song_name, artist)
+            page_data = self.downloader.get_music_resources(
+                song_name, artist, need_cover=self.download_cover_var.get()
+            )
             
             result = {
                 'lyrics_success': False,
@@ -767,345 +797,6 @@ class MusicLyricsCoverDownloaderGUI:
             self.downloader.close()
             self.root.destroy()
 
-class MusicDownloader:
-    """音乐下载器，整合歌词和封面下载"""
-    def __init__(self):
-        self.driver = None
-        self.base_url = "https://s.myhkw.cn/"
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Referer': 'https://y.qq.com/',
-            'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8',
-            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-        }
-        
-    def is_initialized(self):
-        """检查浏览器是否已初始化"""
-        return self.driver is not None
-        
-    def init_browser(self, headless=True):
-        """初始化Chrome浏览器"""
-        chrome_options = Options()
-        if headless:
-            chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--window-size=1920,1080")
-        chrome_options.add_argument("--start-maximized")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-        
-        service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=service, options=chrome_options)
-        
-    def parse_song_list(self, file_path):
-        """解析歌曲列表文件"""
-        songs = []
-        try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                for line in file:
-                    line = line.strip()
-                    if line and not line.startswith('#'):
-                        match = re.match(r'^\d+\.\s*(.+?)\s*-\s*(.+)$', line)
-                        if match:
-                            song_name = match.group(1).strip()
-                            artist = match.group(2).strip()
-                            songs.append({'song': song_name, 'artist': artist})
-                        elif ' - ' in line:
-                            parts = line.split(' - ', 1)
-                            song_part = re.sub(r'^\d+\.\s*', '', parts[0])
-                            songs.append({'song': song_part.strip(), 'artist': parts[1].strip()})
-        except Exception as e:
-            raise Exception(f"读取文件错误: {e}")
-        return songs
-    
-    def build_search_url(self, song_name, artist):
-        """构建搜索URL"""
-        search_query = f"{song_name} {artist}"
-        encoded_query = quote(search_query)
-        return f"{self.base_url}?name={encoded_query}&type=qq"
-    
-    def get_page_with_selenium(self, url):
-        """使用Selenium获取页面"""
-        try:
-            if not self.driver:
-                raise Exception("浏览器未初始化")
-            
-            self.driver.get(url)
-            
-            # 等待页面加载
-            WebDriverWait(self.driver, 20).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
-            
-            # 等待歌词按钮出现
-            try:
-                WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.ID, "j-lrc-btn"))
-                )
-            except:
-                pass
-            
-            time.sleep(2)  # 确保页面完全渲染
-            
-            # 获取页面源码
-            page_source = self.driver.page_source
-            soup = BeautifulSoup(page_source, 'html.parser')
-            
-            # 查找歌词链接
-            lrc_btn = soup.find('a', {'id': 'j-lrc-btn'})
-            lyrics_url = lrc_btn['href'] if lrc_btn and lrc_btn.get('href') else None
-            
-            # 查找封面图片
-            cover_url = self._extract_cover_url(soup)
-            
-            # 获取歌曲信息
-            song_info = None
-            name_input = soup.find('input', {'id': 'j-name'})
-            author_input = soup.find('input', {'id': 'j-author'})
-            
-            if name_input and name_input.get('value') and author_input and author_input.get('value'):
-                song_info = f"{name_input['value']} - {author_input['value']}"
-            
-            return {
-                'title': self.driver.title,
-                'current_url': self.driver.current_url,
-                'lyrics_url': lyrics_url,
-                'cover_url': cover_url,
-                'song_info': song_info,
-                'page_source': page_source[:1000]
-            }
-            
-        except Exception as e:
-            raise Exception(f"Selenium获取页面失败: {e}")
-    
-    def _extract_cover_url(self, soup):
-        """从页面中提取封面图片URL"""
-        try:
-            # 方法1: 查找APlayer的封面图片
-            aplayer_pic = soup.find('div', {'class': 'aplayer-pic'})
-            if aplayer_pic:
-                style = aplayer_pic.get('style', '')
-                if 'background-image:' in style:
-                    match = re.search(r'background-image:\s*url\(["\']?([^"\'\)]+)["\']?\)', style)
-                    if match:
-                        return self._make_absolute_url(match.group(1))
-            
-            # 方法2: 查找img标签
-            img_tags = soup.find_all('img')
-            for img in img_tags:
-                for attr in ['src', 'data-src', 'data-original']:
-                    img_url = img.get(attr)
-                    if img_url:
-                        # 检查是否是专辑封面
-                        if any(keyword in img_url.lower() for keyword in ['cover', 'album', 'artist', 'photo']):
-                            return self._make_absolute_url(img_url)
-            
-            # 方法3: 查找特定的QQ音乐图片模式
-            scripts = soup.find_all('script')
-            for script in scripts:
-                if script.string:
-                    patterns = [
-                        r'https://y\.gtimg\.cn/music/photo_new/[^\s"\']+\.(?:jpg|jpeg|png)',
-                        r'photo_new[^\s"\']+\.(?:jpg|jpeg|png)',
-                        r'T002R[^\s"\']+\.(?:jpg|jpeg|png)'
-                    ]
-                    for pattern in patterns:
-                        matches = re.findall(pattern, script.string)
-                        for match in matches:
-                            if not match.startswith(('http://', 'https://')):
-                                match = 'https://y.gtimg.cn/' + match
-                            return match
-            
-            # 方法4: 查找背景图片
-            for tag in soup.find_all(style=True):
-                style = tag.get('style', '')
-                if 'background' in style or 'background-image' in style:
-                    matches = re.findall(r'url\(["\']?([^"\'\)]+\.(?:jpg|jpeg|png|gif|webp))["\']?\)', style)
-                    if matches:
-                        return self._make_absolute_url(matches[0])
-            
-            return None
-            
-        except Exception as e:
-            print(f"提取封面URL失败: {e}")
-            return None
-    
-    def _make_absolute_url(self, url):
-        """将相对URL转换为绝对URL"""
-        if not url:
-            return None
-        
-        url = url.strip()
-        
-        # 如果已经是完整URL
-        if url.startswith(('http://', 'https://')):
-            return url
-        
-        # 处理双斜杠开头的URL
-        if url.startswith('//'):
-            return 'https:' + url
-        
-        # 处理base_url
-        parsed_base = urllib.parse.urlparse(self.base_url)
-        base_domain = parsed_base.scheme + '://' + parsed_base.netloc
-        
-        # 处理以/开头的相对路径
-        if url.startswith('/'):
-            return base_domain + url
-        
-        return url
-    
-    def get_music_resources(self, song_name, artist):
-        """获取歌曲的歌词和封面信息"""
-        try:
-            search_url = self.build_search_url(song_name, artist)
-            page_data = self.get_page_with_selenium(search_url)
-            
-            if not page_data:
-                return None
-            
-            # 提取实际的歌曲名和歌手
-            soup = BeautifulSoup(page_data.get('page_source', ''), 'html.parser')
-            name_input = soup.find('input', {'id': 'j-name'})
-            author_input = soup.find('input', {'id': 'j-author'})
-            
-            actual_song = name_input['value'] if name_input and name_input.get('value') else song_name
-            actual_artist = author_input['value'] if author_input and author_input.get('value') else artist
-            
-            return {
-                'actual_song': actual_song,
-                'actual_artist': actual_artist,
-                'lyrics_url': page_data.get('lyrics_url'),
-                'cover_url': page_data.get('cover_url'),
-                'title': page_data.get('title'),
-                'current_url': page_data.get('current_url')
-            }
-            
-        except Exception as e:
-            raise Exception(f"获取音乐资源失败: {e}")
-    
-    def download_lyrics(self, lyrics_url, song_name, artist, auto_naming=True):
-        """下载歌词文件"""
-        try:
-            # 下载歌词
-            response = requests.get(lyrics_url, headers=self.headers, timeout=30)
-            response.raise_for_status()
-            
-            content = response.text.strip()
-            
-            # 检查是否为有效的歌词文件
-            if not content:
-                return {'success': False, 'error': '歌词文件为空'}
-            
-            if content.startswith('<!DOCTYPE') or '<html' in content.lower():
-                return {'success': False, 'error': '下载到的是HTML页面，不是歌词文件'}
-            
-            # 创建保存目录
-            save_dir = "downloaded_music/lyrics"
-            if not os.path.exists(save_dir):
-                os.makedirs(save_dir)
-            
-            # 生成文件名
-            if auto_naming:
-                filename = f"{song_name}-{artist}.lrc"
-            else:
-                # 从URL提取文件名
-                parsed_url = urllib.parse.urlparse(lyrics_url)
-                filename = os.path.basename(parsed_url.path) or f"{song_name}_{artist}.lrc"
-            
-            # 清理文件名
-            filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
-            
-            filepath = os.path.join(save_dir, filename)
-            
-            # 保存文件
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(content)
-            
-            return {
-                'success': True,
-                'filename': filename,
-                'filepath': filepath,
-                'size': len(content)
-            }
-            
-        except requests.exceptions.RequestException as e:
-            return {'success': False, 'error': f'歌词下载失败: {e}'}
-        except Exception as e:
-            return {'success': False, 'error': f'歌词保存失败: {e}'}
-    
-    def download_cover(self, cover_url, song_name, artist, auto_naming=True):
-        """下载封面图片"""
-        try:
-            if not cover_url:
-                return {'success': False, 'error': '封面链接为空'}
-            
-            # 下载封面图片
-            response = requests.get(cover_url, headers=self.headers, timeout=30, stream=True)
-            response.raise_for_status()
-            
-            # 检查内容类型
-            content_type = response.headers.get('Content-Type', '')
-            if 'image' not in content_type:
-                return {'success': False, 'error': f'不是图片文件 (Content-Type: {content_type})'}
-            
-            # 创建保存目录
-            save_dir = "downloaded_music/covers"
-            if not os.path.exists(save_dir):
-                os.makedirs(save_dir)
-            
-            # 生成文件名
-            if auto_naming:
-                # 使用歌曲名和歌手命名
-                filename = f"{song_name} - {artist}.jpg"
-            else:
-                # 从URL提取文件名
-                parsed_url = urllib.parse.urlparse(cover_url)
-                original_filename = os.path.basename(parsed_url.path)
-                
-                # 如果没有扩展名或扩展名不是图片格式，添加.jpg
-                if '.' not in original_filename or not re.search(r'\.(jpg|jpeg|png|gif|webp)$', original_filename, re.I):
-                    filename = f"{song_name}_{artist}.jpg"
-                else:
-                    filename = original_filename
-            
-            # 清理文件名
-            filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
-            
-            filepath = os.path.join(save_dir, filename)
-            
-            # 保存图片
-            with open(filepath, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-            
-            # 获取文件大小
-            file_size = os.path.getsize(filepath) // 1024
-            
-            return {
-                'success': True,
-                'filename': filename,
-                'filepath': filepath,
-                'size': file_size,
-                'content_type': content_type
-            }
-            
-        except requests.exceptions.RequestException as e:
-            return {'success': False, 'error': f'封面下载失败: {e}'}
-        except Exception as e:
-            return {'success': False, 'error': f'封面保存失败: {e}'}
-    
-    def close(self):
-        """关闭浏览器"""
-        if self.driver:
-            self.driver.quit()
-
-
 def main():
     """主函数"""
     # 检查依赖
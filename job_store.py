@@ -0,0 +1,330 @@
+"""歌曲任务数据库
+
+几十万到上百万首的歌单不再整个放在内存里：歌曲列表保存在SQLite中，
+按状态和歌曲键建立索引：
+- 下一首待处理的歌曲、列出失败的歌曲都是索引查询，各状态的歌曲数在写入时随时更新
+- 歌曲键是唯一索引，导入时重复的歌曲由数据库跳过，不必在内存中记住已导入的歌曲
+- JobList 按需读取歌曲，只在内存中保留最近用到的一部分，内存占用与歌单长度无关
+- 状态在数据库中持久保存，程序重启后直接继续
+
+JobList 支持 len()、下标和遍历，可以代替 songs_list 列表使用；
+读出的歌曲带有 '_id'（在列表中的序号），修改后调用 save(song) 写回。
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from resolver_cache import APP_DIR, normalize_key
+from virtual_list import normalize_text
+
+
+# 数据库文件名，放在下载文件夹中（未选择文件夹时放在程序目录）
+JOBS_DB_NAME = "song_jobs.db"
+
+# 歌曲中单独成列的字段，其余字段保存在data中
+COLUMNS = ('artist', 'song_name', 'status', 'notes')
+
+# 导入时每批写入的歌曲数
+INSERT_BATCH = 5000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    song_key TEXT,
+    artist TEXT,
+    song_name TEXT,
+    status TEXT,
+    notes TEXT,
+    data TEXT,
+    updated_at REAL,
+    search_text TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, id);
+"""
+
+# 歌曲键的唯一索引；旧版本的数据库中可能有重复的歌曲键，建不成时等下次导入清空后再建
+_UNIQUE_KEY_INDEX = "CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_song_key ON jobs (song_key)"
+
+
+def jobs_db_path(folder=None):
+    """下载文件夹对应的任务数据库路径"""
+    return os.path.join(folder or APP_DIR, JOBS_DB_NAME)
+
+
+class JobStore:
+    """线程安全，多个工作线程可共用一个实例"""
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self._add_search_text()
+        self._add_unique_key()
+        self.conn.commit()
+        self.status_counts = self._load_counts()
+
+    def _load_counts(self):
+        return Counter(dict(self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()))
+
+    def _add_search_text(self):
+        """旧版本的数据库没有search_text列时补上并填好"""
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(jobs)")]
+        if 'search_text' in columns:
+            return
+        self.conn.create_function('normalize_text', 1, normalize_text)
+        self.conn.execute("ALTER TABLE jobs ADD COLUMN search_text TEXT")
+        self.conn.execute("UPDATE jobs SET search_text = normalize_text(artist || ' ' || song_name)")
+
+    def _add_unique_key(self):
+        try:
+            self.conn.execute(_UNIQUE_KEY_INDEX)
+        except sqlite3.IntegrityError:
+            return
+        self.conn.execute("DROP INDEX IF EXISTS idx_jobs_key")
+
+    @staticmethod
+    def _search_text(song):
+        """搜索用的文本，与 virtual_list.SongIndex 相同"""
+        return normalize_text(f"{song.get('artist', '')} {song.get('song_name', '')}")
+
+    @staticmethod
+    def _row(song):
+        data = {k: v for k, v in song.items() if k not in COLUMNS and k != '_id'}
+        return (normalize_key(song.get('song_name'), song.get('artist')),
+                song.get('artist', ''), song.get('song_name', ''),
+                song.get('status', '待处理'), song.get('notes', ''),
+                json.dumps(data, ensure_ascii=False), time.time(), JobStore._search_text(song))
+
+    @staticmethod
+    def _song(row):
+        job_id, artist, song_name, status, notes, data = row
+        song = json.loads(data) if data else {}
+        song.update(artist=artist, song_name=song_name, status=status, notes=notes, _id=job_id)
+        return song
+
+    def replace_all(self, songs):
+        """
+        清空后导入歌曲（可以是生成器，逐条写入，不必一次读入内存）
+
+        歌曲名、歌手与前面的歌曲相同（忽略大小写、全角半角和多余空白）的歌曲不导入，
+        导入的歌曲序号连续。
+
+        Returns:
+            int: 导入的歌曲数
+        """
+        count = 0
+        with self.lock:
+            self.conn.execute("DELETE FROM jobs")
+            self._add_unique_key()
+            for song in songs:
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO jobs (id, song_key, artist, song_name, status, notes, data, "
+                    "updated_at, search_text) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", (count,) + self._row(song)
+                )
+                count += cursor.rowcount
+                if count % INSERT_BATCH == 0:
+                    self.conn.commit()
+            self.conn.commit()
+            self.status_counts = self._load_counts()
+        return count
+
+    def same_songs(self, songs):
+        """
+        数据库中的歌曲是否与songs（歌曲名、歌手和顺序）相同，逐条比较不读入全部
+
+        songs中与前面重复的歌曲导入时会被跳过，比较时同样跳过（按歌曲键索引查找）。
+        """
+        keys = (normalize_key(song.get('song_name'), song.get('artist')) for song in songs)
+        count = 0
+        with self.lock:
+            cursor = self.conn.execute("SELECT song_key FROM jobs ORDER BY id")
+            for key in keys:
+                if count and self.conn.execute(
+                        "SELECT 1 FROM jobs WHERE song_key = ? AND id < ?", (key, count)).fetchone():
+                    continue
+                row = cursor.fetchone()
+                if row is None or row[0] != key:
+                    return False
+                count += 1
+            return cursor.fetchone() is None and count > 0
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def count_by_status(self):
+        """各状态的歌曲数 {状态: 数量}（打开数据库时统计一次，之后随save更新）"""
+        with self.lock:
+            return {status: count for status, count in self.status_counts.items() if count}
+
+    def get(self, job_id):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT id, artist, song_name, status, notes, data FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._song(row) if row else None
+
+    def page(self, offset, limit):
+        """按顺序读取一段歌曲"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, artist, song_name, status, notes, data FROM jobs WHERE id >= ? ORDER BY id LIMIT ?",
+                (offset, limit)
+            ).fetchall()
+        return [self._song(row) for row in rows]
+
+    def save(self, song):
+        """写回读出的歌曲（按'_id'）"""
+        row = self._row(song)
+        with self.lock:
+            old = self.conn.execute("SELECT status FROM jobs WHERE id = ?", (song['_id'],)).fetchone()
+            if old and old[0] != row[3]:
+                self.status_counts[old[0]] -= 1
+                self.status_counts[row[3]] += 1
+            self.conn.execute(
+                "UPDATE jobs SET song_key = ?, artist = ?, song_name = ?, status = ?, notes = ?, "
+                "data = ?, updated_at = ?, search_text = ? WHERE id = ?", row + (song['_id'],)
+            )
+            self.conn.commit()
+
+    def next_pending(self, start, finished_statuses):
+        """
+        从序号start开始的第一首未完成歌曲的序号，没有时返回None
+
+        status NOT IN (...) 用不上状态索引，只能从start开始逐行扫描；这里对现有的每个
+        未完成状态（见各状态的歌曲数）各做一次 (status, id) 索引查找，取最小的序号。
+        """
+        with self.lock:
+            statuses = [status for status, count in self.status_counts.items()
+                        if count and status not in finished_statuses]
+            ids = []
+            for status in statuses:
+                row = self.conn.execute(
+                    "SELECT MIN(id) FROM jobs WHERE status IS ? AND id >= ?", (status, start)
+                ).fetchone()
+                if row[0] is not None:
+                    ids.append(row[0])
+        return min(ids) if ids else None
+
+    def ids_with_status(self, statuses, limit=-1, offset=0):
+        """指定状态的歌曲序号（按状态索引查询，如列出全部失败的歌曲）"""
+        placeholders = ','.join('?' * len(statuses))
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT id FROM jobs WHERE status IN ({placeholders}) ORDER BY id LIMIT ? OFFSET ?",
+                tuple(statuses) + (limit, offset)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def search_ids(self, statuses=None, text=''):
+        """
+        按状态（状态索引）和歌手、歌曲名中包含的文本筛选，返回序号列表
+
+        Args:
+            statuses: 状态列表，None表示全部状态
+            text: 歌手或歌曲名中包含的文本（与 virtual_list.SongIndex 相同：全角转半角、忽略大小写和多余空白）
+        """
+        text = normalize_text(text)
+        conditions = []
+        params = []
+        if statuses is not None:
+            conditions.append(f"status IN ({','.join('?' * len(statuses))})")
+            params.extend(statuses)
+        if text:
+            conditions.append("instr(search_text, ?) > 0")
+            params.append(text)
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ''
+        with self.lock:
+            rows = self.conn.execute(f"SELECT id FROM jobs {where}ORDER BY id", params).fetchall()
+        return [row[0] for row in rows]
+
+    def find(self, song_name, artist):
+        """按歌曲名和歌手查找（歌曲键索引），返回序号列表"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id FROM jobs WHERE song_key = ? ORDER BY id", (normalize_key(song_name, artist),)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class JobList:
+    """
+    JobStore的列表视图，按需读取，只缓存最近用到的歌曲
+
+    Args:
+        store: JobStore
+        cache_size: 内存中保留的歌曲数
+        page_size: 遍历时每次读取的歌曲数
+    """
+    def __init__(self, store, cache_size=2000, page_size=500):
+        self.store = store
+        self.cache_size = cache_size
+        self.page_size = page_size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.length = store.count()
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError(index)
+        with self.lock:
+            song = self.cache.get(index)
+            if song is not None:
+                self.cache.move_to_end(index)
+                return song
+        song = self.store.get(index)
+        return self._remember(song)
+
+    def __iter__(self):
+        for offset in range(0, self.length, self.page_size):
+            for song in self.store.page(offset, self.page_size):
+                with self.lock:
+                    cached = self.cache.get(song['_id'])
+                # 正在处理的歌曲使用内存中的同一个对象
+                yield cached if cached is not None else song
+
+    def _remember(self, song):
+        with self.lock:
+            # 另一个线程先读入了同一首歌曲时使用已有的对象
+            existing = self.cache.get(song['_id'])
+            if existing is not None:
+                return existing
+            self.cache[song['_id']] = song
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return song
+
+    def save(self, song):
+        self.store.save(song)
+
+    def count_by_status(self):
+        return self.store.count_by_status()
+
+    def next_pending(self, start, finished_statuses):
+        index = self.store.next_pending(start, finished_statuses)
+        return self.length if index is None else index
+
+    def has_status(self, status):
+        """是否有这个状态的歌曲"""
+        return bool(self.store.ids_with_status([status], limit=1))
+
+    def filter(self, statuses=None, text=''):
+        """与 virtual_list.SongIndex.filter 相同的筛选，由数据库索引完成"""
+        text = normalize_text(text)
+        if statuses is None and not text:
+            return range(self.length)
+        return self.store.search_ids(statuses, text)
@@ -0,0 +1,134 @@
+"""日志队列与滚动日志文件
+
+工作线程写日志时只把一条记录放进队列（collections.deque 的 append 在多线程下安全，
+不需要加锁），不碰界面也不等磁盘：
+- 界面用定时器成批取出记录插入文本框，文本框只保留最近若干行
+- 日志文件由后台线程成批写入，超过大小后滚动为 .1、.2 ……，只保留几个旧文件
+
+界面长时间没有取日志时队列只保留最近的记录，内存占用有上限。
+"""
+import os
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+
+
+# 一条日志：时间戳、级别（'info'/'error'）、所在线程、内容
+LogRecord = namedtuple('LogRecord', ['time', 'level', 'thread', 'message'])
+
+# 界面取出之前最多保留的记录数
+BUFFER_SIZE = 10000
+
+# 日志文件的大小上限和保留的旧文件数
+MAX_BYTES = 5 * 1024 * 1024
+BACKUP_COUNT = 3
+
+
+class RotatingFileSink:
+    """
+    在后台线程中写日志文件，文件超过max_bytes后滚动
+
+    Args:
+        path: 日志文件路径
+        max_bytes: 单个文件的大小上限
+        backup_count: 保留的旧文件数
+    """
+    def __init__(self, path, max_bytes=MAX_BYTES, backup_count=BACKUP_COUNT):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.records = queue.SimpleQueue()
+        self.file = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def write(self, record):
+        self.records.put(record)
+
+    def close(self, timeout=2):
+        """写完队列中的记录后关闭文件"""
+        self.records.put(None)
+        self.thread.join(timeout)
+
+    def _run(self):
+        while True:
+            batch = [self.records.get()]
+            # 积压的记录一次写完
+            while True:
+                try:
+                    batch.append(self.records.get_nowait())
+                except queue.Empty:
+                    break
+
+            closing = None in batch
+            try:
+                self._write_batch([record for record in batch if record is not None])
+            except OSError:
+                # 日志文件写不了时不影响下载
+                pass
+            if closing:
+                if self.file:
+                    self.file.close()
+                return
+
+    def _write_batch(self, batch):
+        if not batch:
+            return
+        if self.file is None:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            self.file = open(self.path, 'a', encoding='utf-8')
+        for record in batch:
+            timestamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(record.time))
+            self.file.write(f"[{timestamp}] [{record.level.upper()}] [{record.thread}] {record.message}\n")
+        self.file.flush()
+        if self.file.tell() >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        self.file.close()
+        self.file = None
+        for i in range(self.backup_count - 1, 0, -1):
+            older = f"{self.path}.{i}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+
+class LogHub:
+    """
+    多个线程共用的日志入口
+
+    Args:
+        file_path: 日志文件路径，None表示不写文件
+        buffer_size: 界面取出之前最多保留的记录数
+    """
+    def __init__(self, file_path=None, buffer_size=BUFFER_SIZE):
+        self.records = deque(maxlen=buffer_size)
+        self.sink = RotatingFileSink(file_path) if file_path else None
+
+    def put(self, message, level='info'):
+        """记录一条日志（任何线程都可以调用，不会阻塞）"""
+        record = LogRecord(time.time(), level, threading.current_thread().name, str(message))
+        self.records.append(record)
+        if self.sink:
+            self.sink.write(record)
+
+    def drain(self, limit):
+        """按顺序取出最多limit条记录"""
+        records = []
+        while len(records) < limit:
+            try:
+                records.append(self.records.popleft())
+            except IndexError:
+                break
+        return records
+
+    def close(self):
+        if self.sink:
+            self.sink.close()
@@ -0,0 +1,535 @@
+"""歌词和封面下载器（不依赖界面）
+
+image_geci.py 的界面和 batch_cli.py 的命令行共用：解析搜索页得到歌词、封面和歌曲链接，
+下载到 output_dir 下的 lyrics、covers、songs 目录。
+"""
+import os
+import re
+import time
+import urllib.parse
+from urllib.parse import quote
+
+import requests
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+
+import site_waits
+from http_resolver import HttpResolver
+import network_capture
+import browser_profile
+import browser_daemon
+import driver_resolver
+from resolver_cache import ResolverCache
+from blob_store import BlobStore
+import http_client
+from pacing import Pacer, THROTTLE_STATUS_CODES
+from audio_downloader import AudioDownloader, DownloadError, existing_audio_file, fix_extension, guess_extension
+
+
+class MusicDownloader:
+    """
+    音乐下载器，整合歌词、封面和歌曲文件下载
+    
+    Args:
+        output_dir: 保存目录
+        log: 日志函数
+        resolver_cache / blob_store: 共用的解析缓存和存储，不传时自己创建
+    """
+    def __init__(self, output_dir="downloaded_music", log=print, resolver_cache=None, blob_store=None):
+        self.output_dir = output_dir
+        self.log = log
+        self.driver = None
+        self.base_url = "https://s.myhkw.cn/"
+        self.headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            'Referer': 'https://y.qq.com/',
+            'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8',
+            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+        }
+        self.http_resolver = HttpResolver(self.headers)
+        self.use_http_resolver = True  # 优先HTTP直连解析
+        self.headless = True           # 回退到Selenium时按需启动浏览器所用的模式
+        self.capture_network = False   # 从网络请求中捕获资源地址
+        self.lean_profile = True       # 精简浏览器，不加载图片、字体、媒体和第三方脚本
+        self.attached = False          # 是否连接的是常驻浏览器
+        self.network = None
+        # 解析结果缓存和歌词/封面存储可由调用方传入共用的实例，只关闭自己创建的
+        self.owns_resolver_cache = resolver_cache is None
+        self.owns_blob_store = blob_store is None
+        self.resolver_cache = resolver_cache or ResolverCache()
+        self.blob_store = blob_store or BlobStore()
+        self.pacer = Pacer(log=log)            # 按网站响应调整请求间隔
+        self.audio_downloader = None           # 需要下载歌曲文件时创建
+        
+    def is_initialized(self):
+        """检查浏览器是否已初始化"""
+        return self.driver is not None
+        
+    def init_browser(self, headless=True):
+        """初始化Chrome浏览器"""
+        self.headless = headless
+        chrome_options = Options()
+        if headless:
+            chrome_options.add_argument("--headless")
+        chrome_options.add_argument("--no-sandbox")
+        chrome_options.add_argument("--disable-dev-shm-usage")
+        chrome_options.add_argument("--disable-gpu")
+        chrome_options.add_argument("--window-size=1920,1080")
+        chrome_options.add_argument("--start-maximized")
+        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+        chrome_options.add_experimental_option('useAutomationExtension', False)
+        chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+        
+        if self.capture_network:
+            network_capture.enable_performance_logging(chrome_options)
+        if self.lean_profile:
+            browser_profile.apply_lean_options(chrome_options)
+        
+        driver_path = driver_resolver.resolve_driver(log=self.log)
+        
+        # 常驻浏览器（browser_daemon.py）在运行时直接连接，不再冷启动
+        self.driver = browser_daemon.attach(
+            driver_path,
+            page_load_strategy=chrome_options.page_load_strategy,
+            logging_prefs=chrome_options.capabilities.get('goog:loggingPrefs')
+        )
+        self.attached = self.driver is not None
+        if not self.driver:
+            service = Service(driver_path)
+            self.driver = webdriver.Chrome(service=service, options=chrome_options)
+        if self.lean_profile:
+            browser_profile.apply_lean_blocking(self.driver, block_images=self.attached)
+        self.network = network_capture.NetworkCapture(self.driver) if self.capture_network else None
+        
+    @staticmethod
+    def parse_song_list(file_path):
+        """解析歌曲列表文件（不需要下载器实例）"""
+        songs = []
+        try:
+            with open(file_path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    line = line.strip()
+                    if line and not line.startswith('#'):
+                        match = re.match(r'^\d+\.\s*(.+?)\s*-\s*(.+)$', line)
+                        if match:
+                            song_name = match.group(1).strip()
+                            artist = match.group(2).strip()
+                            songs.append({'song': song_name, 'artist': artist})
+                        elif ' - ' in line:
+                            parts = line.split(' - ', 1)
+                            song_part = re.sub(r'^\d+\.\s*', '', parts[0])
+                            songs.append({'song': song_part.strip(), 'artist': parts[1].strip()})
+        except Exception as e:
+            raise Exception(f"读取文件错误: {e}")
+        return songs
+    
+    def build_search_url(self, song_name, artist):
+        """构建搜索URL"""
+        search_query = f"{song_name} {artist}"
+        encoded_query = quote(search_query)
+        return f"{self.base_url}?name={encoded_query}&type=qq"
+    
+    def get_page(self, url, need_cover=True, need_audio=False):
+        """获取搜索页面：优先HTTP直连解析，内容由前端渲染而缺失时再使用Selenium"""
+        if self.use_http_resolver:
+            try:
+                page_data = self.http_resolver.fetch_page(url)
+                if page_data:
+                    page_data['cover_url'] = self._extract_cover_url(page_data['soup'])
+                    if (page_data['cover_url'] or not need_cover) and (page_data['audio_url'] or not need_audio):
+                        return page_data
+            except Exception as e:
+                self.log(f"HTTP解析失败，改用Selenium: {e}")
+        
+        if not self.driver:
+            self.init_browser(self.headless)
+        return self.get_page_with_selenium(url, need_audio)
+    
+    def get_page_with_selenium(self, url, need_audio=False):
+        """使用Selenium获取页面"""
+        try:
+            if not self.driver:
+                raise Exception("浏览器未初始化")
+            
+            if self.network:
+                self.network.reset()
+            
+            self.driver.get(url)
+            
+            # 网络捕获模式：播放器请求歌词和封面后即可结束，不必等待元素渲染
+            # （精简模式不加载图片，封面地址改从页面中读取）
+            captured = None
+            if self.network:
+                captured = self.network.wait_for(
+                    ('lyrics_url',) if self.lean_profile else ('lyrics_url', 'cover_url'),
+                    give_up=lambda: site_waits.search_state(self.driver) == 'no_result'
+                )
+            
+            if not captured:
+                # 等待搜索结果或无结果状态，信号出现即返回
+                state = site_waits.wait_for_search_result(self.driver)
+                
+                # 等待歌词按钮带上链接
+                if state == 'success':
+                    site_waits.wait_for_href(self.driver, "j-lrc-btn")
+                    if need_audio:
+                        site_waits.wait_for_href(self.driver, "j-src-btn")
+                    site_waits.wait_for_cover(self.driver)
+            
+            # 一次脚本调用获取歌词链接、封面和歌曲信息
+            page_data = site_waits.extract_page_data(self.driver)
+            if page_data is None:
+                raise Exception("读取页面信息失败")
+            if captured:
+                page_data['lyrics_url'] = captured['lyrics_url']
+                page_data['cover_url'] = captured.get('cover_url') or page_data['cover_url']
+            
+            # 获取歌曲信息
+            song_info = None
+            if page_data['song_name'] and page_data['artist']:
+                song_info = f"{page_data['song_name']} - {page_data['artist']}"
+            
+            return {
+                'title': page_data['title'],
+                'current_url': page_data['url'],
+                'lyrics_url': page_data['lyrics_url'],
+                'cover_url': self._make_absolute_url(page_data['cover_url']),
+                'audio_url': page_data['song_url'],
+                'song_info': song_info,
+                'actual_song': page_data['song_name'],
+                'actual_artist': page_data['artist']
+            }
+            
+        except Exception as e:
+            raise Exception(f"Selenium获取页面失败: {e}")
+    
+    def _extract_cover_url(self, soup):
+        """从页面中提取封面图片URL"""
+        try:
+            # 方法1: 查找APlayer的封面图片
+            aplayer_pic = soup.find('div', {'class': 'aplayer-pic'})
+            if aplayer_pic:
+                style = aplayer_pic.get('style', '')
+                if 'background-image:' in style:
+                    match = re.search(r'background-image:\s*url\(["\']?([^"\'\)]+)["\']?\)', style)
+                    if match:
+                        return self._make_absolute_url(match.group(1))
+            
+            # 方法2: 查找img标签
+            img_tags = soup.find_all('img')
+            for img in img_tags:
+                for attr in ['src', 'data-src', 'data-original']:
+                    img_url = img.get(attr)
+                    if img_url:
+                        # 检查是否是专辑封面
+                        if any(keyword in img_url.lower() for keyword in ['cover', 'album', 'artist', 'photo']):
+                            return self._make_absolute_url(img_url)
+            
+            # 方法3: 查找特定的QQ音乐图片模式
+            scripts = soup.find_all('script')
+            for script in scripts:
+                if script.string:
+                    patterns = [
+                        r'https://y\.gtimg\.cn/music/photo_new/[^\s"\']+\.(?:jpg|jpeg|png)',
+                        r'photo_new[^\s"\']+\.(?:jpg|jpeg|png)',
+                        r'T002R[^\s"\']+\.(?:jpg|jpeg|png)'
+                    ]
+                    for pattern in patterns:
+                        matches = re.findall(pattern, script.string)
+                        for match in matches:
+                            if not match.startswith(('http://', 'https://')):
+                                match = 'https://y.gtimg.cn/' + match
+                            return match
+            
+            # 方法4: 查找背景图片
+            for tag in soup.find_all(style=True):
+                style = tag.get('style', '')
+                if 'background' in style or 'background-image' in style:
+                    matches = re.findall(r'url\(["\']?([^"\'\)]+\.(?:jpg|jpeg|png|gif|webp))["\']?\)', style)
+                    if matches:
+                        return self._make_absolute_url(matches[0])
+            
+            return None
+            
+        except Exception as e:
+            self.log(f"提取封面URL失败: {e}")
+            return None
+    
+    def _make_absolute_url(self, url):
+        """将相对URL转换为绝对URL"""
+        if not url:
+            return None
+        
+        url = url.strip()
+        
+        # 如果已经是完整URL
+        if url.startswith(('http://', 'https://')):
+            return url
+        
+        # 处理双斜杠开头的URL
+        if url.startswith('//'):
+            return 'https:' + url
+        
+        # 处理base_url
+        parsed_base = urllib.parse.urlparse(self.base_url)
+        base_domain = parsed_base.scheme + '://' + parsed_base.netloc
+        
+        # 处理以/开头的相对路径
+        if url.startswith('/'):
+            return base_domain + url
+        
+        return url
+    
+    def cache_fields(self, need_cover=True, need_audio=False):
+        """命中解析缓存所需的字段"""
+        fields = ('lyrics_url', 'cover_url') if need_cover else ('lyrics_url',)
+        return fields + ('audio_url',) if need_audio else fields
+    
+    def all_cached(self, songs, need_cover=True, need_audio=False):
+        """歌曲列表是否全部命中解析缓存"""
+        required = self.cache_fields(need_cover, need_audio)
+        return all(self.resolver_cache.has(s['song'], s['artist'], required) for s in songs)
+    
+    def get_music_resources(self, song_name, artist, need_cover=True, need_audio=False):
+        """获取歌曲的歌词、封面和歌曲文件链接"""
+        try:
+            search_url = self.build_search_url(song_name, artist)
+            
+            # 命中缓存时不再打开搜索页
+            cached = self.resolver_cache.get(song_name, artist, self.cache_fields(need_cover, need_audio))
+            if cached:
+                return {
+                    'actual_song': cached['actual_song'] or song_name,
+                    'actual_artist': cached['actual_artist'] or artist,
+                    'lyrics_url': cached['lyrics_url'],
+                    'cover_url': cached['cover_url'],
+                    'audio_url': cached['audio_url'],
+                    'title': '（解析缓存）',
+                    'current_url': search_url
+                }
+            
+            # 按当前节奏等待，代替固定的请求间隔
+            self.pacer.wait()
+            start = time.time()
+            try:
+                page_data = self.get_page(search_url, need_cover, need_audio)
+            except Exception as e:
+                self.pacer.failure('timeout' if 'timeout' in str(e).lower() else 'error')
+                raise
+            self.pacer.success(time.time() - start)
+            
+            if not page_data:
+                return None
+            
+            # 实际的歌曲名和歌手
+            actual_song = page_data.get('actual_song') or song_name
+            actual_artist = page_data.get('actual_artist') or artist
+            
+            if page_data.get('lyrics_url'):
+                self.resolver_cache.put(song_name, artist, actual_song=actual_song, actual_artist=actual_artist,
+                                        lyrics_url=page_data['lyrics_url'], cover_url=page_data.get('cover_url'),
+                                        audio_url=page_data.get('audio_url'))
+            
+            return {
+                'actual_song': actual_song,
+                'actual_artist': actual_artist,
+                'lyrics_url': page_data.get('lyrics_url'),
+                'cover_url': page_data.get('cover_url'),
+                'audio_url': page_data.get('audio_url'),
+                'title': page_data.get('title'),
+                'current_url': page_data.get('current_url')
+            }
+            
+        except Exception as e:
+            raise Exception(f"获取音乐资源失败: {e}")
+    
+    def download_lyrics(self, lyrics_url, song_name, artist, auto_naming=True):
+        """下载歌词文件"""
+        try:
+            # 同一地址已下载过时直接使用存储中的内容
+            stored = self.blob_store.lookup_url(lyrics_url)
+            if stored:
+                digest = stored['digest']
+                size = stored['size']
+            else:
+                # 下载歌词
+                start = time.time()
+                response = http_client.get(lyrics_url, headers=self.headers, timeout=30)
+                if response.status_code in THROTTLE_STATUS_CODES:
+                    self.pacer.failure('throttled')
+                response.raise_for_status()
+                
+                content = response.text.strip()
+                
+                # 检查是否为有效的歌词文件
+                if not content:
+                    return {'success': False, 'error': '歌词文件为空'}
+                
+                if content.startswith('<!DOCTYPE') or '<html' in content.lower():
+                    # 网站限流时常返回HTML页面
+                    self.pacer.failure('html')
+                    return {'success': False, 'error': '下载到的是HTML页面，不是歌词文件'}
+                self.pacer.success(time.time() - start)
+                
+                data = content.encode('utf-8')
+                digest = self.blob_store.put(data, lyrics_url, 'text/plain')
+                size = len(data)
+            
+            # 创建保存目录
+            save_dir = os.path.join(self.output_dir, "lyrics")
+            if not os.path.exists(save_dir):
+                os.makedirs(save_dir)
+            
+            # 生成文件名
+            if auto_naming:
+                filename = f"{song_name}-{artist}.lrc"
+            else:
+                # 从URL提取文件名
+                parsed_url = urllib.parse.urlparse(lyrics_url)
+                filename = os.path.basename(parsed_url.path) or f"{song_name}_{artist}.lrc"
+            
+            # 清理文件名
+            filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
+            
+            filepath = os.path.join(save_dir, filename)
+            
+            # 保存文件（指向存储中内容的硬链接）
+            self.blob_store.materialize(digest, filepath)
+            
+            return {
+                'success': True,
+                'filename': filename,
+                'filepath': filepath,
+                'size': size
+            }
+            
+        except requests.exceptions.RequestException as e:
+            if isinstance(e, requests.exceptions.Timeout):
+                self.pacer.failure('timeout')
+            return {'success': False, 'error': f'歌词下载失败: {e}'}
+        except Exception as e:
+            return {'success': False, 'error': f'歌词保存失败: {e}'}
+    
+    def download_cover(self, cover_url, song_name, artist, auto_naming=True):
+        """下载封面图片"""
+        try:
+            if not cover_url:
+                return {'success': False, 'error': '封面链接为空'}
+            
+            # 同一地址已下载过时直接使用存储中的内容
+            stored = self.blob_store.lookup_url(cover_url)
+            if stored:
+                digest = stored['digest']
+                content_type = stored['content_type'] or ''
+            else:
+                # 下载封面图片
+                response = http_client.get(cover_url, headers=self.headers, timeout=30)
+                response.raise_for_status()
+                
+                # 检查内容类型
+                content_type = response.headers.get('Content-Type', '')
+                if 'image' not in content_type:
+                    return {'success': False, 'error': f'不是图片文件 (Content-Type: {content_type})'}
+                
+                digest = self.blob_store.put(response.content, cover_url, content_type)
+            
+            # 创建保存目录
+            save_dir = os.path.join(self.output_dir, "covers")
+            if not os.path.exists(save_dir):
+                os.makedirs(save_dir)
+            
+            # 生成文件名
+            if auto_naming:
+                # 使用歌曲名和歌手命名
+                filename = f"{song_name} - {artist}.jpg"
+            else:
+                # 从URL提取文件名
+                parsed_url = urllib.parse.urlparse(cover_url)
+                original_filename = os.path.basename(parsed_url.path)
+                
+                # 如果没有扩展名或扩展名不是图片格式，添加.jpg
+                if '.' not in original_filename or not re.search(r'\.(jpg|jpeg|png|gif|webp)$', original_filename, re.I):
+                    filename = f"{song_name}_{artist}.jpg"
+                else:
+                    filename = original_filename
+            
+            # 清理文件名
+            filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
+            
+            filepath = os.path.join(save_dir, filename)
+            
+            # 保存图片（指向存储中内容的硬链接）
+            self.blob_store.materialize(digest, filepath)
+            
+            # 获取文件大小
+            file_size = os.path.getsize(filepath) // 1024
+            
+            return {
+                'success': True,
+                'filename': filename,
+                'filepath': filepath,
+                'size': file_size,
+                'content_type': content_type
+            }
+            
+        except requests.exceptions.RequestException as e:
+            return {'success': False, 'error': f'封面下载失败: {e}'}
+        except Exception as e:
+            return {'success': False, 'error': f'封面保存失败: {e}'}
+    
+    def download_audio(self, audio_url, song_name, artist, should_continue=None):
+        """用HTTP直接下载歌曲文件（大文件分段、断点续传）"""
+        try:
+            if not audio_url:
+                return {'success': False, 'error': '歌曲链接为空'}
+            
+            if self.audio_downloader is None:
+                self.audio_downloader = AudioDownloader(log=self.log)
+            
+            save_dir = os.path.join(self.output_dir, "songs")
+            if not os.path.exists(save_dir):
+                os.makedirs(save_dir)
+            
+            filename = f"{song_name} - {artist}{guess_extension(audio_url)}"
+            filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
+            filepath = os.path.join(save_dir, filename)
+            
+            existing = existing_audio_file(os.path.splitext(filepath)[0])
+            if existing:
+                return {'success': True, 'filename': os.path.basename(existing), 'filepath': existing,
+                        'size': os.path.getsize(existing)}
+            
+            result = self.audio_downloader.download(
+                audio_url, filepath,
+                headers={'Referer': self.base_url},
+                should_continue=should_continue
+            )
+            # 链接上看不出格式时按Content-Type改正扩展名
+            filepath = fix_extension(filepath, result)
+            return {
+                'success': True,
+                'filename': os.path.basename(filepath),
+                'filepath': filepath,
+                'size': result['size']
+            }
+        
+        except DownloadError as e:
+            return {'success': False, 'error': f'歌曲下载失败: {e}'}
+        except Exception as e:
+            return {'success': False, 'error': f'歌曲保存失败: {e}'}
+    
+    def close(self):
+        """关闭浏览器"""
+        self.http_resolver.close()
+        if self.owns_resolver_cache:
+            self.resolver_cache.close()
+        if self.owns_blob_store:
+            self.blob_store.close()
+        if self.driver:
+            if self.attached:
+                # 只关闭自己的标签页，常驻浏览器继续运行
+                browser_daemon.release(self.driver)
+            else:
+                self.driver.quit()
@@ -0,0 +1,107 @@
+"""从Chrome网络请求中捕获歌词、音频和封面地址
+
+网站的播放器会自己请求 api.php?get=lrc、音频文件和 y.gtimg.cn 的封面图片。
+开启Chrome性能日志后可以直接从请求流中拿到这些地址：请求一发出即可结束解析，
+不用等元素渲染，也不受页面样式调整的影响。
+"""
+import json
+import time
+
+from selenium.common.exceptions import WebDriverException
+
+
+# 音频文件扩展名
+AUDIO_EXTENSIONS = ('.mp3', '.m4a', '.flac', '.ogg', '.wav', '.aac')
+
+# 轮询间隔（秒）
+POLL_INTERVAL = 0.1
+
+
+def enable_performance_logging(chrome_options):
+    """在创建浏览器前调用，开启网络请求日志"""
+    chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+
+
+def classify_url(url, resource_type=None, mime_type=None):
+    """
+    判断请求地址的类型
+
+    Returns:
+        'lyrics_url' / 'audio_url' / 'cover_url'，都不是返回None
+    """
+    if not url or url.startswith('data:'):
+        return None
+    lower = url.lower()
+    if 'get=lrc' in lower:
+        return 'lyrics_url'
+    if 'y.gtimg.cn/music/photo_new' in lower:
+        return 'cover_url'
+    path = lower.split('?', 1)[0]
+    if resource_type == 'Media' or (mime_type or '').startswith('audio/') or path.endswith(AUDIO_EXTENSIONS):
+        return 'audio_url'
+    return None
+
+
+class NetworkCapture:
+    """读取一个浏览器的网络请求日志并收集资源地址"""
+    def __init__(self, driver):
+        self.driver = driver
+        self.urls = {}
+
+    def reset(self):
+        """丢弃已有的日志，在打开新页面前调用"""
+        self.urls = {}
+        self._read_log()
+
+    def _read_log(self):
+        """读取并清空浏览器中积累的性能日志"""
+        try:
+            return self.driver.get_log('performance')
+        except WebDriverException:
+            return []
+
+    def collect(self):
+        """处理新的日志条目，返回目前已捕获的地址 {'lyrics_url': ..., 'audio_url': ..., 'cover_url': ...}"""
+        for entry in self._read_log():
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, ValueError, TypeError):
+                continue
+
+            params = message.get('params', {})
+            method = message.get('method')
+            if method == 'Network.requestWillBeSent':
+                url = params.get('request', {}).get('url')
+                kind = classify_url(url, params.get('type'))
+            elif method == 'Network.responseReceived':
+                response = params.get('response', {})
+                url = response.get('url')
+                kind = classify_url(url, params.get('type'), response.get('mimeType'))
+            else:
+                continue
+
+            # 同类地址只保留第一个
+            if kind and kind not in self.urls:
+                self.urls[kind] = url
+        return dict(self.urls)
+
+    def wait_for(self, required, timeout=8, give_up=None):
+        """
+        等待所需的地址全部出现
+
+        Args:
+            required: 需要的地址类型，如 ('lyrics_url', 'cover_url')
+            timeout: 时间预算（秒）
+            give_up: 可选的函数，返回True时不再等待（如页面已显示无结果）
+
+        Returns:
+            dict: 已捕获的地址；超时仍缺少所需地址时返回None
+        """
+        deadline = time.time() + timeout
+        while True:
+            urls = self.collect()
+            if all(urls.get(kind) for kind in required):
+                return urls
+            if time.time() >= deadline or (give_up and give_up()):
+                return None
+            time.sleep(POLL_INTERVAL)
@@ -0,0 +1,148 @@
+"""自适应请求节奏控制
+
+代替批量处理中固定的 sleep(1)/sleep(2)，按网站的响应情况调整请求间隔和并行数（AIMD）：
+- 连续若干次请求正常：间隔减少一个固定步长，并行数加一（加性增加）
+- 出现拥塞信号（超时、返回HTML而不是歌词、429/503、响应时间突然变长）：
+  间隔翻倍，并行数减半（乘性减少）
+- "没有这首歌"之类的普通失败不影响节奏
+
+网站正常时逐渐加快到能稳定维持的最快速度，开始限流时迅速退让。
+多个工作线程共用一个实例。
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+
+# 拥塞信号：出现时间隔翻倍、并行数减半
+CONGESTION_SIGNALS = ('timeout', 'html', 'throttled', 'slow')
+
+SIGNAL_NAMES = {
+    'timeout': '请求超时',
+    'html': '返回HTML页面',
+    'throttled': '限流',
+    'slow': '响应变慢',
+}
+
+# 限流时常见的HTTP状态码
+THROTTLE_STATUS_CODES = (429, 503)
+
+
+class Pacer:
+    """
+    Args:
+        initial_delay: 初始请求间隔（秒）
+        min_delay: 最小请求间隔
+        max_delay: 最大请求间隔
+        max_workers: 并行数上限（开始时按上限运行）
+        increase_step: 每次加速减少的间隔（秒）
+        success_window: 连续多少次正常请求后加速一次
+        latency_factor: 响应时间超过平均值的多少倍视为变慢
+        log: 日志函数，节奏变化时输出
+    """
+    def __init__(self, initial_delay=1.0, min_delay=0.2, max_delay=20.0, max_workers=1,
+                 increase_step=0.1, success_window=5, latency_factor=3.0, log=None):
+        self.delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.max_workers = max(1, max_workers)
+        self.workers = self.max_workers
+        self.increase_step = increase_step
+        self.success_window = success_window
+        self.latency_factor = latency_factor
+        self.log = log
+
+        self.condition = threading.Condition()
+        self.active = 0
+        self.next_at = 0.0
+        self.streak = 0
+        self.avg_latency = None
+        self.samples = 0
+        self.last_decrease = 0.0
+
+    def wait(self, should_continue=None):
+        """
+        等到下一个请求时间，在访问网站之前调用
+
+        多个线程调用时按间隔依次放行；should_continue()返回False时提前返回
+        """
+        with self.condition:
+            now = time.time()
+            target = max(now, self.next_at)
+            self.next_at = target + self.delay
+        while True:
+            remaining = target - time.time()
+            if remaining <= 0 or (should_continue and not should_continue()):
+                return
+            time.sleep(min(remaining, 0.5))
+
+    @contextmanager
+    def slot(self, should_continue=None):
+        """占用一个并行名额，并行数减少时多出的工作线程在这里等待"""
+        with self.condition:
+            while self.active >= self.workers:
+                if should_continue and not should_continue():
+                    break
+                self.condition.wait(0.5)
+            self.active += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.active -= 1
+                self.condition.notify_all()
+
+    def success(self, latency=None):
+        """记录一次正常的请求（包括网站正常返回"无结果"）"""
+        if latency is not None and self._is_slow(latency):
+            self.failure('slow', latency)
+            return
+        with self.condition:
+            self.streak += 1
+            if self.streak < self.success_window:
+                return
+            self.streak = 0
+            self.delay = max(self.min_delay, round(self.delay - self.increase_step, 3))
+            if self.workers < self.max_workers:
+                self.workers += 1
+                self.condition.notify_all()
+
+    def failure(self, signal, latency=None):
+        """
+        记录一次失败
+
+        Args:
+            signal: 失败类型，属于CONGESTION_SIGNALS时减速，其他类型只中断连续正常计数
+            latency: 请求耗时
+        """
+        with self.condition:
+            self.streak = 0
+            if signal not in CONGESTION_SIGNALS:
+                return
+            now = time.time()
+            # 同一轮中多个并行请求先后报告拥塞时只减速一次
+            if now - self.last_decrease < max(self.delay, 1.0):
+                return
+            self.last_decrease = now
+            self.delay = min(self.max_delay, max(self.delay, self.min_delay) * 2)
+            self.workers = max(1, self.workers // 2)
+            self.next_at = max(self.next_at, now + self.delay)
+            delay, workers = self.delay, self.workers
+        if self.log:
+            self.log(f"检测到{SIGNAL_NAMES.get(signal, signal)}，请求间隔调整为 {delay:.1f} 秒，并行数 {workers}")
+
+    def retry_delay(self, attempt):
+        """第attempt次重试前的等待时间，随当前间隔和重试次数增加"""
+        return min(self.max_delay, max(self.delay, 1.0) * 2 ** max(0, attempt))
+
+    def _is_slow(self, latency):
+        """响应时间明显高于平均值时视为变慢，同时更新平均值"""
+        with self.condition:
+            slow = (self.samples >= self.success_window
+                    and latency > self.avg_latency * self.latency_factor)
+            if self.avg_latency is None:
+                self.avg_latency = latency
+            else:
+                self.avg_latency = self.avg_latency * 0.8 + latency * 0.2
+            self.samples += 1
+            return slow
@@ -0,0 +1,119 @@
+"""分阶段流水线
+
+把每首歌曲的处理拆成几个阶段（如 解析 → 下载 → 收尾），各阶段有自己的线程数，
+阶段之间用有界队列连接：浏览器解析第N+1首的同时，HTTP下载第N首，
+前一阶段领先太多时会在队列满处等待，不会无限堆积。
+"""
+import queue
+import threading
+import time
+
+
+# 队列结束标记
+_DONE = object()
+
+
+class Stage:
+    """
+    流水线的一个阶段
+
+    Args:
+        name: 阶段名称，用于日志
+        func: 处理函数 func(item)，返回交给下一阶段的item，返回None表示不再往下传
+        workers: 线程数
+        on_error: 处理出错时调用 on_error(item, 异常)，返回的item直接交给最后一个阶段
+            （如记录失败、保存进度），返回None表示丢弃
+    """
+    def __init__(self, name, func, workers=1, on_error=None):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.on_error = on_error
+
+
+class Pipeline:
+    """
+    Args:
+        stages: Stage列表，按处理顺序排列
+        queue_size: 阶段之间队列的容量
+        log: 日志函数
+    """
+    def __init__(self, stages, queue_size=4, log=print):
+        self.stages = stages
+        self.log = log
+        # queues[i] 是第i个阶段的输入队列
+        self.queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+
+    def run(self, items, should_continue=lambda: True, is_paused=lambda: False):
+        """处理所有item，阻塞直到全部阶段结束或should_continue()返回False"""
+        stage_threads = []
+        for index, stage in enumerate(self.stages):
+            threads = [
+                threading.Thread(target=self._stage_loop, args=(index, should_continue), daemon=True,
+                                 name=f"{stage.name}-{i + 1}")
+                for i in range(stage.workers)
+            ]
+            for thread in threads:
+                thread.start()
+            stage_threads.append(threads)
+
+        # 输入阶段：暂停时不再投放新的item
+        for item in items:
+            while is_paused() and should_continue():
+                time.sleep(0.5)
+            if not should_continue():
+                break
+            self._put(0, item, should_continue)
+
+        # 逐个阶段结束：上一阶段的线程全部退出后，再通知下一阶段
+        for index, threads in enumerate(stage_threads):
+            for _ in threads:
+                self.queues[index].put(_DONE)
+            for thread in threads:
+                thread.join()
+
+    def _put(self, index, item, should_continue):
+        """放入队列，队列满时等待；停止时放弃"""
+        while True:
+            try:
+                self.queues[index].put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                if not should_continue():
+                    return False
+
+    def _stage_loop(self, index, should_continue):
+        stage = self.stages[index]
+        last = index == len(self.stages) - 1
+        while True:
+            item = self.queues[index].get()
+            if item is _DONE:
+                return
+            if not should_continue():
+                # 已停止：取出剩余的item但不再处理
+                continue
+
+            try:
+                result = stage.func(item)
+            except Exception as e:
+                self.log(f"[{stage.name}] 处理出错: {e}")
+                self._fail(index, item, e, should_continue)
+                continue
+            
+            if result is not None and not last:
+                self._put(index + 1, result, should_continue)
+    
+    def _fail(self, index, item, error, should_continue):
+        """出错的item交给on_error，结果跳过中间阶段直接交给最后一个阶段"""
+        stage = self.stages[index]
+        if not stage.on_error:
+            return
+        try:
+            result = stage.on_error(item, error)
+        except Exception as e:
+            self.log(f"[{stage.name}] 处理出错后记录失败时出错: {e}")
+            return
+        last = len(self.stages) - 1
+        if result is not None and index != last:
+            # 最后一个阶段在前面的阶段全部结束后才收到结束标记，此时一定还在运行
+            self._put(last, result, should_continue)
@@ -0,0 +1,156 @@
+"""
+浏览器配置对比测试：完整浏览器 vs 精简浏览器
+
+对同一组搜索页分别用两种配置打开，比较页面就绪耗时、传输流量和JS堆内存。
+用法: python profile_benchmark.py [歌曲列表.txt] [--headless]
+歌曲列表每行 "歌曲名 - 歌手"，不指定时使用内置的几首歌。
+"""
+import os
+import sys
+import time
+from urllib.parse import quote
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+import browser_profile
+import site_waits
+
+
+BASE_URL = "https://s.myhkw.cn/"
+
+DEFAULT_QUERIES = [
+    "Always Online 林俊杰",
+    "晴天 周杰伦",
+    "Bones Imagine Dragons",
+    "后来 刘若英",
+    "稻香 周杰伦",
+]
+
+# 页面中所有资源的传输字节数（含主文档）
+_TRANSFER_SCRIPT = """
+var total = 0;
+var entries = performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'));
+for (var i = 0; i < entries.length; i++) { total += entries[i].transferSize || 0; }
+return {bytes: total, requests: entries.length,
+        heap: performance.memory ? performance.memory.usedJSHeapSize : 0};
+"""
+
+
+def load_queries(file_path):
+    """读取歌曲列表，返回搜索词列表"""
+    queries = []
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if ' - ' in line:
+                song, artist = line.split(' - ', 1)
+                queries.append(f"{song.strip()} {artist.strip()}")
+            else:
+                queries.append(line)
+    return queries
+
+
+def create_driver(lean, headless):
+    """创建浏览器"""
+    chrome_options = Options()
+    if headless:
+        chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--window-size=1920,1080")
+    if lean:
+        browser_profile.apply_lean_options(chrome_options)
+
+    driver = webdriver.Chrome(options=chrome_options)
+    driver.set_page_load_timeout(30)
+    if lean:
+        browser_profile.apply_lean_blocking(driver)
+    return driver
+
+
+def run_profile(name, lean, queries, headless):
+    """用一种配置依次打开所有搜索页，返回每页的测量结果"""
+    print(f"\n[{name}] 启动浏览器...")
+    start = time.time()
+    driver = create_driver(lean, headless)
+    startup = time.time() - start
+    print(f"[{name}] 启动耗时: {startup:.2f}s")
+
+    results = []
+    try:
+        for query in queries:
+            url = f"{BASE_URL}?name={quote(query)}&type=qq"
+            start = time.time()
+            driver.get(url)
+            state = site_waits.wait_for_search_result(driver)
+            if state == 'success':
+                site_waits.wait_for_href(driver, "j-lrc-btn")
+            elapsed = time.time() - start
+
+            stats = driver.execute_script(_TRANSFER_SCRIPT) or {}
+            results.append({
+                'query': query,
+                'state': state or 'timeout',
+                'seconds': elapsed,
+                'bytes': stats.get('bytes', 0),
+                'requests': stats.get('requests', 0),
+                'heap': stats.get('heap', 0),
+            })
+            print(f"[{name}] {query}: {elapsed:.2f}s, {stats.get('bytes', 0) / 1024:.0f} KB, "
+                  f"{stats.get('requests', 0)} 个请求 ({state or 'timeout'})")
+    finally:
+        driver.quit()
+
+    return startup, results
+
+
+def summarize(name, startup, results):
+    """汇总一种配置的结果"""
+    count = max(len(results), 1)
+    return {
+        'name': name,
+        'startup': startup,
+        'seconds': sum(r['seconds'] for r in results) / count,
+        'kb': sum(r['bytes'] for r in results) / count / 1024,
+        'requests': sum(r['requests'] for r in results) / count,
+        'heap_mb': sum(r['heap'] for r in results) / count / 1024 / 1024,
+    }
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    headless = '--headless' in sys.argv
+
+    queries = DEFAULT_QUERIES
+    if args:
+        if not os.path.exists(args[0]):
+            print(f"错误：文件 '{args[0]}' 不存在")
+            return
+        queries = load_queries(args[0])
+
+    print("浏览器配置对比测试")
+    print("=" * 40)
+    print(f"搜索页数量: {len(queries)}")
+
+    summaries = []
+    for name, lean in [("完整浏览器", False), ("精简浏览器", True)]:
+        startup, results = run_profile(name, lean, queries, headless)
+        summaries.append(summarize(name, startup, results))
+
+    print("\n" + "=" * 72)
+    print(f"{'配置':<10}{'启动(s)':>10}{'每页就绪(s)':>14}{'每页流量(KB)':>14}{'每页请求':>10}{'JS堆(MB)':>10}")
+    for s in summaries:
+        print(f"{s['name']:<10}{s['startup']:>10.2f}{s['seconds']:>14.2f}{s['kb']:>14.0f}"
+              f"{s['requests']:>10.1f}{s['heap_mb']:>10.1f}")
+
+    full, lean = summaries
+    if full['seconds'] and full['kb']:
+        print(f"\n精简浏览器: 每页就绪耗时 {lean['seconds'] / full['seconds'] * 100:.0f}%，"
+              f"流量 {lean['kb'] / full['kb'] * 100:.0f}%（相对完整浏览器）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""下载进度日志
+
+进度由两部分组成：
+- download_progress.json     快照：全部歌曲的状态（与以前的进度文件格式相同）
+- download_progress.journal  追加日志（JSON Lines）：快照之后每首歌曲的状态变化
+
+每处理完一首歌曲只在日志末尾追加一行（只含变化的字段），写入量与歌单长度无关。
+日志行数达到歌单长度时合并为新快照（先写临时文件再改名），然后清空日志，
+平均每首歌曲的成本仍是常数。
+恢复时读取快照再按顺序重放日志；程序崩溃时最后一行可能不完整，重放时忽略。
+"""
+import json
+import os
+import threading
+from datetime import datetime
+
+
+# 日志至少积累这么多行才合并
+COMPACT_MIN_LINES = 1000
+
+
+class ProgressJournal:
+    """
+    Args:
+        folder: 进度文件所在目录
+        name: 文件名（不含扩展名）
+    """
+    def __init__(self, folder, name="download_progress"):
+        self.folder = folder
+        self.snapshot_path = os.path.join(folder, name + ".json")
+        self.journal_path = os.path.join(folder, name + ".journal")
+        # 合并时先写入的隐藏临时文件，不会被当成浏览器下载的临时文件
+        self.new_snapshot_path = os.path.join(folder, "." + name + ".json.new")
+        self.lock = threading.Lock()
+        self.file = None
+        self.lines = 0
+        self.persisted = {}  # 序号 -> 已写入的歌曲状态
+
+    def load(self):
+        """
+        读取快照并重放日志
+
+        Returns:
+            dict: {'songs', 'current_index', 'timestamp'}；没有进度文件时返回None
+        """
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                progress = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        songs = progress.get('songs', [])
+        try:
+            # 不完整的最后一行可能截断在多字节字符中间
+            with open(self.journal_path, 'r', encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # 崩溃时写了一半的行
+                        continue
+                    index = entry.get('i')
+                    if isinstance(index, int) and 0 <= index < len(songs):
+                        songs[index].update(entry.get('f', {}))
+                    if 'c' in entry:
+                        progress['current_index'] = entry['c']
+                    if 't' in entry:
+                        progress['timestamp'] = entry['t']
+        except OSError:
+            pass
+        return progress
+
+    def record(self, index, song, songs, current_index=0):
+        """
+        追加一首歌曲的状态变化，日志过长时合并为快照
+
+        Args:
+            index: 歌曲在songs中的序号
+            song: 歌曲
+            songs: 完整的歌曲列表（合并快照时使用）
+            current_index: 当前处理位置
+        """
+        with self.lock:
+            if self.file is None and not os.path.exists(self.snapshot_path):
+                self._compact(songs, current_index)
+
+            state = dict(song)
+            last = self.persisted.get(index, {})
+            changed = {key: value for key, value in state.items() if last.get(key) != value}
+            if not changed:
+                return
+
+            entry = {'i': index, 'c': current_index, 't': datetime.now().isoformat(), 'f': changed}
+            if self.file is None:
+                self.file = self._open_journal()
+            self.file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self.file.flush()
+            self.persisted[index] = state
+            self.lines += 1
+
+            if self.lines >= max(COMPACT_MIN_LINES, len(songs)):
+                self._compact(songs, current_index)
+
+    def compact(self, songs, current_index=0):
+        """把当前全部状态写成快照并清空日志（如导入新的歌曲列表时）"""
+        with self.lock:
+            self._compact(songs, current_index)
+
+    def close(self):
+        with self.lock:
+            if self.file:
+                self.file.close()
+                self.file = None
+
+    def _open_journal(self):
+        """以追加方式打开日志；上次崩溃留下不完整的最后一行时先换行，新记录不会接在它后面"""
+        with open(self.journal_path, 'ab+') as f:
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    f.write(b'\n')
+        return open(self.journal_path, 'a', encoding='utf-8')
+
+    def _compact(self, songs, current_index):
+        os.makedirs(self.folder, exist_ok=True)
+        states = [dict(song) for song in songs]
+        progress = {
+            'songs': states,
+            'current_index': current_index,
+            'timestamp': datetime.now().isoformat()
+        }
+
+        with open(self.new_snapshot_path, 'w', encoding='utf-8') as f:
+            json.dump(progress, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(self.new_snapshot_path, self.snapshot_path)
+
+        # 快照已包含日志中的全部变化，清空日志
+        if self.file:
+            self.file.close()
+        self.file = open(self.journal_path, 'w', encoding='utf-8')
+        self.lines = 0
+        self.persisted = dict(enumerate(states))
@@ -0,0 +1,238 @@
+"""搜索解析结果缓存
+
+把 (歌曲名, 歌手) 解析得到的实际歌曲名、歌手、歌词/音频/封面地址保存在SQLite中，
+ceshi2.0.py、geci.py、image_geci.py 共用同一个缓存文件。
+命中缓存的歌曲不再打开搜索页，一批歌曲全部命中时不需要启动浏览器。
+
+歌词和封面地址长期有效，缓存较久；音频地址带有时效签名，只缓存较短时间。
+
+解析失败的歌曲记入负缓存：记录连续失败次数和最后一次的错误类型，
+在按失败次数指数增长的等待时间内不再搜索，避免反复失败的歌曲占用整批的时间。
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CACHE_DB = os.path.join(APP_DIR, "resolver_cache.db")
+
+# 歌词、封面地址和歌曲信息的有效期（秒）
+DEFAULT_TTL = 30 * 24 * 3600
+
+# 音频地址的有效期（秒）
+AUDIO_TTL = 2 * 3600
+
+# 第一次失败后的等待时间（秒），之后每失败一次翻倍
+FAILURE_BACKOFF = 3600
+
+# 失败等待时间上限（秒）
+FAILURE_BACKOFF_MAX = 30 * 24 * 3600
+
+FIELDS = ('actual_song', 'actual_artist', 'lyrics_url', 'audio_url', 'cover_url')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS resolved (
+    song_key TEXT PRIMARY KEY,
+    song TEXT,
+    artist TEXT,
+    actual_song TEXT,
+    actual_artist TEXT,
+    lyrics_url TEXT,
+    audio_url TEXT,
+    cover_url TEXT,
+    resolved_at REAL,
+    expires_at REAL,
+    audio_expires_at REAL
+);
+CREATE TABLE IF NOT EXISTS failures (
+    song_key TEXT PRIMARY KEY,
+    song TEXT,
+    artist TEXT,
+    failures INTEGER,
+    last_error TEXT,
+    last_failed_at REAL,
+    retry_after REAL
+);
+"""
+
+
+def normalize_key(song, artist):
+    """歌曲的缓存键：全角转半角、忽略大小写和多余空白"""
+    parts = []
+    for text in (song, artist):
+        text = unicodedata.normalize('NFKC', text or '').lower()
+        parts.append(re.sub(r'\s+', ' ', text).strip())
+    return '\x1f'.join(parts)
+
+
+class ResolverCache:
+    """线程安全的解析结果缓存，多个工作线程可共用一个实例"""
+    def __init__(self, path=CACHE_DB, ttl=DEFAULT_TTL, audio_ttl=AUDIO_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.audio_ttl = audio_ttl
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+        self.conn.commit()
+
+    def get(self, song, artist, required=('lyrics_url',)):
+        """
+        查询缓存
+
+        Args:
+            required: 必须存在的字段，如 ('lyrics_url', 'cover_url')
+
+        Returns:
+            dict: 含FIELDS中各字段的结果（过期的音频地址为None）；未命中或缺少所需字段时返回None
+        """
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT actual_song, actual_artist, lyrics_url, audio_url, cover_url, "
+                "resolved_at, expires_at, audio_expires_at FROM resolved WHERE song_key = ?",
+                (normalize_key(song, artist),)
+            ).fetchone()
+        if not row or (row[6] or 0) < now:
+            return None
+
+        entry = dict(zip(FIELDS, row[:5]))
+        entry['resolved_at'] = row[5]
+        if (row[7] or 0) < now:
+            entry['audio_url'] = None
+        if not all(entry.get(field) for field in required):
+            return None
+        return entry
+
+    def has(self, song, artist, required=('lyrics_url',)):
+        """是否命中缓存"""
+        return self.get(song, artist, required) is not None
+
+    def put(self, song, artist, **fields):
+        """
+        保存解析结果，只更新给出的非空字段，其余字段保留原值
+
+        只有内容变化（或已过期）的字段才重新计算有效期：把缓存中读出的地址原样存回时
+        不会延长有效期，只更新音频地址时也不会延长歌词、封面地址的有效期。
+        条目已过期时，这次没有给出的过期字段被清空，条目重新计算有效期，
+        否则只写入音频地址的过期条目会一直查不到。
+
+        Args:
+            fields: FIELDS中的字段，如 lyrics_url=..., cover_url=...
+        """
+        values = {k: v for k, v in fields.items() if k in FIELDS and v}
+        if not values:
+            return
+
+        now = time.time()
+        key = normalize_key(song, artist)
+        with self.lock:
+            row = self.conn.execute(
+                f"SELECT {', '.join(FIELDS)}, expires_at, audio_expires_at FROM resolved WHERE song_key = ?",
+                (key,)
+            ).fetchone()
+            stored = {}
+            expired = False
+            if row:
+                stored = dict(zip(FIELDS, row[:5]))
+                # 已过期的值视为没有，重新解析得到相同的地址时也延长有效期
+                expired = (row[5] or 0) < now
+                if expired:
+                    stored = {'audio_url': stored['audio_url']}
+                if (row[6] or 0) < now:
+                    stored.pop('audio_url', None)
+            columns = [column for column in values if stored.get(column) != values[column]]
+            if not columns:
+                return
+            if row is None:
+                self.conn.execute(
+                    "INSERT INTO resolved (song_key, song, artist, resolved_at, expires_at, audio_expires_at) "
+                    "VALUES (?, ?, ?, ?, ?, 0)",
+                    (key, song, artist, now, now + self.ttl)
+                )
+            assignments = [f"{column} = ?" for column in columns]
+            params = [values[column] for column in columns]
+            if expired:
+                # 过期的歌词、封面等地址不随这次写入重新生效
+                assignments += [f"{column} = NULL" for column in FIELDS
+                                if column != 'audio_url' and column not in columns]
+            if expired or any(column != 'audio_url' for column in columns):
+                assignments += ["resolved_at = ?", "expires_at = ?"]
+                params += [now, now + self.ttl]
+            if 'audio_url' in columns:
+                assignments.append("audio_expires_at = ?")
+                params.append(now + self.audio_ttl)
+            self.conn.execute(
+                f"UPDATE resolved SET {', '.join(assignments)} WHERE song_key = ?",
+                params + [key]
+            )
+            self.conn.commit()
+
+    def remove(self, song, artist):
+        """删除一首歌曲的缓存（如缓存的地址已失效）"""
+        with self.lock:
+            self.conn.execute("DELETE FROM resolved WHERE song_key = ?", (normalize_key(song, artist),))
+            self.conn.commit()
+
+    def record_failure(self, song, artist, error):
+        """
+        记录一次解析失败
+        
+        Args:
+            error: 错误类型，如 '搜索失败'、'下载失败'
+        
+        Returns:
+            float: 下次可以重试的时间戳
+        """
+        now = time.time()
+        key = normalize_key(song, artist)
+        with self.lock:
+            row = self.conn.execute("SELECT failures FROM failures WHERE song_key = ?", (key,)).fetchone()
+            failures = (row[0] if row else 0) + 1
+            retry_after = now + min(FAILURE_BACKOFF * 2 ** (failures - 1), FAILURE_BACKOFF_MAX)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO failures (song_key, song, artist, failures, last_error, last_failed_at, retry_after) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, song, artist, failures, error, now, retry_after)
+            )
+            self.conn.commit()
+        return retry_after
+    
+    def clear_failure(self, song, artist):
+        """解析成功后清除失败记录"""
+        with self.lock:
+            self.conn.execute("DELETE FROM failures WHERE song_key = ?", (normalize_key(song, artist),))
+            self.conn.commit()
+    
+    def get_backoff(self, song, artist):
+        """
+        查询失败等待状态
+        
+        Returns:
+            dict: {'failures', 'last_error', 'last_failed_at', 'retry_after'}；
+                  没有失败记录或等待时间已过时返回None
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT failures, last_error, last_failed_at, retry_after FROM failures WHERE song_key = ?",
+                (normalize_key(song, artist),)
+            ).fetchone()
+        if not row or row[3] <= time.time():
+            return None
+        return dict(zip(('failures', 'last_error', 'last_failed_at', 'retry_after'), row))
+    
+    def purge_expired(self):
+        """清理过期条目"""
+        with self.lock:
+            self.conn.execute("DELETE FROM resolved WHERE expires_at < ?", (time.time(),))
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
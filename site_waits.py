@@ -0,0 +1,217 @@
+"""明月浩空音乐网站的条件等待工具
+
+用页面上真实的就绪信号代替固定的 time.sleep：信号一出现立即返回，
+超出各自的时间预算则快速失败，不再每次都付出最坏情况的等待时间。
+"""
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+
+# 搜索成功标记
+SUCCESS_MARKER = "成功 Get √"
+
+# 网站"无结果"状态的提示文字
+NO_RESULT_MARKERS = ["没有找到", "未找到相关", "搜索失败", "暂无结果", "获取失败"]
+
+# 主页HTML中必须出现的搜索框、搜索按钮ID（不用浏览器探测网站时检查页面结构）
+SEARCH_PAGE_MARKERS = ('j-input', 'j-submit')
+
+# 各类等待的时间预算（秒）
+WAIT_BUDGETS = {
+    'search_page': 5,       # 主页搜索框出现
+    'search_result': 8,     # 搜索结果（成功/无结果）出现
+    'button_href': 5,       # 下载/歌词按钮带上href
+    'cover': 2,             # 封面图片渲染
+}
+
+# 轮询间隔（秒）
+POLL_INTERVAL = 0.1
+
+# 在页面内判断搜索状态，只返回一个短字符串，避免每次轮询都传回整个page_source
+_SEARCH_STATE_SCRIPT = """
+var marker = arguments[0], noResult = arguments[1];
+var html = document.documentElement ? document.documentElement.innerHTML : '';
+if (html.indexOf(marker) >= 0) { return 'success'; }
+var ids = ['j-src-btn', 'j-lrc-btn'];
+for (var i = 0; i < ids.length; i++) {
+    var el = document.getElementById(ids[i]);
+    if (el && el.getAttribute('href')) { return 'success'; }
+}
+var text = document.body ? document.body.innerText : '';
+for (var j = 0; j < noResult.length; j++) {
+    if (text.indexOf(noResult[j]) >= 0) { return 'no_result'; }
+}
+return '';
+"""
+
+_HREF_SCRIPT = """
+var el = document.getElementById(arguments[0]);
+if (!el) { return null; }
+return el.getAttribute('href') ? (el.href || el.getAttribute('href')) : '';
+"""
+
+_COVER_SCRIPT = """
+var pic = document.querySelector('.aplayer-pic');
+if (pic && (pic.getAttribute('style') || '').indexOf('url(') >= 0) { return true; }
+var html = document.documentElement ? document.documentElement.innerHTML : '';
+return html.indexOf('y.gtimg.cn/music/photo_new') >= 0;
+"""
+
+# 一次脚本调用取回结果页上所有需要的字段，代替逐个元素的WebDriver往返
+_PAGE_DATA_SCRIPT = r"""
+var marker = arguments[0];
+var html = document.documentElement ? document.documentElement.innerHTML : '';
+function href(id) {
+    var el = document.getElementById(id);
+    return el && el.getAttribute('href') ? el.href : null;
+}
+function value(id) {
+    var el = document.getElementById(id);
+    return el ? (el.value || el.getAttribute('value') || null) : null;
+}
+function absolute(url) {
+    try { return new URL(url, location.href).href; } catch (e) { return url; }
+}
+function isLyrics(url) {
+    return url && url.indexOf('api.php') >= 0 && url.indexOf('get=lrc') >= 0;
+}
+
+// 歌词链接：歌词按钮 -> 页面中的链接 -> 页面文本
+var lyrics = href('j-lrc-btn');
+if (!isLyrics(lyrics)) {
+    lyrics = null;
+    var links = document.getElementsByTagName('a');
+    for (var i = 0; i < links.length && !lyrics; i++) {
+        if (isLyrics(links[i].href)) { lyrics = links[i].href; }
+    }
+}
+if (!lyrics) {
+    var m = html.match(/https?:\/\/[^\s"'<>]*api\.php[^\s"'<>]*get=lrc[^\s"'<>]*/);
+    if (m) { lyrics = m[0].replace(/&amp;/g, '&'); }
+}
+
+// 封面：APlayer封面 -> 专辑图片 -> QQ音乐图片地址 -> 背景图片
+var cover = null;
+var pic = document.querySelector('.aplayer-pic');
+if (pic) {
+    var bg = (pic.getAttribute('style') || '').match(/background-image:\s*url\(["']?([^"')]+)["']?\)/);
+    if (bg) { cover = bg[1]; }
+}
+if (!cover) {
+    var imgs = document.getElementsByTagName('img');
+    var attrs = ['src', 'data-src', 'data-original'];
+    for (var j = 0; j < imgs.length && !cover; j++) {
+        for (var k = 0; k < attrs.length && !cover; k++) {
+            var src = imgs[j].getAttribute(attrs[k]);
+            if (src && /cover|album|artist|photo/i.test(src)) { cover = src; }
+        }
+    }
+}
+if (!cover) {
+    var qq = html.match(/(?:https:\/\/y\.gtimg\.cn\/music\/)?photo_new[^\s"'<>]+\.(?:jpg|jpeg|png)/);
+    if (qq) { cover = qq[0].indexOf('http') === 0 ? qq[0] : 'https://y.gtimg.cn/music/' + qq[0]; }
+}
+if (!cover) {
+    var styled = document.querySelectorAll('[style*="url("]');
+    for (var n = 0; n < styled.length && !cover; n++) {
+        var img = (styled[n].getAttribute('style') || '').match(/url\(["']?([^"')]+\.(?:jpg|jpeg|png|gif|webp))["']?\)/);
+        if (img) { cover = img[1]; }
+    }
+}
+
+return {
+    success: html.indexOf(marker) >= 0,
+    song_url: href('j-src-btn'),
+    lyrics_url: lyrics,
+    song_name: value('j-name'),
+    artist: value('j-author'),
+    src: value('j-src'),
+    cover_url: cover ? absolute(cover) : null,
+    title: document.title,
+    url: location.href
+};
+"""
+
+
+def _budget(name, timeout):
+    """取得等待时间预算"""
+    return WAIT_BUDGETS[name] if timeout is None else timeout
+
+
+def _until(driver, condition, timeout):
+    """等待条件成立，超时返回None"""
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=POLL_INTERVAL).until(condition)
+    except TimeoutException:
+        return None
+
+
+def search_state(driver):
+    """读取当前页面的搜索状态: 'success' / 'no_result' / ''"""
+    try:
+        return driver.execute_script(_SEARCH_STATE_SCRIPT, SUCCESS_MARKER, NO_RESULT_MARKERS) or ''
+    except WebDriverException:
+        return ''
+
+
+def wait_for_search_result(driver, timeout=None):
+    """
+    等待搜索结果出现
+
+    Returns:
+        'success': 出现"成功 Get √"标记或结果按钮已带href
+        'no_result': 网站明确返回无结果
+        None: 超出时间预算
+    """
+    return _until(driver, search_state, _budget('search_result', timeout))
+
+
+def wait_for_search_page(driver, timeout=None):
+    """等待主页搜索框出现，返回搜索框元素或None"""
+    def _find(d):
+        # 用脚本查找，不受implicitly_wait影响
+        try:
+            return d.execute_script("return document.getElementById('j-input')") or False
+        except WebDriverException:
+            return False
+
+    return _until(driver, _find, _budget('search_page', timeout))
+
+
+def get_href(driver, element_id):
+    """读取元素的href（已转换为绝对URL），元素不存在返回None"""
+    try:
+        return driver.execute_script(_HREF_SCRIPT, element_id)
+    except WebDriverException:
+        return None
+
+
+def wait_for_href(driver, element_id, timeout=None):
+    """等待元素出现并带有非空href，返回href或None"""
+    return _until(driver, lambda d: get_href(d, element_id), _budget('button_href', timeout))
+
+
+def wait_for_cover(driver, timeout=None):
+    """等待封面图片渲染，返回是否出现"""
+    def _cover(d):
+        try:
+            return d.execute_script(_COVER_SCRIPT)
+        except WebDriverException:
+            return False
+
+    return bool(_until(driver, _cover, _budget('cover', timeout)))
+
+
+def extract_page_data(driver):
+    """
+    一次execute_script取回结果页上的全部字段
+
+    Returns:
+        dict: success（是否有"成功 Get √"标记）、song_url（j-src-btn链接）、
+              lyrics_url（api.php?get=lrc链接）、song_name、artist、src（j-src的值）、
+              cover_url、title、url；读取失败返回None
+    """
+    try:
+        return driver.execute_script(_PAGE_DATA_SCRIPT, SUCCESS_MARKER)
+    except WebDriverException:
+        return None
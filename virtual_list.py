@@ -0,0 +1,182 @@
+"""虚拟化的歌曲列表与筛选索引
+
+Treeview中插入十万行时导入歌单要好几秒、占用几百MB内存。这里Treeview只保留
+当前能看到的几十行：滚动时按位置从歌曲列表（内存列表或任务数据库）读取这几行重新填入，
+滚动条按在全部行中的位置显示，看起来与完整列表相同。
+
+SongIndex 是内存歌曲列表的筛选索引：导入时按状态分组并预先算好用于搜索的歌手、歌曲名文本，
+筛选失败的歌曲、搜索歌手、统计各状态的歌曲数都不必重新遍历歌曲。
+使用任务数据库时由数据库的索引完成同样的查询。
+"""
+import bisect
+import re
+import unicodedata
+from tkinter import ttk
+
+
+def normalize_text(text):
+    """搜索用的文本：全角转半角、忽略大小写和多余空白"""
+    text = unicodedata.normalize('NFKC', text or '').lower()
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+class SongIndex:
+    """
+    内存歌曲列表的筛选索引
+
+    Args:
+        songs: 歌曲列表
+    """
+    def __init__(self, songs):
+        self.statuses = []
+        self.by_status = {}
+        self.texts = []
+        for i, song in enumerate(songs):
+            status = song.get('status') or '待处理'
+            self.statuses.append(status)
+            self.by_status.setdefault(status, set()).add(i)
+            self.texts.append(normalize_text(f"{song.get('artist', '')} {song.get('song_name', '')}"))
+
+    def update(self, index, fields):
+        """歌曲状态变化时移到新的状态分组"""
+        status = fields.get('status') or '待处理'
+        if not 0 <= index < len(self.statuses) or self.statuses[index] == status:
+            return
+        self.by_status[self.statuses[index]].discard(index)
+        self.by_status.setdefault(status, set()).add(index)
+        self.statuses[index] = status
+
+    def count_by_status(self):
+        """各状态的歌曲数 {状态: 数量}（按状态分组的大小，不遍历歌曲）"""
+        return {status: len(indexes) for status, indexes in self.by_status.items() if indexes}
+
+    def filter(self, statuses=None, text=''):
+        """
+        筛选歌曲
+
+        Args:
+            statuses: 状态列表，None表示全部状态
+            text: 歌手或歌曲名中包含的文本
+
+        Returns:
+            序号列表（不筛选时为range，不占内存）
+        """
+        text = normalize_text(text)
+        if statuses is None:
+            if not text:
+                return range(len(self.texts))
+            candidates = range(len(self.texts))
+        else:
+            candidates = sorted(set().union(*(self.by_status.get(status, ()) for status in statuses)))
+        if text:
+            return [i for i in candidates if text in self.texts[i]]
+        return candidates
+
+
+class VirtualTreeview:
+    """
+    只显示可见行的Treeview
+
+    Treeview中行的iid为歌曲序号，可见的行可以直接用 tree.exists/tree.item 定位和刷新。
+
+    Args:
+        tree: ttk.Treeview
+        scrollbar: 纵向滚动条
+        row_values: row_values(序号) 返回一行的显示内容
+    """
+    def __init__(self, tree, scrollbar, row_values):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.row_values = row_values
+        self.rows = range(0)  # 当前显示的歌曲序号（筛选结果）
+        self.top = 0          # 第一个可见行在rows中的位置
+        self.visible = int(tree.cget('height'))
+        self.selected = None
+
+        scrollbar.configure(command=self.yview)
+        tree.bind('<Configure>', self.on_resize)
+        tree.bind('<MouseWheel>', self.on_mousewheel)
+        tree.bind('<Button-4>', lambda event: self.scroll(-3))
+        tree.bind('<Button-5>', lambda event: self.scroll(3))
+        tree.bind('<<TreeviewSelect>>', self.on_select)
+
+    def set_rows(self, rows, top=0):
+        """设置要显示的歌曲序号（全部或筛选结果），从第top行开始显示"""
+        self.rows = rows
+        self.top = top
+        self.render()
+
+    def render(self):
+        """重新填入可见的行"""
+        self.top = max(0, min(self.top, len(self.rows) - self.visible))
+        self.tree.delete(*self.tree.get_children())
+        for index in self.rows[self.top:self.top + self.visible]:
+            self.tree.insert('', 'end', iid=str(index), values=self.row_values(index))
+        if self.selected is not None and self.tree.exists(str(self.selected)):
+            self.tree.selection_set(str(self.selected))
+        self.update_scrollbar()
+
+    def update_scrollbar(self):
+        total = len(self.rows)
+        if total <= self.visible:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self.top / total, (self.top + self.visible) / total)
+
+    def scroll(self, rows):
+        top = max(0, min(self.top + rows, len(self.rows) - self.visible))
+        if top != self.top:
+            self.top = top
+            self.render()
+        return 'break'
+
+    def yview(self, *args):
+        """滚动条回调：('moveto', 比例) 或 ('scroll', 数量, 'units'/'pages')"""
+        if args[0] == 'moveto':
+            self.top = int(float(args[1]) * len(self.rows))
+            self.render()
+        elif args[0] == 'scroll':
+            amount = int(args[1])
+            self.scroll(amount * self.visible if args[2] == 'pages' else amount)
+
+    def on_mousewheel(self, event):
+        return self.scroll(-3 if event.delta > 0 else 3)
+
+    def on_resize(self, event):
+        """窗口大小变化时按新的高度决定可见行数"""
+        try:
+            row_height = int(ttk.Style(self.tree).lookup('Treeview', 'rowheight')) or 20
+        except ValueError:
+            row_height = 20
+        # 减去表头的高度
+        visible = max(1, event.height // row_height - 1)
+        if visible != self.visible:
+            self.visible = visible
+            self.render()
+
+    def on_select(self, event):
+        selection = self.tree.selection()
+        if selection:
+            self.selected = int(selection[0])
+
+    def see(self, index, select=True):
+        """滚动到指定歌曲（不在当前筛选结果中时不滚动），返回是否找到"""
+        position = self.position(index)
+        if position is None:
+            return False
+        if not self.top <= position < self.top + self.visible:
+            self.top = position - self.visible // 2
+            self.render()
+        if select:
+            self.selected = index
+            self.tree.selection_set(str(index))
+        return True
+
+    def position(self, index):
+        """歌曲在当前显示的行中的位置"""
+        if isinstance(self.rows, range):
+            return index - self.rows.start if index in self.rows else None
+        position = bisect.bisect_left(self.rows, index)
+        if position < len(self.rows) and self.rows[position] == index:
+            return position
+        return None